@@ -0,0 +1,126 @@
+# asset_cache.py
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+import yaml
+from Utilities import text_asset_reader, unity_yaml_loader
+from Utilities.unity_yaml_loader import load_unity_yaml
+
+# How many parsed assets to keep in memory, least recently used ones are dropped first
+max_cached_assets = 4096
+# Where parsed assets are pickled between processes and runs, None keeps the cache in memory only
+disk_cache_directory = None
+
+_cache = OrderedDict()
+# The version of the parsing code, computed on first use, see _code_version
+_version = None
+# Guards _cache, so assets can be loaded from several threads; parsing itself runs outside the lock
+_lock = threading.Lock()
+
+def enable_disk_cache(directory='.hidden/parsed_assets'):
+    """
+    Also keeps parsed assets on disk, so parallel stages and later runs can reuse them.
+    """
+    global disk_cache_directory
+    os.makedirs(directory, exist_ok=True)
+    disk_cache_directory = directory
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _code_version():
+    # Pickles are only reused while the code that parsed them is unchanged, so an edit to the YAML
+    # loader or the text reader, or a PyYAML upgrade, parses every asset again
+    global _version
+    if _version is None:
+        digest = hashlib.sha1(yaml.__version__.encode('utf-8'))
+        for module in (unity_yaml_loader, text_asset_reader):
+            with open(module.__file__, 'rb') as file:
+                digest.update(file.read())
+        _version = digest.hexdigest()
+    return _version
+
+def _disk_path(key):
+    return os.path.join(disk_cache_directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pickle')
+
+def _read_disk(key, stamp):
+    try:
+        with open(_disk_path(key), 'rb') as file:
+            version, cached_stamp, data = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError, AttributeError, ImportError):
+        return None, False
+    return data, version == _code_version() and cached_stamp == stamp
+
+def _write_disk(key, stamp, data):
+    disk_path = _disk_path(key)
+    temp_path = f"{disk_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as file:
+            pickle.dump((_code_version(), stamp, data), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, disk_path)
+    except OSError:
+        # The disk layer is only an optimization, a failed write just means parsing again next time
+        pass
+
+def _load(key, file_path, parse):
+    stamp = _file_stamp(file_path)
+
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            _cache.move_to_end(key)
+            return cached[1]
+
+    found = False
+    if disk_cache_directory:
+        data, found = _read_disk(key, stamp)
+    if not found:
+        data = parse(file_path)
+        if disk_cache_directory:
+            _write_disk(key, stamp, data)
+
+    with _lock:
+        _cache[key] = (stamp, data)
+        _cache.move_to_end(key)
+        if len(_cache) > max_cached_assets:
+            _cache.popitem(last=False)
+    return data
+
+def _parse_asset(file_path):
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return load_unity_yaml(file.read())
+
+def load_asset(file_path):
+    """
+    Returns the parsed first document of a Unity asset, YAML-parsing each file at most once.
+
+    Results are keyed by path and checked against the file's mtime and size, so an edited asset
+    is parsed again; assets pickled on disk are also parsed again after the parsing code changes. The same object is returned to every caller, so it must not be modified.
+
+    Args:
+        file_path (str): The path to the .asset file.
+
+    Returns:
+        dict: The parsed document, e.g. {'MonoBehaviour': {...}}.
+    """
+    key = os.path.normpath(os.path.abspath(file_path))
+    return _load(key, key, _parse_asset)
+
+def load_text_asset(file_path):
+    """
+    Returns the parsed regions and text blocks of a localisation text file, parsing each file at most once.
+
+    Cached like load_asset, so every stage reading an NPC's file shares one parse of it.
+
+    Args:
+        file_path (str): The path to an English_*.txt file.
+
+    Returns:
+        dict: The model from text_asset_reader.parse_text_asset.
+    """
+    path = os.path.normpath(os.path.abspath(file_path))
+    return _load(f"text:{path}", path, text_asset_reader.parse_text_asset)
@@ -0,0 +1,235 @@
+# asset_index.py
+
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+# The index is cached on disk so every script in a run can share a single scan of the asset folder.
+index_cache_path = '.hidden/asset_index.json'
+# Raised whenever the entries gain a field, so older cached indexes are scanned again
+index_version = 3
+
+guid_pattern = re.compile(r'guid: ([a-f0-9]{32})')
+save_id_pattern = re.compile(r'saveID:\s*(\w+)')
+item_name_pattern = re.compile(r'itemName:\s*(.*)')
+m_name_pattern = re.compile(r'm_Name:\s*(.*)')
+category_pattern = re.compile(r'itemCategory:\s*(.*)')
+item_type_pattern = re.compile(r'itemType:\s*(\d+)')
+# Top-level MonoBehaviour keys holding a list or a mapping, as a nested block or in flow style,
+# which includes empty ones such as `lootTable: []`
+section_pattern = re.compile(r'^  (\w+):[ \t]*(?:\n(?=  [ -])|[\[{])', re.MULTILINE)
+# The machineProductionGuide block ends at the next top-level key of the MonoBehaviour
+top_level_pattern = re.compile(r'\n  \w')
+# The fields of one machineProductionGuide entry, in the order Unity writes them; any of them after
+# machineType may be missing. GUIDs are kept as text, since YAML would turn an all-digit GUID into a number.
+production_entry_pattern = re.compile(
+    r'machineType: (\d+)'
+    r'(?:.*?produceDuration: (\d+))?'
+    r'(?:.*?\bloot: (\d+))?'
+    r'(?:.*?itemToDrop: \{(?:[^}\n]*?guid: ([0-9a-fA-F]{32}))?)?'
+    r'(?:.*?lootTable: \{(?:[^}\n]*?guid: ([0-9a-fA-F]{32}))?)?'
+    r'(?:.*?minimumNum: (\d+))?'
+    r'(?:.*?maxiumNum: (\d+))?',
+    re.DOTALL)
+
+_loaded_indexes = {}
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+def _search(pattern, data):
+    match = pattern.search(data)
+    return match.group(1).strip() if match else None
+
+def read_production_guide(data):
+    """
+    Reads the machineProductionGuide entries of an asset's text.
+
+    Args:
+        data (str): The text of the asset.
+
+    Returns:
+        list: [{'machine_type': int, 'duration': the leading digits of produceDuration, or None,
+                'loot': whether it produces a roll of its loot table,
+                'product_guid': the itemToDrop GUID or None, 'loot_table_guid': the lootTable GUID or None,
+                'min', 'max': the amtToGive numbers}] in file order, entries without a machineType left out.
+    """
+    start = data.find('\n  machineProductionGuide:')
+    if start == -1:
+        return []
+    start = data.find('\n', start + 1)
+    if start == -1:
+        return []
+    end = top_level_pattern.search(data, start)
+    block = data[start:end.start() if end else len(data)]
+
+    entries = []
+    # Each entry is searched on its own, so a missing field is never taken from the next entry
+    for chunk in block.split('\n  - '):
+        match = production_entry_pattern.search(chunk)
+        if not match:
+            continue
+        machine_type, duration, loot, product_guid, loot_table_guid, min_num, max_num = match.groups()
+        entries.append({
+            'machine_type': int(machine_type),
+            'duration': duration,
+            'loot': loot == '1',
+            'product_guid': product_guid,
+            'loot_table_guid': loot_table_guid,
+            'min': int(min_num or 0),
+            'max': int(max_num or 0),
+        })
+    return entries
+
+def scan_asset(directory, base_name):
+    """
+    Reads one .asset/.asset.meta pair and extracts the metadata shared by the parsers.
+
+    Args:
+        directory (str): The path to the directory containing .meta and .asset files.
+        base_name (str): The asset filename without the .asset extension.
+
+    Returns:
+        dict: The metadata entry for the asset.
+    """
+    asset_path = os.path.join(directory, f"{base_name}.asset")
+    meta_path = f"{asset_path}.meta"
+    entry = {
+        'filename': base_name,
+        'guid': None,
+        'save_id': None,
+        'm_name': None,
+        'item_name': None,
+        'item_category': None,
+        'item_type': None,
+        'sections': [],
+        'production': [],
+        'asset_stamp': _file_stamp(asset_path),
+        'meta_stamp': _file_stamp(meta_path),
+    }
+
+    if entry['meta_stamp']:
+        with open(meta_path, 'r', encoding='utf-8') as file:
+            entry['guid'] = _search(guid_pattern, file.read())
+
+    if entry['asset_stamp']:
+        with open(asset_path, 'r', encoding='utf-8') as file:
+            data = file.read()
+        entry['save_id'] = _search(save_id_pattern, data)
+        entry['m_name'] = _search(m_name_pattern, data)
+        entry['item_name'] = _search(item_name_pattern, data)
+        entry['item_category'] = _search(category_pattern, data)
+        item_type = _search(item_type_pattern, data)
+        entry['item_type'] = int(item_type) if item_type else None
+        entry['sections'] = section_pattern.findall(data)
+        if 'machineProductionGuide' in entry['sections']:
+            entry['production'] = read_production_guide(data)
+
+    return entry
+
+def _read_cache(directory, cache_path):
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if cache.get('directory') != os.path.abspath(directory) or cache.get('version') != index_version:
+        return {}
+    return cache.get('entries', {})
+
+def _write_cache(directory, cache_path, index):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # Write to a temporary file and swap it in, since parallel stages may read the cache at any time
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump({'directory': os.path.abspath(directory), 'version': index_version, 'entries': index}, file)
+    os.replace(temp_path, cache_path)
+
+def _scan_assets(directory, base_names, jobs):
+    # Scans the assets, in a process pool when more than one job is asked for
+    if jobs <= 1 or len(base_names) <= 1:
+        return [scan_asset(directory, base_name) for base_name in base_names]
+    jobs = min(jobs, len(base_names))
+    # A few chunks per worker keeps the pool busy without a round trip per file
+    chunk_size = max(1, len(base_names) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(scan_asset, repeat(directory), base_names, chunksize=chunk_size))
+
+def load_asset_index(directory, cache_path=index_cache_path, jobs=1):
+    """
+    Builds the index of every .asset/.asset.meta pair in the directory, keyed by base filename.
+
+    Files are only read when they are new or their size/mtime changed since the cached index
+    was written, so the folder is scanned once per run no matter how many scripts use it.
+
+    Args:
+        directory (str): The path to the directory containing .meta and .asset files.
+        cache_path (str): Where to persist the index between scripts. None disables the cache.
+        jobs (int): Number of worker processes scanning the new or changed files.
+
+    Returns:
+        dict: Base filename -> metadata entry, in directory listing order.
+    """
+    key = os.path.abspath(directory)
+    if key in _loaded_indexes:
+        return _loaded_indexes[key]
+
+    cached = _read_cache(directory, cache_path)
+    index = {}
+    pending = []
+
+    for filename in os.listdir(directory):
+        if filename.endswith('.asset'):
+            base_name = filename[:-len('.asset')]
+        elif filename.endswith('.asset.meta'):
+            base_name = filename[:-len('.asset.meta')]
+        else:
+            continue
+        if base_name in index:
+            continue
+
+        asset_path = os.path.join(directory, f"{base_name}.asset")
+        entry = cached.get(base_name)
+        if (entry is None
+                or entry.get('asset_stamp') != _file_stamp(asset_path)
+                or entry.get('meta_stamp') != _file_stamp(f"{asset_path}.meta")):
+            pending.append(base_name)
+        index[base_name] = entry
+
+    # The entries are filled in afterwards, so the index keeps the directory listing order
+    for entry in _scan_assets(directory, pending, jobs):
+        index[entry['filename']] = entry
+
+    if cache_path and (pending or len(index) != len(cached)):
+        _write_cache(directory, cache_path, index)
+
+    _loaded_indexes[key] = index
+    return index
+
+def read_asset(directory, base_name):
+    with open(os.path.join(directory, f"{base_name}.asset"), 'r', encoding='utf-8') as file:
+        return file.read()
+
+# Query helpers
+def get_assets(index):
+    return [entry for entry in index.values() if entry['asset_stamp']]
+
+def get_assets_with_section(index, section):
+    return [entry for entry in get_assets(index) if section in entry['sections']]
+
+def get_assets_with_item_type(index, item_type):
+    return [entry for entry in get_assets(index) if entry['item_type'] == item_type]
+
+def get_assets_with_prefix(index, prefix):
+    return [entry for entry in get_assets(index) if entry['filename'].startswith(prefix)]
+
+def get_item_assets(index):
+    return [entry for entry in get_assets(index) if entry['save_id'] and 'item' in entry['save_id']]
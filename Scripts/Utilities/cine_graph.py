@@ -0,0 +1,198 @@
+# cine_graph.py
+
+from collections import deque
+from itertools import compress
+
+def build_graph(children_by_name):
+    """
+    Builds the graph of which cutscenes add which, and works out its roots, order and depths once.
+
+    Everything is computed without recursion, so long chains can't overflow the stack, and a cycle
+    is reported instead of looping forever.
+
+    Args:
+        children_by_name (dict): The cines each cine adds, keyed by cine name, e.g.
+                                 {'CineStartAnimals': ['CineRequestOceanKing']}. Children that have
+                                 no key of their own are added as cines without children.
+
+    Returns:
+        dict: {'children': the children of each cine, in their listed order without repeats,
+               'parents': the cines adding each cine,
+               'roots': the cines nothing adds, in the order of children_by_name,
+               'order': every cine outside a cycle, each after all the cines adding it,
+               'depths': the length of the longest chain of cines leading to each cine in 'order',
+               'cycles': each cycle as a list of cines, its first cine repeated at the end}
+    """
+    children = {}
+    for name, child_names in children_by_name.items():
+        children.setdefault(name, [])
+        seen = set(children[name])
+        for child in child_names:
+            children.setdefault(child, [])
+            if child not in seen:
+                seen.add(child)
+                children[name].append(child)
+
+    parents = {name: [] for name in children}
+    for name, child_names in children.items():
+        for child in child_names:
+            parents[child].append(name)
+
+    roots = [name for name in children if not parents[name]]
+
+    # Kahn's algorithm: a cine is ready once every cine adding it is placed, and its depth is one
+    # more than the deepest of them. Cines on or after a cycle never become ready.
+    waiting = {name: len(parents[name]) for name in children}
+    depths = {name: 0 for name in roots}
+    order = []
+    ready = deque(roots)
+    while ready:
+        name = ready.popleft()
+        order.append(name)
+        for child in children[name]:
+            depths[child] = max(depths.get(child, 0), depths[name] + 1)
+            waiting[child] -= 1
+            if waiting[child] == 0:
+                ready.append(child)
+
+    return {
+        'children': children,
+        'parents': parents,
+        'roots': roots,
+        'order': order,
+        'depths': {name: depths[name] for name in order},
+        'cycles': _find_cycles(children, set(order)),
+        '_reachable': {},
+    }
+
+def _find_cycles(children, ordered):
+    # Depth-first search over the cines Kahn's algorithm couldn't place, with an explicit stack.
+    # Each back edge to a cine on the current path closes one cycle.
+    cycles = []
+    visited = set()
+    for start in children:
+        if start in ordered or start in visited:
+            continue
+        path = [start]
+        on_path = {start}
+        stack = [iter(children[start])]
+        visited.add(start)
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                on_path.discard(path.pop())
+                stack.pop()
+                continue
+            if child in ordered:
+                continue
+            if child in on_path:
+                cycles.append(path[path.index(child):] + [child])
+            elif child not in visited:
+                visited.add(child)
+                path.append(child)
+                on_path.add(child)
+                stack.append(iter(children[child]))
+    return cycles
+
+# Turns the binary digits of a reachability set, lowest first, into 0 and 1 bytes for itertools.compress
+_digit_bytes = bytes.maketrans(b'01', b'\x00\x01')
+
+def _reachability(graph, links):
+    # Works out what every cine reaches through links, once for the whole graph. Each cine's set is
+    # an int with one bit per cine, built from its neighbours' sets in topological order: a cine's
+    # children come after it in 'order' and its parents before it, so they are always done first.
+    cache = graph['_reachable']
+    if links in cache:
+        return cache[links]
+    ordered = set(graph['order'])
+    names = graph['order'] + [name for name in graph['children'] if name not in ordered]
+    positions = {name: position for position, name in enumerate(names)}
+    reached = {}
+
+    # Cines on or after a cycle have no place in the order, so they are searched one by one
+    for name in names[len(ordered):]:
+        bits = 0
+        pending = [name]
+        while pending:
+            for linked in graph[links][pending.pop()]:
+                bit = 1 << positions[linked]
+                if not bits & bit:
+                    bits |= bit
+                    pending.append(linked)
+        # A cine on a cycle reaches itself, but isn't listed among its own descendants or ancestors
+        reached[name] = bits & ~(1 << positions[name])
+
+    for name in (reversed(graph['order']) if links == 'children' else graph['order']):
+        bits = 0
+        for linked in graph[links][name]:
+            bits |= (1 << positions[linked]) | reached[linked]
+        reached[name] = bits
+
+    cache[links] = {'names': names, 'bits': reached, 'lists': {}}
+    return cache[links]
+
+def _reachable(graph, name, links):
+    reachability = _reachability(graph, links)
+    lists = reachability['lists']
+    if name not in lists:
+        digits = format(reachability['bits'][name], 'b')[::-1].encode('ascii').translate(_digit_bytes)
+        lists[name] = list(compress(reachability['names'], digits))
+    return lists[name]
+
+def descendants(graph, name):
+    """
+    Returns every cine a cine leads to, directly or through others, in the order of graph['order'].
+
+    What every cine reaches is worked out once for the whole graph on the first query, and each
+    list is kept in the graph.
+    """
+    return _reachable(graph, name, 'children')
+
+def ancestors(graph, name):
+    """
+    Returns every cine leading to a cine, directly or through others, in the order of graph['order'].
+
+    Worked out once for the whole graph like descendants.
+    """
+    return _reachable(graph, name, 'parents')
+
+def walk(graph, start_names=None):
+    """
+    Walks the cines depth first from each root, the way a tree of them is printed, visiting each
+    cine's children once.
+
+    Args:
+        graph (dict): The result of build_graph.
+        start_names (list): The cines to start from, by default the roots. Cines that can't be
+                            reached from them, such as those only on a cycle, are walked afterwards.
+
+    Yields:
+        tuple: (cine name, depth in the walk, None the first time a cine is reached, 'repeat' when
+                its children were already walked, or 'cycle' when it leads back to itself)
+    """
+    children = graph['children']
+    walked = set()
+    for start in list(start_names if start_names is not None else graph['roots']) + list(children):
+        if start in walked:
+            continue
+        walked.add(start)
+        yield start, 0, None
+        path = {start}
+        stack = [(start, iter(children[start]))]
+        while stack:
+            name, child_names = stack[-1]
+            child = next(child_names, None)
+            if child is None:
+                path.discard(name)
+                stack.pop()
+                continue
+            depth = len(stack)
+            if child in path:
+                yield child, depth, 'cycle'
+            elif child in walked:
+                yield child, depth, 'repeat'
+            else:
+                walked.add(child)
+                yield child, depth, None
+                path.add(child)
+                stack.append((child, iter(children[child])))
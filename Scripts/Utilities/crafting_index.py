@@ -0,0 +1,143 @@
+# crafting_index.py
+
+import os
+import re
+from fractions import Fraction
+from Utilities import asset_index, file_manifest, guid_utils
+
+product_pattern = re.compile(r'itemToCraft:\s*\{fileID: \d+, guid: ([a-f0-9]{32}), type: \d+\}')
+yield_pattern = re.compile(r'purchaseBundleAmt:\s*(\d+)')
+materials_section_pattern = re.compile(r'craftMaterials:\n(.*?)(\n[a-zA-Z]|$)', re.DOTALL)
+material_pattern = re.compile(r'itemData:\s*\{fileID: \d+, guid: ([a-f0-9]{32}), type: \d+\}.*?amountOfItem:\s*(\d+)', re.DOTALL)
+
+def read_crafting_recipe(data):
+    """
+    Reads the product, yield and materials of a crafting recipe asset's text.
+
+    Args:
+        data (str): The text of a craft_ asset.
+
+    Returns:
+        dict: {'product_guid': the itemToCraft GUID, or '' when missing,
+               'yield': the purchaseBundleAmt text, '1' when missing,
+               'materials': [(material GUID, amount text)] in file order}
+    """
+    product_match = product_pattern.search(data)
+    yield_match = yield_pattern.search(data)
+    materials_section = materials_section_pattern.search(data)
+    materials = material_pattern.findall(materials_section.group(1)) if materials_section and materials_section.group(1) else []
+    return {
+        'product_guid': product_match.group(1) if product_match else "",
+        'yield': yield_match.group(1) if yield_match else '1',
+        'materials': materials,
+    }
+
+def read_crafting_recipe_file(file_path):
+    """
+    Reads a crafting recipe asset with read_crafting_recipe, the per-file step process_files caches.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return read_crafting_recipe(file.read())
+
+def build_crafting_index(input_directory, mappings, context=None):
+    """
+    Reads every crafting recipe once, with the names and categories of its product and materials resolved.
+
+    Names come from the GUID mappings and categories from the asset index, so no product asset
+    is opened. Recipes are also indexed by product and by material for constant-time lookups.
+
+    Args:
+        input_directory (str): The MonoBehaviour folder, e.g. 'Input/Assets/MonoBehaviour'.
+        mappings (dict): The GUID mappings from guid_utils.create_mappings.
+        context (dict): The run context; in an incremental run only recipes that changed are read again.
+
+    Returns:
+        dict: {'recipes': [{'filename': e.g. 'craft_bread.asset', 'product_guid',
+                            'product': its GUID lookup entry or {}, 'category': its itemCategory or 'unknown',
+                            'yield', 'materials': [{'guid', 'amount': int, 'entry': its GUID lookup entry or {}}]}]
+                   in directory listing order,
+               'by_product': the recipes making each item GUID,
+               'used_in': the recipes using each item GUID as a material}
+    """
+    index = asset_index.load_asset_index(input_directory)
+    recipes = []
+    by_product = {}
+    used_in = {}
+
+    assets = asset_index.get_assets_with_prefix(index, "craft_")
+    file_paths = [os.path.join(input_directory, f"{asset['filename']}.asset") for asset in assets]
+    read_recipes = file_manifest.process_files(context, 'crafting_index', file_paths, read_crafting_recipe_file,
+                                               salt=file_manifest.source_salt(__file__))
+
+    for asset, recipe in zip(assets, read_recipes):
+        # A copy, since the cached result must not be changed
+        recipe = dict(recipe)
+
+        product = guid_utils.get_entry_from_guid(recipe['product_guid'], mappings, {})
+        product_asset = index.get(product.get('filename', ''))
+        category = 'unknown'
+        if product_asset and product_asset['asset_stamp']:
+            category = product_asset['item_category'] or 'unknown'
+
+        recipe.update({
+            'filename': f"{asset['filename']}.asset",
+            'product': product,
+            'category': category,
+            'materials': [{'guid': guid, 'amount': int(amount), 'entry': guid_utils.get_entry_from_guid(guid, mappings, {})}
+                          for guid, amount in recipe['materials']],
+        })
+        recipes.append(recipe)
+        by_product.setdefault(recipe['product_guid'], []).append(recipe)
+        for material in recipe['materials']:
+            recipe_list = used_in.setdefault(material['guid'], [])
+            if not recipe_list or recipe_list[-1] is not recipe:
+                recipe_list.append(recipe)
+
+    return {'recipes': recipes, 'by_product': by_product, 'used_in': used_in, '_raw_materials': {}}
+
+def get_used_in(crafting_index, item_guid):
+    """
+    Returns the recipes using an item as a material, without scanning the recipes.
+    """
+    return crafting_index['used_in'].get(item_guid, [])
+
+def _raw_materials(crafting_index, item_guid, path):
+    cache = crafting_index['_raw_materials']
+    if item_guid in cache:
+        return cache[item_guid]
+
+    recipes = crafting_index['by_product'].get(item_guid)
+    if not recipes or item_guid in path:
+        return {item_guid: Fraction(1)}
+
+    path.add(item_guid)
+    recipe = recipes[0]
+    batch = int(recipe['yield']) or 1
+    totals = {}
+    for material in recipe['materials']:
+        for raw_guid, amount in _raw_materials(crafting_index, material['guid'], path).items():
+            totals[raw_guid] = totals.get(raw_guid, 0) + Fraction(material['amount'], batch) * amount
+    path.discard(item_guid)
+
+    # A result cut short by a loop back to an item still being worked out depends on where the
+    # walk started, so only complete results are kept
+    if not any(raw_guid in path for raw_guid in totals):
+        cache[item_guid] = totals
+    return totals
+
+def raw_materials(crafting_index, item_guid):
+    """
+    Works out the raw materials needed for one of an item, following crafted materials down to
+    items that can't be crafted. An item with several recipes is made with its first one.
+
+    Results are kept in the index, so every item is worked out once however many recipes use it.
+    A material leading back to an item being worked out is counted as raw, instead of looping forever.
+
+    Args:
+        crafting_index (dict): The result of build_crafting_index.
+        item_guid (str): The item's GUID.
+
+    Returns:
+        dict: {raw material GUID: Fraction amount per item}; an item that can't be crafted is its own raw material.
+    """
+    return _raw_materials(crafting_index, item_guid, set())
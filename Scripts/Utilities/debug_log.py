@@ -0,0 +1,104 @@
+# debug_log.py
+
+import atexit
+import os
+
+# Messages below the current level are dropped. TRACE adds full dumps of file contents and
+# mappings, OFF writes no debug files at all.
+levels = {
+    'TRACE': 5,
+    'DEBUG': 10,
+    'ERROR': 40,
+    'OFF': 100,
+}
+log_level = levels['DEBUG']
+
+# Debug files are written through one buffered handle each, flushed when the stage ends
+buffer_size = 1 << 16
+_handles = {}
+
+def set_level(level_name):
+    """
+    Sets the level of the debug messages to keep, one of the names in levels.
+    """
+    global log_level
+    log_level = levels[level_name.upper()]
+
+def is_enabled(level='DEBUG'):
+    """
+    Checks whether messages of a level are written, so costly messages can be skipped before building them.
+    """
+    return levels[level] >= log_level
+
+def _get_handle(file_path, mode='a'):
+    handle = _handles.get(file_path)
+    if handle is None:
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        handle = _handles[file_path] = open(file_path, mode, encoding='utf-8', buffering=buffer_size)
+    return handle
+
+def log(file_path, message, level='DEBUG'):
+    """
+    Appends a line to a debug file.
+
+    Args:
+        file_path (str): The debug file, e.g. '.hidden/debug_output/loot_table_debug.txt'.
+        message (str): The line to write, without the newline.
+        level (str): 'TRACE' for dumps of whole files or mappings, 'DEBUG' for progress and
+                     'ERROR' for failures.
+    """
+    if levels[level] >= log_level:
+        _get_handle(file_path).write(message + '\n')
+
+def clear_log(file_path):
+    """
+    Empties a debug file at the start of a stage. Nothing is created when debug output is OFF.
+    """
+    handle = _handles.pop(file_path, None)
+    if handle is not None:
+        handle.close()
+    if log_level < levels['OFF']:
+        _get_handle(file_path, 'w')
+
+class _LogFile:
+    """
+    The file-like view of a debug file returned by open_log.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        # The handle stays open for the rest of the stage
+        return False
+
+    def write(self, text, level='DEBUG'):
+        if levels[level] >= log_level:
+            _get_handle(self.file_path).write(text)
+
+def open_log(file_path, append=False):
+    """
+    Opens a debug file for code that writes to it like a file, through the shared buffered handle.
+
+    Args:
+        file_path (str): The debug file.
+        append (bool): Keep what the stage already logged, instead of starting an empty file.
+
+    Returns:
+        _LogFile: An object with write(text, level='DEBUG'), usable in a with statement.
+    """
+    if not append:
+        clear_log(file_path)
+    return _LogFile(file_path)
+
+def close_all():
+    """
+    Flushes and closes every debug file, so their content is complete on disk.
+    """
+    while _handles:
+        _handles.popitem()[1].close()
+
+atexit.register(close_all)
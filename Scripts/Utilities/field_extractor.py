@@ -0,0 +1,63 @@
+# field_extractor.py
+
+import re
+
+_field_patterns = {}
+_value_patterns = {}
+
+def _get_field_pattern(field_name, top_level):
+    key = (field_name, top_level)
+    pattern = _field_patterns.get(key)
+    if pattern is None:
+        # Each pattern starts with a literal, so the regex engine finds it with a fast substring scan.
+        # That beats one combined pattern of all the names, which has to be tried at every line.
+        prefix = r'\n  ' if top_level else ''
+        pattern = _field_patterns[key] = re.compile(rf'{prefix}{re.escape(field_name)}:[ \t]*([^\n]*)')
+    return pattern
+
+def extract_fields(content, field_names, top_level=False):
+    """
+    Pulls the scalar values of several keys out of an asset's text without parsing the YAML.
+
+    Each key is searched for once with a precompiled pattern, and only its first occurrence is kept,
+    matching what a re.search(r'key:\s*(...)') per field would find.
+
+    Args:
+        content (str): The text of the asset.
+        field_names (iterable): The keys to look for, e.g. ['itemType', 'buyValue'].
+        top_level (bool): Only match the MonoBehaviour's own keys, not keys nested in lists or mappings.
+
+    Returns:
+        dict: The raw value text of each key that was found, keyed by field name.
+    """
+    found = {}
+    for field_name in field_names:
+        match = _get_field_pattern(field_name, top_level).search(content)
+        if match:
+            found[field_name] = match.group(1).rstrip()
+    return found
+
+def get_match(fields, field_name, value_pattern=r'\d+'):
+    """
+    Returns the leading part of a field's value that matches value_pattern, or None.
+
+    Args:
+        fields (dict): The result of extract_fields.
+        field_name (str): The key to read.
+        value_pattern (str): The expected form of the value, by default an unsigned integer.
+    """
+    value = fields.get(field_name)
+    if value is None:
+        return None
+    compiled = _value_patterns.get(value_pattern)
+    if compiled is None:
+        compiled = _value_patterns[value_pattern] = re.compile(value_pattern)
+    match = compiled.match(value)
+    return match.group(0) if match else None
+
+def get_int(fields, field_name, default=0, signed=False):
+    """
+    Returns a field's value as an int, or default when it is missing or not a number.
+    """
+    value = get_match(fields, field_name, r'-?\d+' if signed else r'\d+')
+    return int(value) if value is not None else default
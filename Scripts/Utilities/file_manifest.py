@@ -0,0 +1,226 @@
+# file_manifest.py
+
+import bisect
+import fnmatch
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from Utilities import debug_log
+
+# Content hashes of the input files, and the input fingerprint of every stage at its last run
+manifest_path = '.hidden/file_manifest.json'
+# Cached per-file results of the parsers, one JSON file per stage
+results_directory = '.hidden/incremental'
+
+# The files that change between patches: every asset and meta file, and the localisation text files
+tracked_files = [
+    ('Input/Assets/MonoBehaviour', ['*.asset', '*.asset.meta']),
+    ('Input/Assets/TextAsset', ['English_*.txt']),
+]
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file and swap it in, since parallel stages may read it at any time
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    os.replace(temp_path, path)
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+def hash_file(file_path):
+    """
+    Returns the SHA-1 hex digest of a file's content, or None if it can't be read.
+    """
+    digest = hashlib.sha1()
+    try:
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+def get_source_paths(script_path):
+    """
+    Lists the source files a parser's results depend on: the script itself and every Utilities module.
+
+    Args:
+        script_path (str): The parser's path, e.g. its __file__.
+
+    Returns:
+        list: The paths, relative to the working directory.
+    """
+    utilities_directory = os.path.dirname(os.path.abspath(__file__))
+    utility_paths = sorted(os.path.join(utilities_directory, filename) for filename in os.listdir(utilities_directory)
+                           if filename.endswith('.py'))
+    return [os.path.relpath(path) for path in [script_path] + utility_paths]
+
+def source_salt(script_path):
+    """
+    Returns a digest of a parser's source files, the salt for process_files.
+
+    A change to the script or to any Utilities module it may call then re-processes every file,
+    the same way run_parser.py reruns the stage.
+    """
+    digest = hashlib.sha1()
+    for path in get_source_paths(script_path):
+        digest.update(f"{os.path.basename(path)}:{hash_file(path)}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def load_manifest(path=manifest_path):
+    manifest = _read_json(path) or {}
+    manifest.setdefault('files', {})
+    manifest.setdefault('stages', {})
+    return manifest
+
+def save_manifest(manifest, path=manifest_path):
+    _write_json(path, manifest)
+
+def update_file_hashes(manifest):
+    """
+    Re-hashes the tracked input files and stores the hashes in the manifest.
+
+    A file is only read again when its size or mtime changed since the manifest was written.
+
+    Args:
+        manifest (dict): The manifest from load_manifest, updated in place.
+
+    Returns:
+        set: The paths that were added, changed or removed since the previous manifest.
+    """
+    previous = manifest['files']
+    files = {}
+    for folder, patterns in tracked_files:
+        if not os.path.isdir(folder):
+            continue
+        for filename in os.listdir(folder):
+            if not any(fnmatch.fnmatch(filename, pattern) for pattern in patterns):
+                continue
+            path = os.path.normpath(os.path.join(folder, filename))
+            stamp = _file_stamp(path)
+            entry = previous.get(path)
+            if entry and entry['stamp'] == stamp:
+                files[path] = entry
+            else:
+                files[path] = {'hash': hash_file(path), 'stamp': stamp}
+
+    changed = {
+        path for path in files.keys() | previous.keys()
+        if files.get(path, {}).get('hash') != previous.get(path, {}).get('hash')
+    }
+    manifest['files'] = files
+    return changed
+
+def get_file_hash(manifest, file_path):
+    """
+    Returns the content hash of a file, from the manifest when it is a tracked input file.
+    """
+    entry = manifest['files'].get(os.path.normpath(file_path))
+    return entry['hash'] if entry else hash_file(file_path)
+
+def fingerprint(manifest, paths):
+    """
+    Combines the content hashes of every file under the given paths into a single digest.
+
+    Folders cover the tracked files inside them; other files are hashed directly, and missing
+    ones still count, so creating or deleting them changes the fingerprint.
+
+    Args:
+        manifest (dict): The manifest, after update_file_hashes.
+        paths (list): The files and folders a stage reads.
+
+    Returns:
+        str: The hex digest of the inputs.
+    """
+    tracked_paths = sorted(manifest['files'])
+    digest = hashlib.sha1()
+    for path in sorted(os.path.normpath(path) for path in paths):
+        if os.path.isdir(path):
+            # The tracked files in a folder form one contiguous run of the sorted paths
+            start = bisect.bisect_left(tracked_paths, path + os.sep)
+            end = bisect.bisect_left(tracked_paths, path + chr(ord(os.sep) + 1))
+            for tracked_path in tracked_paths[start:end]:
+                digest.update(f"{tracked_path}:{manifest['files'][tracked_path]['hash']}\n".encode('utf-8'))
+        else:
+            digest.update(f"{path}:{get_file_hash(manifest, path)}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def _get_context_manifest(context):
+    if context.get('manifest') is None:
+        context['manifest'] = load_manifest()
+    return context['manifest']
+
+def _init_worker(debug_level):
+    debug_log.log_level = debug_level
+
+def _map(process_file, file_paths, jobs):
+    # Runs process_file on each file, in a process pool when more than one job is asked for
+    if jobs <= 1 or len(file_paths) <= 1:
+        return [process_file(file_path) for file_path in file_paths]
+    jobs = min(jobs, len(file_paths))
+    # A few chunks per worker keeps the pool busy without a round trip per file
+    chunk_size = max(1, len(file_paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(debug_log.log_level,)) as executor:
+        return list(executor.map(process_file, file_paths, chunksize=chunk_size))
+
+def process_files(context, stage_name, file_paths, process_file, salt='', jobs=1):
+    """
+    Runs process_file on each file, reusing the cached result of every file whose content is unchanged.
+
+    Results are only cached in an incremental run; otherwise every file is processed. A cached result
+    is reused when both the file's hash and the salt match, so callers pass the hash of anything else
+    the result depends on, such as source_salt of the parser's own source.
+
+    With more than one job the files are processed in a process pool, so process_file must be a
+    module-level function, and anything it logs should go into its result rather than a debug file
+    the other workers also write to.
+
+    Args:
+        context (dict): The run context, or None when a script runs on its own.
+        stage_name (str): The name the results are cached under.
+        file_paths (list): The files to process.
+        process_file (function): Takes a file path and returns a JSON-serializable result.
+        salt (str): Extra state the results depend on.
+        jobs (int): The number of worker processes.
+
+    Returns:
+        list: The result for each file, in the order of file_paths.
+    """
+    if not context or not context.get('incremental'):
+        return _map(process_file, file_paths, jobs)
+
+    manifest = _get_context_manifest(context)
+    results_path = os.path.join(results_directory, f"{stage_name}.json")
+    cached = _read_json(results_path) or {}
+
+    entries = {}
+    pending = []
+    for file_path in file_paths:
+        key = os.path.normpath(file_path)
+        file_hash = get_file_hash(manifest, file_path)
+        entry = cached.get(key)
+        if not entry or entry['hash'] != file_hash or entry['salt'] != salt:
+            entry = {'hash': file_hash, 'salt': salt, 'result': None}
+            pending.append(file_path)
+        entries[key] = entry
+
+    for file_path, result in zip(pending, _map(process_file, pending, jobs)):
+        entries[os.path.normpath(file_path)]['result'] = result
+
+    # Only the files seen in this run are kept, so removed assets drop out of the cache
+    _write_json(results_path, entries)
+    return [entries[os.path.normpath(file_path)]['result'] for file_path in file_paths]
@@ -0,0 +1,96 @@
+# guid_store.py
+
+import os
+import sqlite3
+from Utilities import guid_utils
+
+# The fields of a GUID lookup entry, in the order guid_mapper.py writes them
+columns = ['guid', 'filename', 'save_id', 'name', 'category']
+
+def get_store_path(guid_lookup_path):
+    """
+    Returns where the SQLite copy of a GUID lookup is kept, e.g. 'Output/guid_lookup.sqlite'.
+    """
+    return f"{os.path.splitext(guid_lookup_path)[0]}.sqlite"
+
+def save_guid_store(lookup_data, file_path):
+    """
+    Writes the GUID lookup entries to an SQLite file, indexed by guid, save_id and filename.
+
+    Each row records which fields its entry has, so an entry without a name comes back without
+    one rather than with a None name. The file is written next to its final path and swapped in,
+    since parallel stages may open it at any time.
+
+    Args:
+        lookup_data (list): The GUID lookup entries.
+        file_path (str): Where to write the store, e.g. 'Output/guid_lookup.sqlite'.
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    connection = sqlite3.connect(temp_path)
+    try:
+        connection.execute("CREATE TABLE entries (position INTEGER PRIMARY KEY, fields INTEGER, guid TEXT, filename TEXT, save_id TEXT, name TEXT, category TEXT)")
+        rows = []
+        for position, entry in enumerate(lookup_data):
+            fields = sum(1 << bit for bit, column in enumerate(columns) if column in entry)
+            rows.append((position, fields, *(entry.get(column) for column in columns)))
+        connection.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        # The indexes are built after the rows are in, which is quicker than keeping them up to date
+        connection.executescript("""
+            CREATE INDEX entries_guid ON entries (guid);
+            CREATE INDEX entries_save_id ON entries (save_id);
+            CREATE INDEX entries_filename ON entries (filename);
+        """)
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(temp_path, file_path)
+
+def open_guid_store(guid_lookup_path):
+    """
+    Opens the SQLite copy of a GUID lookup read-only, without loading any of its entries.
+
+    The copy is rebuilt from the JSON first when it is missing or older than the JSON, e.g. after
+    the JSON was replaced by hand.
+
+    Args:
+        guid_lookup_path (str): The path to guid_lookup.json.
+
+    Returns:
+        sqlite3.Connection: The store, for the get_ functions of this module.
+    """
+    store_path = get_store_path(guid_lookup_path)
+    if not os.path.exists(store_path) or os.path.getmtime(store_path) < os.path.getmtime(guid_lookup_path):
+        save_guid_store(guid_utils.load_guid_lookup(guid_lookup_path), store_path)
+    return sqlite3.connect(f"file:{os.path.abspath(store_path)}?mode=ro", uri=True)
+
+def _entry(row):
+    fields, values = row[0], row[1:]
+    return {column: value for bit, (column, value) in enumerate(zip(columns, values)) if fields & (1 << bit)}
+
+def _first(store, column, value, default):
+    # The first entry wins, matching guid_utils.create_mappings
+    row = store.execute(f"SELECT fields, {', '.join(columns)} FROM entries WHERE {column} = ? ORDER BY position LIMIT 1", (value,)).fetchone()
+    return _entry(row) if row else default
+
+def get_entry_from_guid(guid, store, default=None):
+    return _first(store, 'guid', guid, default)
+
+def get_entry_from_save_id(save_id, store, default=None):
+    return _first(store, 'save_id', save_id, default)
+
+def get_entry_from_filename(filename, store, default=None):
+    return _first(store, 'filename', filename, default)
+
+def get_entries_with_save_id_prefix(prefix, store):
+    """
+    Returns the entries whose save_id starts with a prefix, e.g. 'npc_', in lookup order.
+    """
+    # A range of the save_id index, since LIKE would treat the _ of the prefix as a wildcard
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    rows = store.execute(f"SELECT fields, {', '.join(columns)} FROM entries WHERE save_id >= ? AND save_id < ? ORDER BY position",
+                         (prefix, upper)).fetchall()
+    return [_entry(row) for row in rows]
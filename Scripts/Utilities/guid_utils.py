@@ -14,6 +14,10 @@ def create_mappings(lookup_data):
     save_id_to_name = {}
     filename_to_name = {}
     filename_to_guid = {}
+    # Whole lookup entries, indexed for O(1) access. The first entry wins, matching a linear scan.
+    guid_to_entry = {}
+    save_id_to_entry = {}
+    filename_to_entry = {}
 
     for entry in lookup_data:
         guid = entry.get('guid')
@@ -34,6 +38,13 @@ def create_mappings(lookup_data):
             filename_to_name[filename] = name
             filename_to_guid[filename] = guid
 
+        if guid:
+            guid_to_entry.setdefault(guid, entry)
+        if save_id:
+            save_id_to_entry.setdefault(save_id, entry)
+        if filename:
+            filename_to_entry.setdefault(filename, entry)
+
     return {
         'guid_to_filename': guid_to_filename,
         'guid_to_save_id': guid_to_save_id,
@@ -42,6 +53,9 @@ def create_mappings(lookup_data):
         'save_id_to_name': save_id_to_name,
         'filename_to_name': filename_to_name,
         'filename_to_guid': filename_to_guid,
+        'guid_to_entry': guid_to_entry,
+        'save_id_to_entry': save_id_to_entry,
+        'filename_to_entry': filename_to_entry,
     }
 
 # Existing functions for getting information
@@ -65,3 +79,14 @@ def get_name_from_filename(filename, mappings):
 
 def get_guid_from_filename(filename, mappings):
     return mappings['filename_to_guid'].get(filename, 'Unknown')
+
+
+# Full entry lookups, for scripts that need more than one field of an entry
+def get_entry_from_guid(guid, mappings, default=None):
+    return mappings['guid_to_entry'].get(guid, default)
+
+def get_entry_from_save_id(save_id, mappings, default=None):
+    return mappings['save_id_to_entry'].get(save_id, default)
+
+def get_entry_from_filename(filename, mappings, default=None):
+    return mappings['filename_to_entry'].get(filename, default)
@@ -0,0 +1,54 @@
+# item_references.py
+
+import re
+
+# The sections of an NPC asset listing the items it loves, likes, is neutral towards or dislikes
+gift_sections = {
+    'itemsLoveOverride': 'love',
+    'itemsLikeOverride': 'like',
+    'itemsNeutralOverride': 'neutral',
+    'itemsDislikeOverride': 'dislike',
+}
+gift_section_pattern = re.compile(r'^  (\w+):[ \t]*\n((?:  - .*\n?)*)', re.MULTILINE)
+reference_guid_pattern = re.compile(r'guid: ([a-f0-9]{32})')
+request_pattern = re.compile(r'itemData: \{fileID: \d+, guid: ([a-f0-9]+), type: \d+\}\s+amtRangeOfItem:\s+minimumNum: (\d+)\s+maxiumNum: (\d+)')
+npc_emailer_pattern = re.compile(r'npcEmailer:\s*\{fileID: \d+, guid: ([a-f0-9]{32}), type: \d+\}')
+attachment_pattern = re.compile(r'itemData:\s*\{fileID: \d+, guid: ([a-f0-9]{32}), type: \d+\}.*?amountOfItem:\s*(\d+)', re.DOTALL)
+
+def read_gift_overrides(data):
+    """
+    Reads the gift overrides of an NPC asset's text.
+
+    GUIDs are read as text, so an all-digit GUID keeps its leading zeros, which YAML would drop.
+
+    Returns:
+        list: [(preference, item GUID)], e.g. ('love', '...'), in file order.
+    """
+    overrides = []
+    for section, block in gift_section_pattern.findall(data):
+        if section in gift_sections:
+            overrides.extend((gift_sections[section], guid) for guid in reference_guid_pattern.findall(block))
+    return overrides
+
+def read_item_requests(data):
+    """
+    Reads the items a bulletin board request asks for from an asset's text.
+
+    Returns:
+        list: [(item GUID, minimum amount, maximum amount)], amounts as text, in file order.
+    """
+    return request_pattern.findall(data)
+
+def read_email(data):
+    """
+    Reads who sends an email and what is attached to it from the email asset's text.
+
+    Returns:
+        dict: {'npc_emailer': the NPC's GUID, or None,
+               'attachments': [(item GUID, amount as text)] in file order}
+    """
+    npc_emailer_match = npc_emailer_pattern.search(data)
+    return {
+        'npc_emailer': npc_emailer_match.group(1) if npc_emailer_match else None,
+        'attachments': attachment_pattern.findall(data),
+    }
@@ -0,0 +1,222 @@
+# loot_graph.py
+
+import os
+from Utilities import asset_cache, asset_index, guid_utils
+
+def load_loot_tables(input_directory, mappings):
+    """
+    Creates the set of loot tables of an asset folder, each read on first use and kept for the run.
+
+    Args:
+        input_directory (str): The MonoBehaviour folder, e.g. 'Input/Assets/MonoBehaviour'.
+        mappings (dict): The GUID mappings from guid_utils.create_mappings, to follow nested tables.
+
+    Returns:
+        dict: The state passed to the other functions of this module.
+    """
+    return {
+        'directory': input_directory,
+        'mappings': mappings,
+        'tables': {},
+        'expanded': {},
+        'cycles': [],
+    }
+
+def find_loot_table_files(input_directory, jobs=1):
+    """
+    Lists the assets of a folder that have a loot table, without parsing any of them.
+
+    The asset index already records each asset's top-level lists and mappings from a text scan, so
+    an asset is listed when its m_Name is set and it has a lootTable key, including an empty
+    `lootTable: []`. This is the list loot_table_generator writes to loot_table_list.txt.
+
+    Args:
+        input_directory (str): The MonoBehaviour folder, e.g. 'Input/Assets/MonoBehaviour'.
+        jobs (int): Number of worker processes scanning assets that aren't indexed yet.
+
+    Returns:
+        list: The asset filenames, e.g. ['LootTable_Ore.asset'], in the listing order of the .asset files.
+    """
+    index = asset_index.load_asset_index(input_directory, jobs=jobs)
+    loot_table_files = {f"{entry['filename']}.asset" for entry in asset_index.get_assets_with_section(index, 'lootTable')
+                        if entry['m_name'] is not None}
+    # The index is ordered by the first of each asset's .asset and .meta files to be listed
+    return [filename for filename in os.listdir(input_directory) if filename in loot_table_files]
+
+def read_loot_table(data):
+    """
+    Reads the lootTable list of a parsed asset into plain entries.
+
+    Args:
+        data (dict): The asset from asset_cache.load_asset.
+
+    Returns:
+        dict: {'name': its m_Name or 'unknown_loot_table',
+               'entries': [{'is_loot_table': whether it rolls a nested table,
+                            'item_guid': the GUID of the item to drop, '0' for nothing,
+                            'table_guid': the GUID of the nested table, or None,
+                            'percentChance', 'min', 'max': the values as written}]},
+        or None when its lootTable isn't a list, such as a reference to another asset's table.
+    """
+    mono_behaviour = data.get('MonoBehaviour', {})
+    loot_table = mono_behaviour.get('lootTable', [])
+    if not isinstance(loot_table, list):
+        return None
+    entries = []
+    for entry in loot_table:
+        amount = entry.get('amtToGive', {})
+        entries.append({
+            'is_loot_table': entry.get('loot', 0) == 1,
+            'item_guid': entry.get('itemToDrop', {}).get('guid', '0'),
+            'table_guid': (entry.get('lootTable') or {}).get('guid'),
+            'percentChance': entry.get('percentChance', 0),
+            'min': amount.get('minimumNum', 0),
+            'max': amount.get('maxiumNum', 0),
+        })
+    return {'name': mono_behaviour.get('m_Name', 'unknown_loot_table'), 'entries': entries}
+
+def roll_chances(entries, independent=False):
+    """
+    Returns the chance of each entry of a table dropping on one roll, the roll model expand, the
+    expected drops of loot_yield and loot_simulation all use.
+
+    By default one entry is picked per roll: chances adding up to less than 100% leave room for
+    nothing, and chances adding up to more are scaled down to add up to 100%. With independent,
+    every entry is rolled on its own at its percentChance.
+
+    Args:
+        entries (list): The entries of a table from read_loot_table.
+        independent (bool): Roll every entry on its own, instead of picking one entry per roll.
+
+    Returns:
+        list: The chance of each entry, from 0 to 1.
+    """
+    chances = [entry['percentChance'] / 100.0 for entry in entries]
+    total = sum(chances)
+    if not independent and total > 1.0:
+        chances = [chance / total for chance in chances]
+    return chances
+
+def mean_amount(entry):
+    """
+    Returns the average amount an entry gives when it drops.
+
+    Amounts are drawn from minimumNum to maxiumNum, so on average the middle of the range;
+    a maximum below the minimum always gives the minimum.
+    """
+    return (entry['min'] + max(entry['min'], entry['max'])) / 2.0
+
+def get_table(loot_tables, filename):
+    """
+    Returns the loot table of an asset, e.g. 'LootTable_Ore' or 'LootTable_Ore.asset', or None when
+    the file doesn't exist or has no list of loot entries.
+    """
+    if filename.endswith('.asset'):
+        filename = filename[:-len('.asset')]
+    tables = loot_tables['tables']
+    if filename not in tables:
+        asset_file_path = os.path.join(loot_tables['directory'], f"{filename}.asset")
+        tables[filename] = read_loot_table(asset_cache.load_asset(asset_file_path)) if os.path.exists(asset_file_path) else None
+    return tables[filename]
+
+def get_table_by_guid(loot_tables, guid):
+    """
+    Returns the loot table an entry's lootTable GUID points to, or None when it can't be found.
+    """
+    filename = guid_utils.get_entry_from_guid(guid, loot_tables['mappings'], {}).get('filename', '')
+    return get_table(loot_tables, filename) if filename else None
+
+def expand(loot_tables, filename):
+    """
+    Returns every item a loot table can drop, with the nested tables it rolls replaced by their items.
+
+    Chances follow roll_chances, so they match the expected drops of loot_yield and loot_simulation.
+    The chance of an item inside a nested table is multiplied by the chance of rolling that table,
+    and its amounts by the number of times the table is rolled: min by the fewest rolls, max by the
+    most, and mean by the average number of rolls, since the rolls and the amounts of each roll are
+    drawn independently. So the sum of chance * mean of an item's drops is its expected amount per
+    roll from loot_yield.expected_drops.
+
+    Each table is expanded once, and the same list is returned to every caller, so it must not be
+    modified. A table that leads back to itself is left out where it repeats, and recorded in
+    loot_tables['cycles'].
+
+    Args:
+        loot_tables (dict): The result of load_loot_tables.
+        filename (str): The loot table's asset filename.
+
+    Returns:
+        list: [{'item_guid': the item's GUID, '0' for nothing,
+                'chance': the chance of the drop, from 0 to 1,
+                'min', 'max': the amounts it drops,
+                'mean': the average amount it drops, see mean_amount,
+                'tables': the names of the tables it comes through, outermost first}]
+    """
+    if filename.endswith('.asset'):
+        filename = filename[:-len('.asset')]
+    expanded = loot_tables['expanded']
+    if filename in expanded:
+        return expanded[filename]
+
+    # Tables are expanded children first with an explicit stack, so deep nesting can't overflow it
+    in_progress = []
+    stack = [filename]
+    while stack:
+        current = stack[-1]
+        if current in expanded:
+            stack.pop()
+            continue
+        table = get_table(loot_tables, current)
+        if table is None:
+            expanded[current] = []
+            stack.pop()
+            continue
+
+        if current not in in_progress:
+            in_progress.append(current)
+            pending = [nested for nested in _nested_filenames(loot_tables, table) if nested not in expanded and nested not in in_progress]
+            if pending:
+                stack.extend(pending)
+                continue
+
+        drops = []
+        for entry, chance in zip(table['entries'], roll_chances(table['entries'])):
+            if not entry['is_loot_table']:
+                drops.append({'item_guid': entry['item_guid'], 'chance': chance, 'min': entry['min'], 'max': entry['max'],
+                              'mean': mean_amount(entry), 'tables': [table['name']]})
+                continue
+            nested = get_nested_filename(loot_tables, entry)
+            if nested in in_progress:
+                loot_tables['cycles'].append(in_progress[in_progress.index(nested):] + [nested])
+                continue
+            for drop in expanded.get(nested, []):
+                drops.append({
+                    'item_guid': drop['item_guid'],
+                    'chance': chance * drop['chance'],
+                    'min': entry['min'] * drop['min'],
+                    'max': entry['max'] * drop['max'],
+                    'mean': mean_amount(entry) * drop['mean'],
+                    'tables': [table['name']] + drop['tables'],
+                })
+        expanded[current] = drops
+        in_progress.remove(current)
+        stack.pop()
+
+    return expanded[filename]
+
+def get_nested_filename(loot_tables, entry):
+    """
+    Returns the asset filename of the table a nested entry rolls, or None when it can't be found.
+    """
+    if not entry['table_guid']:
+        return None
+    return guid_utils.get_entry_from_guid(entry['table_guid'], loot_tables['mappings'], {}).get('filename') or None
+
+def _nested_filenames(loot_tables, table):
+    nested = []
+    for entry in table['entries']:
+        if entry['is_loot_table']:
+            filename = get_nested_filename(loot_tables, entry)
+            if filename and filename not in nested:
+                nested.append(filename)
+    return nested
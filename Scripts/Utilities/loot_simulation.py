@@ -0,0 +1,105 @@
+# loot_simulation.py
+
+from Utilities import loot_graph
+
+# Sampling millions of rolls needs NumPy's vectorized random numbers; without it the simulator reports an error
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# How many rolls are sampled at once, larger batches are faster but need more memory
+batch_rolls = 1 << 20
+# The percentiles reported for the amount of each item per run of rolls
+percentiles = [5, 50, 95]
+
+def _roll(loot_tables, filename, sample_ids, sample_count, rng, totals, path, independent):
+    # Rolls a table once for every entry of sample_ids, adding the items to the totals of those samples
+    table = loot_graph.get_table(loot_tables, filename)
+    if table is None or not len(sample_ids) or not table['entries']:
+        return
+    entries = table['entries']
+    # The same roll model as the expected drops, see loot_graph.roll_chances
+    chances = np.array(loot_graph.roll_chances(entries, independent), dtype=float)
+
+    if independent:
+        # Every entry is rolled on its own
+        selections = [sample_ids[rng.random(len(sample_ids)) < chance] for chance in chances]
+    else:
+        # One entry is picked per roll, chances adding up to less than 100% leave room for nothing
+        picks = np.searchsorted(np.cumsum(chances), rng.random(len(sample_ids)), side='right')
+        selections = [sample_ids[picks == position] for position in range(len(entries))]
+
+    for entry, selected in zip(entries, selections):
+        if not len(selected):
+            continue
+        amounts = rng.integers(entry['min'], max(entry['min'], entry['max']) + 1, size=len(selected))
+        if entry['is_loot_table']:
+            nested = loot_graph.get_nested_filename(loot_tables, entry)
+            # A table that leads back to itself is cut where it repeats, like loot_graph.expand
+            if nested and nested not in path:
+                _roll(loot_tables, nested, np.repeat(selected, amounts), sample_count, rng, totals, path + [nested], independent)
+        elif entry['item_guid'] != '0':
+            counts = np.bincount(selected, weights=amounts, minlength=sample_count).astype(np.int64)
+            if entry['item_guid'] in totals:
+                totals[entry['item_guid']] += counts
+            else:
+                totals[entry['item_guid']] = counts
+
+def simulate_table(loot_tables, filename, rolls, samples, seed=None, independent=False):
+    """
+    Rolls a loot table many times, to see how many of each item a number of rolls gives.
+
+    Each sample is a run of rolls of the table, e.g. 100 kills of an enemy, and many samples give
+    the spread of the amounts. Rolls are drawn in large vectorized batches, nested tables included.
+
+    Args:
+        loot_tables (dict): The result of loot_graph.load_loot_tables.
+        filename (str): The loot table's asset filename.
+        rolls (int): The number of rolls in each sample.
+        samples (int): The number of samples.
+        seed: The seed of the random numbers, e.g. an int or a list of ints; the same seed gives the same results.
+        independent (bool): Roll every entry on its own, instead of picking one entry per roll.
+
+    Returns:
+        dict: The amount of each item in each sample, as an array of samples, keyed by item GUID.
+    """
+    rng = np.random.default_rng(seed)
+    totals = {}
+    samples_per_batch = max(1, batch_rolls // max(1, rolls))
+    for start in range(0, samples, samples_per_batch):
+        sample_count = min(samples_per_batch, samples - start)
+        batch_totals = {}
+        sample_ids = np.repeat(np.arange(sample_count), rolls)
+        _roll(loot_tables, filename, sample_ids, sample_count, rng, batch_totals, [filename], independent)
+        for item_guid, counts in batch_totals.items():
+            if item_guid not in totals:
+                totals[item_guid] = np.zeros(samples, dtype=np.int64)
+            totals[item_guid][start:start + sample_count] = counts
+    return totals
+
+def summarize(totals, rolls):
+    """
+    Describes the simulated amount of each item per sample.
+
+    Args:
+        totals (dict): The result of simulate_table.
+        rolls (int): The number of rolls in each sample.
+
+    Returns:
+        list: [{'item_guid', 'mean': the average amount per sample, 'per_roll': the average per roll,
+                'percentiles': the amount at each of percentiles, 'any': the share of samples with at least one}],
+              most common items first.
+    """
+    summary = []
+    for item_guid, counts in totals.items():
+        mean = float(counts.mean())
+        summary.append({
+            'item_guid': item_guid,
+            'mean': mean,
+            'per_roll': mean / rolls if rolls else 0.0,
+            'percentiles': [float(value) for value in np.percentile(counts, percentiles)],
+            'any': float((counts > 0).mean()),
+        })
+    summary.sort(key=lambda item: -item['mean'])
+    return summary
@@ -0,0 +1,114 @@
+# loot_yield.py
+
+from Utilities import loot_graph
+
+# Passes over the tables before giving up on a loop of nested tables that never settles
+max_passes = 1000
+
+def build_yield_arrays(loot_tables, filenames, independent=False):
+    """
+    Describes the loot tables, and every table nested in them, as lists of (row, column, value) triples.
+
+    Args:
+        loot_tables (dict): The result of loot_graph.load_loot_tables.
+        filenames (list): The loot tables to start from.
+        independent (bool): Roll every entry on its own, see loot_graph.roll_chances.
+
+    Returns:
+        dict: {'tables': the table filenames, their position is their row,
+               'rows': the row of each table filename,
+               'items': the item GUIDs, their position is their column,
+               'drops': (table row, item column, expected amount per roll) of each item entry,
+               'nested': (table row, nested table row, expected rolls of it per roll) of each nested entry}
+    """
+    tables = []
+    table_rows = {}
+    items = []
+    item_columns = {}
+    drops = []
+    nested = []
+
+    def table_row(filename):
+        if filename not in table_rows:
+            table_rows[filename] = len(tables)
+            tables.append(filename)
+        return table_rows[filename]
+
+    for filename in filenames:
+        table_row(filename[:-len('.asset')] if filename.endswith('.asset') else filename)
+
+    # New tables are appended while reading, so this also walks every nested table
+    position = 0
+    while position < len(tables):
+        row = position
+        position += 1
+        table = loot_graph.get_table(loot_tables, tables[row])
+        if table is None:
+            continue
+        for entry, chance in zip(table['entries'], loot_graph.roll_chances(table['entries'], independent)):
+            weight = chance * loot_graph.mean_amount(entry)
+            if entry['is_loot_table']:
+                nested_filename = loot_graph.get_nested_filename(loot_tables, entry)
+                if nested_filename:
+                    nested.append((row, table_row(nested_filename), weight))
+            elif entry['item_guid'] != '0':
+                if entry['item_guid'] not in item_columns:
+                    item_columns[entry['item_guid']] = len(items)
+                    items.append(entry['item_guid'])
+                drops.append((row, item_columns[entry['item_guid']], weight))
+
+    return {'tables': tables, 'rows': table_rows, 'items': items, 'drops': drops, 'nested': nested}
+
+def _settled(previous, totals):
+    return previous.keys() == totals.keys() and all(abs(totals[column] - amount) <= 1e-12 for column, amount in previous.items())
+
+def _solve(arrays):
+    direct = [{} for _ in arrays['tables']]
+    for row, column, weight in arrays['drops']:
+        direct[row][column] = direct[row].get(column, 0.0) + weight
+    rolls = [[] for _ in arrays['tables']]
+    for row, nested_row, weight in arrays['nested']:
+        rolls[row].append((nested_row, weight))
+
+    # Nested tables come after the tables rolling them, so going backwards a table's nested tables are
+    # usually done before it. Tables on a loop need further passes until the sums settle.
+    expected = [dict(row) for row in direct]
+    for _ in range(max_passes):
+        changed = False
+        for row in range(len(expected) - 1, -1, -1):
+            totals = dict(direct[row])
+            for nested_row, weight in rolls[row]:
+                for column, amount in expected[nested_row].items():
+                    totals[column] = totals.get(column, 0.0) + weight * amount
+            changed = changed or not _settled(expected[row], totals)
+            expected[row] = totals
+        if not changed:
+            break
+    return expected
+
+def expected_drops(loot_tables, filenames, independent=False):
+    """
+    Works out how many of each item one roll of each loot table gives on average, nested tables included.
+
+    Rolls follow loot_graph.roll_chances, so by default one entry is picked per roll, the same model
+    loot_simulation samples and loot_graph.expand lists; the simulated means converge to these amounts.
+
+    Every table is worked out in one batch: the expected amounts solve expected = drops + nested @ expected,
+    with drops and nested kept as sparse rows since a table only has a few entries.
+
+    Args:
+        loot_tables (dict): The result of loot_graph.load_loot_tables.
+        filenames (list): The loot tables to report, e.g. the lines of loot_table_list.txt.
+        independent (bool): Roll every entry on its own, instead of picking one entry per roll.
+
+    Returns:
+        dict: {table filename: {item GUID: expected amount per roll}} for each of filenames that exists.
+    """
+    arrays = build_yield_arrays(loot_tables, filenames, independent)
+    items = arrays['items']
+    sources = [filename for filename in dict.fromkeys(filename[:-len('.asset')] if filename.endswith('.asset') else filename for filename in filenames)
+               if loot_graph.get_table(loot_tables, filename) is not None]
+
+    expected = _solve(arrays)
+    return {filename: {items[column]: amount for column, amount in expected[arrays['rows'][filename]].items() if amount}
+            for filename in sources}
@@ -0,0 +1,74 @@
+# production_index.py
+
+from Utilities import asset_index, guid_utils
+
+# The machine of each machineType number
+machine_names = {
+    0: "Battery generator",
+    1: "Canning Pot",
+    2: "Dehydrator",
+    3: "Fermentation tank",
+    4: "Fiber spinner",
+    5: "Freezer",
+    6: "Dark matter refiner",
+    7: "Furnace",
+    9: "Juicer",
+    10: "Medicine machine",
+    12: "Press",
+    15: "Carbon converter",
+    16: "Recycler",
+    19: "Compost machine",
+    20: "Microbe compost machine",
+    21: "Advanced furnace",
+    22: "Advanced dark matter refiner"
+}
+
+def get_machine_name(machine_type):
+    return machine_names.get(machine_type, f"Unknown machine ({machine_type})")
+
+def build_production_index(input_directory, mappings):
+    """
+    Collects every machine production recipe: which machine turns which input into which product, and how long it takes.
+
+    The asset index reads each asset's machineProductionGuide during its one walk of the folder, so no
+    asset is opened here. The GUIDs of the products and loot tables are resolved through the GUID
+    mappings once, so the scripts using the index never look them up again.
+
+    Args:
+        input_directory (str): The MonoBehaviour folder, e.g. 'Input/Assets/MonoBehaviour'.
+        mappings (dict): The GUID mappings from guid_utils.create_mappings.
+
+    Returns:
+        dict: {'inputs': [{'filename': e.g. 'apple.asset', 'item_name': its itemName or None,
+                           'recipes': [...]}] in directory listing order,
+               'recipes': every recipe, each an entry of asset_index.read_production_guide plus
+                   'input': its input's filename, 'product': the product's GUID lookup entry or None,
+                   'loot_table': the loot table's filename or None, 'machine_name': e.g. 'Juicer',
+               'by_machine': the recipes of each machineType,
+               'by_product': the recipes of each product GUID}
+    """
+    index = asset_index.load_asset_index(input_directory)
+    inputs = []
+    recipes = []
+    by_machine = {}
+    by_product = {}
+
+    for asset in asset_index.get_assets_with_section(index, 'machineProductionGuide'):
+        filename = f"{asset['filename']}.asset"
+        input_recipes = []
+        for entry in asset['production']:
+            loot_table_entry = guid_utils.get_entry_from_guid(entry['loot_table_guid'], mappings, {}) if entry['loot_table_guid'] else {}
+            recipe = dict(entry)
+            recipe['input'] = filename
+            recipe['product'] = guid_utils.get_entry_from_guid(entry['product_guid'], mappings) if entry['product_guid'] else None
+            recipe['loot_table'] = loot_table_entry.get('filename')
+            recipe['machine_name'] = get_machine_name(entry['machine_type'])
+            input_recipes.append(recipe)
+            recipes.append(recipe)
+            by_machine.setdefault(recipe['machine_type'], []).append(recipe)
+            if recipe['product_guid']:
+                by_product.setdefault(recipe['product_guid'], []).append(recipe)
+
+        inputs.append({'filename': filename, 'item_name': asset['item_name'] or None, 'recipes': input_recipes})
+
+    return {'inputs': inputs, 'recipes': recipes, 'by_machine': by_machine, 'by_product': by_product}
@@ -0,0 +1,103 @@
+# run_context.py
+
+import os
+from Utilities import guid_store, guid_utils
+
+def create_context(incremental=False):
+    """
+    Creates the state shared by every parser run in one process.
+
+    run_parser.py passes a single context to each script's run(context), so the GUID
+    lookup is loaded once per run instead of once per script. The asset index needs no
+    entry here, since asset_index already keeps it for the lifetime of the process.
+
+    Args:
+        incremental (bool): Whether parsers may reuse cached per-file results (see file_manifest).
+
+    Returns:
+        dict: The shared run context.
+    """
+    return {
+        'guid_lookups': {},
+        'mappings': {},
+        'guid_stores': {},
+        'incremental': incremental,
+        'manifest': None,
+    }
+
+def _key(file_path):
+    return os.path.normpath(os.path.abspath(file_path))
+
+def set_guid_lookup(context, file_path, lookup_data):
+    """
+    Stores a freshly built GUID lookup so later scripts don't re-read it from disk.
+
+    Args:
+        context (dict): The shared run context, or None when a script runs on its own.
+        file_path (str): The path the lookup was written to.
+        lookup_data (list): The GUID lookup entries.
+    """
+    if context is None:
+        return
+    key = _key(file_path)
+    context['guid_lookups'][key] = lookup_data
+    context['mappings'].pop(key, None)
+    store = context['guid_stores'].pop(key, None)
+    if store is not None:
+        store.close()
+
+def get_guid_lookup(context, file_path):
+    """
+    Returns the GUID lookup list, loading it from disk the first time it is needed.
+
+    Args:
+        context (dict): The shared run context, or None when a script runs on its own.
+        file_path (str): The path to guid_lookup.json.
+
+    Returns:
+        list: The GUID lookup entries.
+    """
+    if context is None:
+        return guid_utils.load_guid_lookup(file_path)
+    key = _key(file_path)
+    if key not in context['guid_lookups']:
+        context['guid_lookups'][key] = guid_utils.load_guid_lookup(file_path)
+    return context['guid_lookups'][key]
+
+def get_mappings(context, file_path):
+    """
+    Returns the guid_utils.create_mappings indexes for the GUID lookup, built once per run.
+
+    Args:
+        context (dict): The shared run context, or None when a script runs on its own.
+        file_path (str): The path to guid_lookup.json.
+
+    Returns:
+        dict: The GUID lookup indexes.
+    """
+    if context is None:
+        return guid_utils.create_mappings(guid_utils.load_guid_lookup(file_path))
+    key = _key(file_path)
+    if key not in context['mappings']:
+        context['mappings'][key] = guid_utils.create_mappings(get_guid_lookup(context, file_path))
+    return context['mappings'][key]
+
+def get_guid_store(context, file_path):
+    """
+    Returns the SQLite copy of the GUID lookup, opened once per run the first time it is needed.
+
+    Scripts that only look up a few entries query it instead of loading the whole JSON list.
+
+    Args:
+        context (dict): The shared run context, or None when a script runs on its own.
+        file_path (str): The path to guid_lookup.json.
+
+    Returns:
+        sqlite3.Connection: The store, for the guid_store get_ functions.
+    """
+    if context is None:
+        return guid_store.open_guid_store(file_path)
+    key = _key(file_path)
+    if key not in context['guid_stores']:
+        context['guid_stores'][key] = guid_store.open_guid_store(file_path)
+    return context['guid_stores'][key]
@@ -0,0 +1,119 @@
+# store_graph.py
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import yaml
+from Utilities import asset_cache, file_manifest, guid_utils
+
+# The MonoBehaviour fields the store stages read, of catalogs, store sets, store items and items for sale
+store_fields = ('m_Name', 'markupPercent', 'storeSets', 'rndRollActive', 'rndRollAmount', 'storeItemsInSet',
+                'itemForSale', 'limitedPurchase', 'buyValue')
+
+def _load(file_path):
+    # Returns (data, None), or (None, the error) when the asset can't be parsed
+    try:
+        data = asset_cache.load_asset(file_path)
+    except Exception as e:
+        return None, e
+    if not isinstance(data, dict):
+        return data, None
+    mono_behaviour = data.get('MonoBehaviour') or {}
+    return {'MonoBehaviour': {name: mono_behaviour[name] for name in store_fields if name in mono_behaviour}}, None
+
+def read_store_asset(file_path):
+    """
+    Reads the store fields of an asset for process_files, with an error as text so the result can be cached per file.
+    """
+    data, error = _load(file_path)
+    if error is not None:
+        return {'error': str(error), 'yaml_error': isinstance(error, yaml.YAMLError)}
+    return {'data': data}
+
+def _load_all(file_paths, threads, context=None, level='catalogs'):
+    # Loads each distinct asset once, in a thread pool when more than one thread is asked for
+    file_paths = list(dict.fromkeys(file_paths))
+    if context and context.get('incremental'):
+        # Assets whose content is unchanged since the last run are reused without parsing them again,
+        # only their store fields are cached. Each level is cached on its own, since a cache only
+        # keeps the files of its latest call.
+        loaded = {}
+        results = file_manifest.process_files(context, f"store_graph_{level}", file_paths, read_store_asset, salt=file_manifest.source_salt(__file__))
+        for file_path, result in zip(file_paths, results):
+            if 'error' in result:
+                # The error is rebuilt with its type, so callers can still tell YAML errors apart
+                error_type = yaml.YAMLError if result['yaml_error'] else Exception
+                loaded[file_path] = (None, error_type(result['error']))
+            else:
+                loaded[file_path] = (result['data'], None)
+        return loaded
+    if threads <= 1 or len(file_paths) <= 1:
+        return dict(zip(file_paths, map(_load, file_paths)))
+    with ThreadPoolExecutor(max_workers=min(threads, len(file_paths))) as executor:
+        return dict(zip(file_paths, executor.map(_load, file_paths)))
+
+def _resolve(guids, input_folder, mappings):
+    # Finds the lookup entry and asset path of each GUID; GUIDs without an entry are left out
+    resolved = {}
+    for guid in guids:
+        if guid in resolved:
+            continue
+        detail = guid_utils.get_entry_from_guid(guid, mappings)
+        if detail:
+            resolved[guid] = {'detail': detail, 'path': os.path.join(input_folder, detail['filename'] + '.asset')}
+    return resolved
+
+def _load_level(guids, input_folder, mappings, threads, context, level):
+    # Resolves one level of references and loads every asset it points to that exists
+    resolved = _resolve(guids, input_folder, mappings)
+    for node in resolved.values():
+        node['exists'] = os.path.exists(node['path'])
+    loaded = _load_all([node['path'] for node in resolved.values() if node['exists']], threads, context, level)
+    for node in resolved.values():
+        node['data'], node['error'] = loaded.get(node['path'], (None, None))
+    return resolved
+
+def _mono_behaviour(node):
+    return (node['data'] or {}).get('MonoBehaviour', {})
+
+def build_store_graph(input_folder, catalog_filenames, mappings, threads=1, context=None):
+    """
+    Reads the store catalogs and everything they reference, one level at a time.
+
+    A catalog lists store sets, a store set lists store items, and a store item names the item
+    for sale. The GUIDs of each level are collected from every catalog first, so each distinct
+    asset is loaded once however many stores share it.
+
+    Args:
+        input_folder (str): The MonoBehaviour folder, e.g. 'Input/Assets/MonoBehaviour'.
+        catalog_filenames (list): The _StoreCatalog asset filenames.
+        mappings (dict): The GUID mappings from guid_utils.create_mappings.
+        threads (int): Number of threads loading the assets of a level.
+        context (dict): The run context; in an incremental run assets are loaded through
+                        file_manifest.process_files, so unchanged ones are not parsed again.
+
+    The 'data' of each asset only holds the store_fields of its MonoBehaviour, e.g.
+    {'MonoBehaviour': {'itemForSale': {...}, 'limitedPurchase': 1}}.
+
+    Returns:
+        dict: {'catalogs': [{'filename', 'data', 'error'}] in the order of catalog_filenames,
+               'sets', 'store_items', 'products': the referenced assets of each level, keyed by GUID,
+                   each {'detail': its GUID lookup entry, 'path', 'exists', 'data', 'error'}}
+    """
+    loaded = _load_all([os.path.join(input_folder, filename) for filename in catalog_filenames], threads, context)
+    catalogs = []
+    for filename in catalog_filenames:
+        data, error = loaded[os.path.join(input_folder, filename)]
+        catalogs.append({'filename': filename, 'data': data, 'error': error})
+
+    set_guids = [store_set.get('guid') for catalog in catalogs if catalog['data']
+                 for store_set in catalog['data'].get('MonoBehaviour', {}).get('storeSets', []) if store_set.get('guid')]
+    sets = _load_level(set_guids, input_folder, mappings, threads, context, 'sets')
+
+    item_guids = [item.get('guid', 'unknown') for node in sets.values() if node['data']
+                  for item in _mono_behaviour(node).get('storeItemsInSet', [])]
+    store_items = _load_level(item_guids, input_folder, mappings, threads, context, 'store_items')
+
+    product_guids = [_mono_behaviour(node).get('itemForSale', {}).get('guid', 'unknown') for node in store_items.values() if node['data']]
+    products = _load_level(product_guids, input_folder, mappings, threads, context, 'products')
+
+    return {'catalogs': catalogs, 'sets': sets, 'store_items': store_items, 'products': products}
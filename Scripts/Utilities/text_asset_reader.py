@@ -0,0 +1,271 @@
+# text_asset_reader.py
+
+import json
+import mmap
+import re
+
+# One token of the localisation format: a // comment, a string, a bracket, or a bare value such
+# as a number. Colons and commas are skipped, an object's keys and values simply alternate.
+# Strings are matched unrolled, a character class run at a time, which is several times faster.
+# A string may hold raw line breaks, and one still open at the end of a chunk is matched to the
+# end of it, so it can be finished with the next chunk.
+token_pattern = re.compile(r'[\s,:]*(//[^\n]*|"[^"\\]*(?:\\.[^"\\]*)*(?:"|\\?\Z)|[{}\[\]]|[^\s,:{}\[\]"/]+)')
+region_pattern = re.compile(r'//\s*#region\b(.*)')
+endregion_pattern = re.compile(r'//\s*#endregion\b')
+
+# How much of a file is decoded and tokenized at a time
+chunk_size = 1 << 20
+
+def _iter_chunks(file_path):
+    # Yields the file's text in pieces of about chunk_size, each ending at a line break
+    with open(file_path, 'rb') as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped
+            return
+        with mapped:
+            start = 3 if mapped[:3] == b'\xef\xbb\xbf' else 0
+            while start < len(mapped):
+                end = mapped.find(b'\n', start + chunk_size)
+                end = len(mapped) if end == -1 else end + 1
+                yield mapped[start:end].decode('utf-8')
+                start = end
+
+def _is_closed(string_token):
+    # A string token is closed when it ends with a quote that isn't escaped
+    if len(string_token) < 2 or string_token[-1] != '"':
+        return False
+    body = string_token[1:-1]
+    return (len(body) - len(body.rstrip('\\'))) % 2 == 0
+
+def _entry_key(fields):
+    for name, value in fields.items():
+        if (name == 'key' or name.endswith('Key')) and type(value) is str:
+            return value
+    return None
+
+def _iter_events(file_path, track_objects=False):
+    # Yields ('entry', entry) for every entry, and ('region', name) and ('endregion', name) where
+    # each region opens and closes. With track_objects, every entry also lists all of its objects
+    # in file order, each with the number of the innermost region it opened in, counting from 0.
+    regions = []
+    region_count = 0
+    objects = None
+    comment = None
+    # The innermost open object or list of the entry being read, and the key waiting for its value
+    container = None
+    key = None
+    # The containers around it
+    parents = []
+
+    # The start of a string left open at the end of the last chunk
+    unfinished = ''
+
+    for chunk in _iter_chunks(file_path):
+        tokens = token_pattern.findall(unfinished + chunk if unfinished else chunk)
+        unfinished = ''
+        if tokens and tokens[-1][0] == '"' and not _is_closed(tokens[-1]):
+            unfinished = tokens.pop()
+        for token in tokens:
+            first = token[0]
+            if first == '"':
+                if container is None:
+                    # Text between entries, such as a region's plain description
+                    continue
+                value = token[1:-1]
+            elif first == '{' or first == '[':
+                opened = {} if first == '{' else []
+                if container is None:
+                    if first == '[':
+                        # A list outside of any entry, e.g. one wrapping the whole file
+                        continue
+                    if track_objects:
+                        objects = []
+                else:
+                    if type(container) is list:
+                        container.append(opened)
+                    elif key is not None:
+                        container[key] = opened
+                    parents.append(container)
+                if track_objects and first == '{':
+                    objects.append((regions[-1][0] if regions else None, opened))
+                container = opened
+                key = None
+                continue
+            elif first == '}' or first == ']':
+                if container is None or (type(container) is dict) != (first == '}'):
+                    continue
+                if parents:
+                    container = parents.pop()
+                    key = None
+                else:
+                    entry = {
+                        'key': _entry_key(container),
+                        'fields': container,
+                        'region': regions[-1][1] if regions else None,
+                        'comment': comment,
+                    }
+                    if track_objects:
+                        entry['objects'] = objects
+                    yield 'entry', entry
+                    container = None
+                    # A comment only belongs to the entry right after it
+                    comment = None
+                continue
+            elif first == '/':
+                match = region_pattern.match(token)
+                if match:
+                    region_name = match.group(1).strip()
+                    regions.append((region_count, region_name))
+                    region_count += 1
+                    yield 'region', region_name
+                elif endregion_pattern.match(token):
+                    if regions:
+                        yield 'endregion', regions.pop()[1]
+                elif container is None:
+                    comment = token[2:].strip()
+                continue
+            elif container is None:
+                continue
+            else:
+                value = token
+
+            if type(container) is list:
+                container.append(value)
+            elif key is None:
+                key = value
+            else:
+                container[key] = value
+                key = None
+
+    if unfinished:
+        raise ValueError(f"Unterminated string in {file_path}: {unfinished[:40]!r}")
+
+def iter_entries(file_path):
+    """
+    Yields the entries of a localisation text file one at a time, without reading the whole file.
+
+    The file is memory-mapped and tokenized about a megabyte at a time, so memory use stays
+    the same however large the file is. An entry is every outermost {...} object; objects nested inside it are kept in its
+    fields. String values are returned as written, escapes like \\n and raw line breaks included, the
+    same text the parsers' regexes used to capture; use decode_string to unescape one. A string that
+    is never closed raises a ValueError, rather than swallowing the rest of the file.
+
+    Args:
+        file_path (str): The path to an English_*.txt file.
+
+    Yields:
+        dict: {'key': the value of its 'key' or '...Key' field, or None,
+               'fields': the object, e.g. {'itemKey': 'item_1', 'itemName': 'Apple'},
+               'region': the name of the innermost enclosing //#region, or None,
+               'comment': the text of the last other // comment line between the previous entry
+                          and this one, or None}
+    """
+    for event, value in _iter_events(file_path):
+        if event == 'entry':
+            yield value
+
+def parse_text_asset(file_path):
+    """
+    Parses a localisation text file, such as an NPC's dialogue or the cutscene lines, into its
+    regions and the text blocks inside them, in one streaming pass.
+
+    Regions keep their nesting, so a region's subregions are the ones after it whose parent chain
+    leads back to it. A block is every object with a "key" or a "textSet", at any depth. Its lines are the boxes of
+    its textSet that have a text, with their expression. Use asset_cache.load_text_asset to share
+    one parse of a file between stages.
+
+    Args:
+        file_path (str): The path to an English_*.txt file.
+
+    Returns:
+        dict: {'name': the first "name" in the file, e.g. the NPC's, or None,
+               'regions': [{'name': e.g. 'QUEST_TALK .....',
+                            'parent': the number of the enclosing region in this list, or None,
+                            'entries': the entries from iter_entries directly inside it,
+                            'blocks': [...]}] in file order, regions without blocks included,
+               'blocks': [{'key': its "key" or None,
+                           'region': the name of the innermost region it is in, or None,
+                           'text_set': its "textSet" list or None,
+                           'lines': [{'text': raw text, 'expression': raw expression or None}],
+                           'fields': the whole object}] in file order}
+    """
+    name = None
+    regions = []
+    blocks = []
+    # The numbers of the regions open at this point of the file
+    open_regions = []
+
+    for event, value in _iter_events(file_path, track_objects=True):
+        if event == 'region':
+            open_regions.append(len(regions))
+            regions.append({'name': value, 'parent': open_regions[-2] if len(open_regions) > 1 else None, 'entries': [], 'blocks': []})
+        elif event == 'endregion':
+            open_regions.pop()
+        elif event == 'entry':
+            objects = value.pop('objects')
+            if open_regions:
+                regions[open_regions[-1]]['entries'].append(value)
+            for region_number, fields in objects:
+                if name is None and type(fields.get('name')) is str:
+                    name = fields['name']
+                key = fields.get('key')
+                text_set = fields.get('textSet')
+                if key is None and text_set is None:
+                    continue
+
+                text_set = text_set if type(text_set) is list else None
+                lines = []
+                for box in text_set or ():
+                    if type(box) is dict and type(box.get('text')) is str and box['text']:
+                        expression = box.get('expression')
+                        lines.append({'text': box['text'], 'expression': expression if type(expression) is str and expression else None})
+
+                region = regions[region_number] if region_number is not None else None
+                block = {
+                    'key': key if type(key) is str else None,
+                    'region': region['name'] if region else None,
+                    'text_set': text_set,
+                    'lines': lines,
+                    'fields': fields,
+                }
+                blocks.append(block)
+                if region:
+                    region['blocks'].append(block)
+
+    return {'name': name, 'regions': regions, 'blocks': blocks}
+
+def load_entries(file_path, key_field, value_field=None):
+    """
+    Reads a text file once and indexes its entries by one of their fields.
+
+    Args:
+        file_path (str): The path to an English_*.txt file.
+        key_field (str): The field to index by, e.g. 'itemKey'.
+        value_field (str): A field to keep for each entry instead of the whole entry, e.g. 'itemName'.
+
+    Returns:
+        dict: Each entry, or its value_field, keyed by its key_field. Entries missing either field
+              are left out, and a repeated key keeps its last entry.
+    """
+    indexed = {}
+    for entry in iter_entries(file_path):
+        fields = entry['fields']
+        if key_field not in fields:
+            continue
+        if value_field is None:
+            indexed[fields[key_field]] = entry
+        elif value_field in fields:
+            indexed[fields[key_field]] = fields[value_field]
+    return indexed
+
+def decode_string(value):
+    """
+    Unescapes a raw string value from iter_entries, e.g. turning \\n into a newline. Raw line
+    breaks in the value are kept.
+    """
+    try:
+        return json.loads(f'"{value}"', strict=False)
+    except ValueError:
+        return value
@@ -3,7 +3,18 @@
 import yaml
 import re
 
-def unity_constructor(loader, node):
+# Use the C LibYAML parser when PyYAML was built with it, it is several times faster
+try:
+    from yaml import CSafeLoader as _BaseLoader
+except ImportError:
+    from yaml import SafeLoader as _BaseLoader
+
+document_header_pattern = re.compile(r'^--- ', re.MULTILINE)
+# Unity marks prefab instance documents with a trailing keyword YAML doesn't understand
+stripped_header_pattern = re.compile(r'^(--- !u!\d+ &-?\d+) stripped$', re.MULTILINE)
+
+def unity_constructor(loader, tag_suffix, node):
+    # Multi-constructors also receive the tag suffix, the Unity class ID such as '114'
     return loader.construct_mapping(node, deep=True)
 
 def add_unity_yaml_constructors():
@@ -13,3 +24,49 @@ def preprocess_yaml_content(content):
     # Remove any problematic tags or characters
     content = re.sub(r'!u!\d+ &\d+', '', content)
     return content
+
+class UnityLoader(_BaseLoader):
+    """
+    A safe loader that reads Unity's `--- !u!<class> &<fileID>` document headers as plain mappings.
+    """
+
+UnityLoader.add_multi_constructor('tag:unity3d.com,2011:', unity_constructor)
+
+def _prepare(content):
+    if ' stripped' in content:
+        content = stripped_header_pattern.sub(r'\1', content)
+    # Unity declares %TAG once at the top, but YAML only applies it to the first document, so
+    # multi-document assets repeat it before every later header
+    first_header = content.find('\n--- ')
+    second_header = content.find('\n--- ', first_header + 1) if first_header != -1 else -1
+    if second_header != -1:
+        content = content[:second_header + 1] + document_header_pattern.sub(
+            '...\n%TAG !u! tag:unity3d.com,2011:\n--- ', content[second_header + 1:])
+    return content
+
+def load_unity_yaml(content):
+    """
+    Parses the first document of a Unity YAML asset.
+
+    Gives the same result as yaml.safe_load(preprocess_yaml_content(content)), without copying
+    the text through a regex first, and also accepts assets holding several documents.
+
+    Args:
+        content (str): The text of the asset.
+
+    Returns:
+        dict: The first document, e.g. {'MonoBehaviour': {...}}, or None for an empty asset.
+    """
+    return next(yaml.load_all(_prepare(content), Loader=UnityLoader), None)
+
+def load_unity_yaml_documents(content):
+    """
+    Parses every document of a multi-document Unity YAML asset.
+
+    Args:
+        content (str): The text of the asset.
+
+    Returns:
+        list: One dict per document, in file order.
+    """
+    return list(yaml.load_all(_prepare(content), Loader=UnityLoader))
@@ -0,0 +1,178 @@
+# usage_index.py
+
+import os
+import sqlite3
+from Utilities import guid_utils, item_references
+
+# The kinds of use, in the order they are listed
+kinds = ['crafting', 'machine', 'loot', 'shop', 'gift', 'request', 'email']
+
+def _name(entry, default):
+    return (entry or {}).get('name', default).capitalize()
+
+def _crafting_uses(crafting):
+    for recipe in crafting['recipes']:
+        product_name = _name(recipe['product'], 'unknown_item')
+        for material in recipe['materials']:
+            yield material['guid'], 'crafting', recipe['filename'][:-len('.asset')], f"material of {product_name} x{material['amount']}"
+
+def _machine_uses(index, production):
+    for recipe in production['recipes']:
+        input_entry = index.get(recipe['input'][:-len('.asset')])
+        if not input_entry or not input_entry['guid']:
+            continue
+        product = _name(recipe['product'], 'unknown_item') if recipe['product_guid'] else recipe['loot_table'] or 'unknown_loot_table'
+        yield input_entry['guid'], 'machine', input_entry['filename'], f"input of {product} in {recipe['machine_name']}"
+
+def _loot_uses(tables):
+    for table in tables:
+        if table is None:
+            continue
+        for entry in table['entries']:
+            if entry['is_loot_table'] or entry['item_guid'] == '0':
+                continue
+            yield str(entry['item_guid']), 'loot', table['name'], f"{entry['percentChance']}% chance of {entry['min']}-{entry['max']}"
+
+def _shop_uses(graph):
+    for catalog in graph['catalogs']:
+        if catalog['data'] is None:
+            continue
+        mono_behaviour = catalog['data'].get('MonoBehaviour', {})
+        store_name = mono_behaviour.get('m_Name', '').replace('_StoreCatalog', '')
+        for store_set in mono_behaviour.get('storeSets', []):
+            set_node = graph['sets'].get(store_set.get('guid'))
+            if set_node is None or set_node['data'] is None:
+                continue
+            for item in set_node['data'].get('MonoBehaviour', {}).get('storeItemsInSet', []):
+                item_node = graph['store_items'].get(item.get('guid', 'unknown'))
+                if item_node is None or item_node['data'] is None:
+                    continue
+                product_node = graph['products'].get(item_node['data'].get('MonoBehaviour', {}).get('itemForSale', {}).get('guid', 'unknown'))
+                if product_node is None:
+                    continue
+                yield product_node['detail']['guid'], 'shop', store_name, f"sold in {set_node['detail']['filename']}"
+
+def _gift_uses(npc_assets):
+    for asset, data in npc_assets:
+        for preference, guid in item_references.read_gift_overrides(data):
+            yield guid, 'gift', asset['m_name'] or asset['filename'], f"{preference} gift override"
+
+def _request_uses(request_assets):
+    for asset, data in request_assets:
+        for guid, min_num, max_num in item_references.read_item_requests(data):
+            yield guid, 'request', asset['filename'], f"bulletin board request of {min_num}-{max_num}"
+
+def _email_uses(email_assets):
+    for asset, data in email_assets:
+        for guid, amount in item_references.read_email(data)['attachments']:
+            yield guid, 'email', asset['filename'], f"attached x{amount}"
+
+def build_usage_index(input_directory, mappings, context=None):
+    """
+    Collects every place an item is used: crafting materials, machine inputs, loot drops, shop
+    listings, NPC gift overrides, bulletin board requests and email attachments.
+
+    The recipes, loot tables and stores come from the same indexes the parsers use, and the
+    gift overrides, requests and attachments are read with the same item_references functions
+    as their parsers, from the text of only the assets that can have them.
+
+    Args:
+        input_directory (str): The MonoBehaviour folder, e.g. 'Input/Assets/MonoBehaviour'.
+        mappings (dict): The GUID mappings from guid_utils.create_mappings.
+        context (dict): The run context, so an incremental run reuses the recipes and stores read before.
+
+    Returns:
+        dict: {item GUID: [(kind, source, detail)]}, kinds in the order of `kinds`, where source
+              is the recipe, input, loot table, store, NPC, or asset the item appears in.
+    """
+    # The readers are only imported here, so looking items up in a saved index starts quickly
+    from Utilities import asset_index, crafting_index, loot_graph, production_index, store_graph
+
+    index = asset_index.load_asset_index(input_directory)
+    loot_tables = loot_graph.load_loot_tables(input_directory, mappings)
+    catalog_filenames = [filename for filename in os.listdir(input_directory)
+                         if filename.startswith('_StoreCatalog') and not filename.endswith('.meta')]
+
+    def read_assets(assets):
+        return ((asset, asset_index.read_asset(input_directory, asset['filename'])) for asset in assets)
+
+    def with_save_id(prefix):
+        return [asset for asset in asset_index.get_assets(index) if (asset['save_id'] or '').startswith(prefix)]
+
+    sources = [
+        _crafting_uses(crafting_index.build_crafting_index(input_directory, mappings, context)),
+        _machine_uses(index, production_index.build_production_index(input_directory, mappings)),
+        _loot_uses(loot_graph.get_table(loot_tables, filename) for filename in loot_graph.find_loot_table_files(input_directory)),
+        _shop_uses(store_graph.build_store_graph(input_directory, catalog_filenames, mappings, context=context)),
+        _gift_uses(read_assets(with_save_id('npc_'))),
+        _request_uses(read_assets(asset_index.get_assets_with_section(index, 'itemsCanRequest'))),
+        _email_uses(read_assets(with_save_id('email_'))),
+    ]
+    usage = {}
+    for uses in sources:
+        for guid, kind, source, detail in uses:
+            usage.setdefault(guid, []).append((kind, source, detail))
+    return usage
+
+def save_usage_index(usage, mappings, file_path):
+    """
+    Writes the usage index to an SQLite file, with the item names for lookups by name.
+
+    The file is written next to its final path and swapped in, so a query never sees half of it.
+
+    Args:
+        usage (dict): The result of build_usage_index.
+        mappings (dict): The GUID mappings from guid_utils.create_mappings.
+        file_path (str): Where to write the index, e.g. 'Output/item_usage.sqlite'.
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    connection = sqlite3.connect(temp_path)
+    try:
+        connection.executescript("""
+            CREATE TABLE items (guid TEXT PRIMARY KEY, name TEXT) WITHOUT ROWID;
+            CREATE TABLE uses (guid TEXT, kind INTEGER, source TEXT, detail TEXT);
+        """)
+        connection.executemany("INSERT INTO items VALUES (?, ?)",
+                               ((guid, guid_utils.get_name_from_guid(guid, mappings)) for guid in usage))
+        connection.executemany("INSERT INTO uses VALUES (?, ?, ?, ?)",
+                               ((guid, kinds.index(kind), source, detail) for guid, uses in usage.items() for kind, source, detail in uses))
+        # The indexes are built after the rows are in, which is quicker than keeping them up to date
+        connection.executescript("""
+            CREATE INDEX uses_guid ON uses (guid);
+            CREATE INDEX items_name ON items (name COLLATE NOCASE);
+        """)
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(temp_path, file_path)
+
+def open_usage_index(file_path):
+    """
+    Opens a saved usage index read-only, for find_items and get_uses.
+    """
+    return sqlite3.connect(f"file:{os.path.abspath(file_path)}?mode=ro", uri=True)
+
+def find_items(connection, text):
+    """
+    Finds the items a query names, by GUID or by name, ignoring case.
+
+    Returns:
+        list: [(item GUID, name)] of the used items that match.
+    """
+    return connection.execute("SELECT guid, name FROM items WHERE guid = ? OR name = ? COLLATE NOCASE ORDER BY guid",
+                              (text.lower(), text)).fetchall()
+
+def get_uses(connection, item_guid):
+    """
+    Returns where an item is used.
+
+    Returns:
+        list: [(kind, source, detail)], in the order of `kinds`, then by source.
+    """
+    rows = connection.execute("SELECT kind, source, detail FROM uses WHERE guid = ? ORDER BY kind, source, rowid",
+                              (item_guid,)).fetchall()
+    return [(kinds[kind], source, detail) for kind, source, detail in rows]
@@ -1,5 +1,6 @@
 import os
 import re
+from Utilities import debug_log
 
 # Paths
 input_directory = 'Input/Assets/MonoBehaviour/'
@@ -7,6 +8,10 @@ output_file_path = 'Output/captain_rank_numbers.txt'
 debug_output_path = '.hidden/debug_output/cptn_rank_debug.txt'
 player_stat_path = 'Input/Assets/Scripts/Assembly-CSharp/PlayerStat.cs'
 
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_directory, player_stat_path]
+stage_outputs = [output_file_path, debug_output_path]
+
 # List of asset filenames to look for
 asset_filenames = [
     "CompletePrimaryQuest.asset",
@@ -27,10 +32,8 @@ asset_filenames = [
 ]
 
 # Function to log debug messages
-def log_debug_message(message):
-    os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
-    with open(debug_output_path, 'a') as debug_file:
-        debug_file.write(message + '\n')
+def log_debug_message(message, level='DEBUG'):
+    debug_log.log(debug_output_path, message, level)
 
 # Function to parse PlayerStat.cs to get stat-to-number mapping
 def parse_player_stat(player_stat_file):
@@ -79,7 +82,7 @@ def dump_asset_information(input_dir, asset_files, output_file, stat_mapping):
                             out_file.write(f"amountToAdjust: {amount}\n\n")
                             log_debug_message(f"Successfully read {file}: {name}, {stat_name}, {amount}")
                     except Exception as e:
-                        log_debug_message(f"Error reading {file}: {e}")
+                        log_debug_message(f"Error reading {file}: {e}", 'ERROR')
                 else:
                     log_debug_message(f"File not found: {file}")
         
@@ -89,11 +92,15 @@ def dump_asset_information(input_dir, asset_files, output_file, stat_mapping):
         print(f"Asset information has been successfully extracted and written to '{output_file_path}'")
     
     except Exception as e:
-        log_debug_message(f'An error occurred: {str(e)}')
+        log_debug_message(f'An error occurred: {str(e)}', 'ERROR')
         print(f"An error occurred. Check the debug output for details: '{debug_output_path}'")
 
-# Parse the PlayerStat.cs file to get stat mapping
-stat_mapping = parse_player_stat(player_stat_path)
+def run(context=None):
+    # Parse the PlayerStat.cs file to get stat mapping
+    stat_mapping = parse_player_stat(player_stat_path)
+
+    # Run the function
+    dump_asset_information(input_directory, asset_filenames, output_file_path, stat_mapping)
 
-# Run the function
-dump_asset_information(input_directory, asset_filenames, output_file_path, stat_mapping)
\ No newline at end of file
+if __name__ == '__main__':
+    run()
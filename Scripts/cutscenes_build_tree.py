@@ -1,16 +1,10 @@
 import os
 import sys
-import yaml
-import json
 
 # Add the Utilities directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'Utilities')))
 
-from Utilities import guid_utils
-from Utilities.unity_yaml_loader import add_unity_yaml_constructors, preprocess_yaml_content
-
-# Add Unity YAML constructors
-add_unity_yaml_constructors()
+from Utilities import asset_cache, cine_graph, debug_log, file_manifest, guid_utils, run_context
 
 # Define paths
 input_directory = 'Input/Assets/MonoBehaviour'
@@ -18,113 +12,112 @@ guid_lookup_path = 'Output/guid_lookup.json'
 output_file_path = 'Output/Cutscenes/cine_tree.txt'
 debug_output_path = '.hidden/debug_output/cine_tree_debug.txt'
 
-# Ensure output directories exist
-os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_directory, guid_lookup_path]
+stage_outputs = [output_file_path, debug_output_path]
 
 # Cines to focus on for debugging
 debug_cines = ["CineRequestOceanKing", "CineRequestOceanCure", "CineStartAnimals", "CineRoBuyIntro"]
 
+def read_cine_asset(asset_file_path):
+    """
+    Reads the cine fields of an asset, leaving cineScenesToAdd as GUIDs so the result can be cached per file.
+    """
+    data = asset_cache.load_asset(asset_file_path)
+    mono_behaviour = data.get('MonoBehaviour', {})
+    
+    return {
+        "name": os.path.splitext(os.path.basename(asset_file_path))[0],
+        "save_id": mono_behaviour.get("saveID", ""),
+        "activateAfterDays": mono_behaviour.get("activateAfterDays", ""),
+        "dayOfWeekRequired": mono_behaviour.get("dayOfWeekRequired", ""),
+        "cineScenesToAdd": [cine.get('guid', '') for cine in mono_behaviour.get("cineScenesToAdd", [])]
+    }
+
+def resolve_cine_data(cine_asset, mappings):
+    return dict(cine_asset, cineScenesToAdd=[guid_utils.get_name_from_guid(guid, mappings) for guid in cine_asset["cineScenesToAdd"]])
+
 def extract_cine_data(asset_file_path, mappings):
-    with open(asset_file_path, 'r') as file:
-        raw_content = file.read()
-        clean_content = preprocess_yaml_content(raw_content)
-        data = yaml.safe_load(clean_content)
-        mono_behaviour = data.get('MonoBehaviour', {})
-        
-        cine_data = {
-            "name": os.path.splitext(os.path.basename(asset_file_path))[0],
-            "save_id": mono_behaviour.get("saveID", ""),
-            "activateAfterDays": mono_behaviour.get("activateAfterDays", ""),
-            "dayOfWeekRequired": mono_behaviour.get("dayOfWeekRequired", ""),
-            "cineScenesToAdd": [guid_utils.get_name_from_guid(cine.get('guid', ''), mappings) for cine in mono_behaviour.get("cineScenesToAdd", [])]
-        }
-        
-        return cine_data
+    return resolve_cine_data(read_cine_asset(asset_file_path), mappings)
 
 def build_tree(cine_data_list):
-    tree = {}
-    cines_without_predecessors = set()
-
     # Build a map of cine name to its data for quick lookup
     cine_map = {cine["name"]: cine for cine in cine_data_list}
 
-    # Build the tree
-    for cine in cine_data_list:
-        if cine["name"] not in tree:
-            tree[cine["name"]] = {"data": cine, "children": []}
-        
-        for child_cine in cine["cineScenesToAdd"]:
-            if child_cine != "Unknown":
-                if child_cine not in tree:
-                    tree[child_cine] = {"data": cine_map.get(child_cine, {}), "children": []}
-                tree[cine["name"]]["children"].append(child_cine)
-                cines_without_predecessors.discard(child_cine)
-        
-        if cine["name"] not in cines_without_predecessors:
-            cines_without_predecessors.add(cine["name"])
+    # Build the graph of which cines add which, with its roots and cycles worked out once
+    graph = cine_graph.build_graph({
+        cine["name"]: [child_cine for child_cine in cine["cineScenesToAdd"] if child_cine != "Unknown"]
+        for cine in cine_data_list
+    })
 
-    return tree, cines_without_predecessors
+    tree = {cine_name: {"data": cine_map.get(cine_name, {}), "children": children} for cine_name, children in graph['children'].items()}
+    return tree, graph
 
-def print_tree(tree, cine_name, output_file, depth=0):
-    indent = "    " * depth
+def format_cine(tree, cine_name):
     cine_data = tree[cine_name]["data"]
     activation_info = []
-    if cine_data["activateAfterDays"]:
+    if cine_data.get("activateAfterDays"):
         activation_info.append(f"activateAfterDays: {cine_data['activateAfterDays']}")
-    if cine_data["dayOfWeekRequired"] != -1:
+    if cine_data.get("dayOfWeekRequired", -1) != -1:
         activation_info.append(f"dayOfWeekRequired: {cine_data['dayOfWeekRequired']}")
-    activation_str = " --- " + ", ".join(activation_info) if activation_info else ""
-    output_file.write(f"{indent}|-- {cine_name}{activation_str}\n")
-    for child in tree[cine_name]["children"]:
-        print_tree(tree, child, output_file, depth + 1)
+    return cine_name + (" --- " + ", ".join(activation_info) if activation_info else "")
+
+def print_tree(tree, graph, output_file):
+    # Each cine's children are printed once, later mentions point back to them
+    for cine_name, depth, seen in cine_graph.walk(graph):
+        indent = "    " * depth
+        if seen == 'repeat':
+            output_file.write(f"{indent}|-- {cine_name} (see above)\n")
+        elif seen == 'cycle':
+            output_file.write(f"{indent}|-- {cine_name} (cycle)\n")
+        else:
+            output_file.write(f"{indent}|-- {format_cine(tree, cine_name)}\n")
+
+def run(context=None):
+    # Ensure output directories exist
+    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+    os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+    # Clear the debug file at the start, since it is only appended to below
+    debug_log.clear_log(debug_output_path)
 
-def main():
     try:
         # Load the GUID lookup and create mappings
-        guid_lookup = guid_utils.load_guid_lookup(guid_lookup_path)
-        mappings = guid_utils.create_mappings(guid_lookup)
+        mappings = run_context.get_mappings(context, guid_lookup_path)
 
-        # Collect all cine data
+        # Collect all cine data, only re-reading assets that changed in an incremental run
+        asset_file_paths = [os.path.join(input_directory, filename) for filename in os.listdir(input_directory) if filename.endswith(".asset")]
+        cine_assets = file_manifest.process_files(context, 'cutscenes_build_tree', asset_file_paths, read_cine_asset, salt=file_manifest.source_salt(__file__))
         cine_data_list = []
-        for filename in os.listdir(input_directory):
-            if filename.endswith(".asset"):
-                asset_file_path = os.path.join(input_directory, filename)
-                cine_data = extract_cine_data(asset_file_path, mappings)
-                if cine_data["save_id"].startswith("cine_"):
-                    cine_data_list.append(cine_data)
+        for cine_asset in cine_assets:
+            if cine_asset["save_id"].startswith("cine_"):
+                cine_data_list.append(resolve_cine_data(cine_asset, mappings))
         
         # Build the tree
-        tree, cines_without_predecessors = build_tree(cine_data_list)
+        tree, graph = build_tree(cine_data_list)
 
         # Print the tree and the list of orphaned cines
-        with open(output_file_path, 'w') as output_file, open(debug_output_path, 'a') as debug_file:
+        with open(output_file_path, 'w') as output_file, debug_log.open_log(debug_output_path, append=True) as debug_file:
             # Focused debug information
             for cine in debug_cines:
                 if cine in tree:
                     debug_file.write(f"Debug tree for {cine}: {tree[cine]}\n")
-            
-            for root_cine in cines_without_predecessors:
-                try:
-                    print_tree(tree, root_cine, output_file)
-                except KeyError as e:
-                    debug_file.write(f"Error printing tree for root cine '{root_cine}': {str(e)}\n")
-                    if root_cine in tree:
-                        debug_file.write(f"Debug tree for {root_cine}: {tree[root_cine]}\n")
-                    else:
-                        debug_file.write(f"{root_cine} not found in tree.\n")
-            
+
+            for cycle in graph['cycles']:
+                debug_file.write(f"Cycle in cineScenesToAdd: {' -> '.join(cycle)}\n", 'ERROR')
+
+            print_tree(tree, graph, output_file)
+
             output_file.write("\nCines without predecessors:\n")
-            for cine in cines_without_predecessors:
+            for cine in graph['roots']:
                 output_file.write(f"{cine}\n")
 
         # Print success message to terminal
         print("Cine tree has been successfully written to 'cine_tree.txt'.")
 
     except Exception as e:
-        with open(debug_output_path, 'a') as debug_file:
-            debug_file.write(f"An error occurred: {str(e)}\n")
+        with debug_log.open_log(debug_output_path, append=True) as debug_file:
+            debug_file.write(f"An error occurred: {str(e)}\n", 'ERROR')
         print("An error occurred. Check the debug output for details.")
 
 if __name__ == "__main__":
-    main()
+    run()
@@ -1,6 +1,6 @@
 import re
 import os
-from Utilities import guid_utils
+from Utilities import asset_cache, debug_log, guid_utils, run_context
 
 # Define paths
 input_folder = "Input/Assets/TextAsset"
@@ -9,25 +9,41 @@ debug_file_path = '.hidden/debug_output/courting_cinematics_debug.txt'
 input_file_path = os.path.join(input_folder, 'English_Cine.txt')
 mapping_file_path = 'Output/guid_lookup.json'
 
-# Function to log debug information
-def log_debug(message):
-    with open(debug_file_path, 'a', encoding='utf-8') as debug_file:
-        debug_file.write(message + '\n')
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_file_path, mapping_file_path]
+stage_outputs = [os.path.join(output_folder, 'courtship_cine_*.txt'), debug_file_path]
 
-# Clear the debug file at the start
-open(debug_file_path, 'w').close()
+# Function to log debug information
+def log_debug(message, level='DEBUG'):
+    debug_log.log(debug_file_path, message, level)
 
 # Function to load NPC names from the JSON file using guid_utils
-def load_guid_mapping(mapping_file_path):
+def load_guid_mapping(mapping_file_path, context=None):
     try:
-        guid_mapping = guid_utils.load_guid_lookup(mapping_file_path)
-        return guid_utils.create_mappings(guid_mapping)
+        return run_context.get_mappings(context, mapping_file_path)
     except Exception as e:
-        log_debug(f"Error loading GUID mapping: {e}")
+        log_debug(f"Error loading GUID mapping: {e}", 'ERROR')
         return {}
 
+# Function to find the dialogue boxes of a cutscene entry, at any depth
+def iter_text_boxes(value):
+    if isinstance(value, dict):
+        if isinstance(value.get('text'), str):
+            yield value
+        for child in value.values():
+            yield from iter_text_boxes(child)
+    elif isinstance(value, list):
+        for child in value:
+            yield from iter_text_boxes(child)
+
+# Function to read a raw string value for the wiki, with line breaks and the player's name replaced
+def format_text(value):
+    if not isinstance(value, str):
+        return None
+    return value.replace('$playerName', '[PLAYER]').replace('\\n', '<br>')
+
 # Function to format the extracted content
-def format_content(npc_name, cine_number, content):
+def format_content(npc_name, cine_number, entries):
     title_mapping = {
         "1": "First date with",
         "2": "Second date with",
@@ -36,114 +52,118 @@ def format_content(npc_name, cine_number, content):
     title = title_mapping.get(cine_number, "Date with")
     formatted_content = f"{{{{Cine|title={title} {npc_name}\n|npc={npc_name}\n"
 
-    content = re.sub(r'\$playerName', '[PLAYER]', content)
-
     emote_count = 1
-    text_pattern = re.compile(r'"text":\s*"(.*?)"(?:,\n.*?"expression":\s*"(.*?)")?(?:,\n.*?"optionOne":\s*\{.*?"optionText":\s*"(.*?)",.*?"response":\s*"(.*?)"(?:,\n.*?"responseExpression":\s*"(.*?)")?.*?\},\n.*?"optionTwo":\s*\{.*?"optionText":\s*"(.*?)",.*?"response":\s*"(.*?)"(?:,\n.*?"responseExpression":\s*"(.*?)")?.*?\})?', re.DOTALL)
-
-    matches = text_pattern.finditer(content)
-    for match in matches:
-        text = re.sub(r'\\n', '<br>', match.group(1))
-        expression = match.group(2)
-        option_one_text = re.sub(r'\\n', '<br>', match.group(3)) if match.group(3) else None
-        option_one_response = re.sub(r'\\n', '<br>', match.group(4)) if match.group(4) else None
-        option_one_expression = match.group(5)
-        option_two_text = re.sub(r'\\n', '<br>', match.group(6)) if match.group(6) else None
-        option_two_response = re.sub(r'\\n', '<br>', match.group(7)) if match.group(7) else None
-        option_two_expression = match.group(8)
-
-        formatted_content += f"|{text}"
-        if expression:
-            formatted_content += f"|emote{emote_count}={expression}"
-        formatted_content += "\n"
-
-        if option_one_text and option_one_response:
-            formatted_content += f"   |option{emote_count}A={option_one_text}|response{emote_count}A={option_one_response}"
-            if option_one_expression:
-                formatted_content += f"|emote{emote_count}A={option_one_expression}"
-            formatted_content += "\n"
-        if option_two_text and option_two_response:
-            formatted_content += f"   |option{emote_count}B={option_two_text}|response{emote_count}B={option_two_response}"
-            if option_two_expression:
-                formatted_content += f"|emote{emote_count}B={option_two_expression}"
+    for entry in entries:
+        for box in iter_text_boxes(entry['fields']):
+            expression = box.get('expression')
+            formatted_content += f"|{format_text(box['text'])}"
+            if expression and isinstance(expression, str):
+                formatted_content += f"|emote{emote_count}={expression}"
             formatted_content += "\n"
 
-        emote_count += 1
+            # The player's two answers, each with the NPC's response
+            for option_key, suffix in (('optionOne', 'A'), ('optionTwo', 'B')):
+                option = box.get(option_key)
+                if not isinstance(option, dict):
+                    continue
+                option_text = format_text(option.get('optionText'))
+                response = format_text(option.get('response'))
+                if option_text and response:
+                    formatted_content += f"   |option{emote_count}{suffix}={option_text}|response{emote_count}{suffix}={response}"
+                    response_expression = option.get('responseExpression')
+                    if response_expression and isinstance(response_expression, str):
+                        formatted_content += f"|emote{emote_count}{suffix}={response_expression}"
+                    formatted_content += "\n"
+
+            emote_count += 1
 
     formatted_content += "}}\n"
-    log_debug(f"Formatted content: {formatted_content[:500]}...")  # Log the beginning of the formatted content
+    log_debug(f"Formatted content: {formatted_content[:500]}...", 'TRACE')  # Log the beginning of the formatted content
     return formatted_content
 
-try:
-    # Load GUID lookup data and create mappings
-    mappings = load_guid_mapping(mapping_file_path)
-    log_debug(f"Loaded mappings with {len(mappings['save_id_to_name'])} save IDs")
-
-    # Log the contents of the mappings for debugging
-    log_debug(f"Mappings content: {mappings['save_id_to_name']}")
-
-    # Read the input file
-    with open(input_file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-
-    # Log the length of the content read
-    log_debug(f"Read {len(content)} characters from input file")
-
-    # Extract courtship cinematics regions using the provided regex patterns
-    courtship_pattern = re.compile(
-        r'//#endregion\s*\.+\n\s*//#region CINE COURTSHIPS NPC PORTIONS\s([\s\S]*?)//#region CINE COURTSHIP\s([\s\S]*?)//#endregion\s*\.+\n\s*//#endregion\s*\.+\n',
-        re.DOTALL
-    )
-
-    matches = list(courtship_pattern.finditer(content))
-
-    # Log the number of matches found
-    log_debug(f"Found {len(matches)} courtship regions")
-
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    npc_contents = {}
-
-    for match in matches:
-        extracted_section = match.group(2)
-        
-        # Log extracted section for debugging
-        log_debug(f"Extracted section: {extracted_section[:200]}...")
-
-        # Extract NPC key and date number from the cineKey
-        cine_key_matches = re.findall(r'"cineKey": "([^"]+)"', extracted_section)
-        
-        for cine_key in cine_key_matches:
-            npc_key_match = re.match(r'(npc_\d+)_(\d+)', cine_key)
-            if npc_key_match:
-                npc_key = npc_key_match.group(1)
-                cine_number = npc_key_match.group(2)
-                npc_name = guid_utils.get_name_from_save_id(npc_key, mappings)
-                log_debug(f"Identified NPC: {npc_name} for cineKey: {cine_key}")
-
-                if npc_name not in npc_contents:
-                    npc_contents[npc_name] = ""
-
-                # Extract only the relevant content for this NPC
-                start_idx = extracted_section.find(f'"cineKey": "{cine_key}"')
-                end_idx = extracted_section.find('//#endregion', start_idx)
-                npc_specific_content = extracted_section[start_idx:end_idx]
-
-                # Format the extracted content
-                formatted_content = format_content(npc_name, cine_number, npc_specific_content)
-                npc_contents[npc_name] += formatted_content
-
-    # Write each NPC's content to a separate file
-    for npc_name, content in npc_contents.items():
-        output_file_path = os.path.join(output_folder, f'courtship_cine_{npc_name}.txt')
-        with open(output_file_path, 'w', encoding='utf-8') as output_file:
-            output_file.write(content)
-        log_debug(f"Written content to {output_file_path}")
-
-    # Print success message
-    print(f"Courting cinematics regions have been successfully extracted, formatted, and written to individual files")
-
-except Exception as e:
-    log_debug(f'An error occurred: {str(e)}')
-    print(f"An error occurred. Check the debug output for details: '{debug_file_path}'")
+# Function to find the courtship regions, each with its entries and those of its subregions in file order
+def find_courtship_regions(model):
+    regions = model['regions']
+
+    def ancestors(number):
+        parent = regions[number]['parent']
+        while parent is not None:
+            yield parent
+            parent = regions[parent]['parent']
+
+    courtship_regions = []
+    for number, region in enumerate(regions):
+        if not re.match(r'CINE COURTSHIP(\s|$)', region['name']):
+            continue
+        # Only the courtship region inside the NPC portions holds the dates
+        if not any(regions[ancestor]['name'].startswith('CINE COURTSHIPS NPC PORTIONS') for ancestor in ancestors(number)):
+            continue
+        # Subregions come right after their region, so the walk stops at the first region outside it
+        entry_groups = [region['entries']]
+        for subregion_number in range(number + 1, len(regions)):
+            if number not in ancestors(subregion_number):
+                break
+            entry_groups.append(regions[subregion_number]['entries'])
+        courtship_regions.append(entry_groups)
+    return courtship_regions
+
+def run(context=None):
+    # Clear the debug file at the start
+    debug_log.clear_log(debug_file_path)
+
+    try:
+        # Load GUID lookup data and create mappings
+        mappings = load_guid_mapping(mapping_file_path, context)
+        log_debug(f"Loaded mappings with {len(mappings['save_id_to_name'])} save IDs")
+
+        # Log the contents of the mappings for debugging
+        if debug_log.is_enabled('TRACE'):
+            log_debug(f"Mappings content: {mappings['save_id_to_name']}", 'TRACE')
+
+        # The cutscene file is parsed once and shared with cutscenes_noncourting
+        model = asset_cache.load_text_asset(input_file_path)
+        courtship_regions = find_courtship_regions(model)
+
+        # Log the number of courtship regions found
+        log_debug(f"Found {len(courtship_regions)} courtship regions")
+
+        if not os.path.exists(output_folder):
+            os.makedirs(output_folder)
+
+        npc_contents = {}
+
+        for entry_groups in courtship_regions:
+            for entries in entry_groups:
+                for position, entry in enumerate(entries):
+                    # Extract NPC key and date number from the cineKey
+                    cine_key = entry['fields'].get('cineKey')
+                    npc_key_match = re.match(r'(npc_\d+)_(\d+)', cine_key) if isinstance(cine_key, str) else None
+                    if npc_key_match:
+                        npc_key = npc_key_match.group(1)
+                        cine_number = npc_key_match.group(2)
+                        npc_name = guid_utils.get_name_from_save_id(npc_key, mappings)
+                        log_debug(f"Identified NPC: {npc_name} for cineKey: {cine_key}")
+
+                        if npc_name not in npc_contents:
+                            npc_contents[npc_name] = ""
+
+                        # The date runs from its cineKey to the end of its region
+                        formatted_content = format_content(npc_name, cine_number, entries[position:])
+                        npc_contents[npc_name] += formatted_content
+
+        # Write each NPC's content to a separate file
+        for npc_name, content in npc_contents.items():
+            output_file_path = os.path.join(output_folder, f'courtship_cine_{npc_name}.txt')
+            with open(output_file_path, 'w', encoding='utf-8') as output_file:
+                output_file.write(content)
+            log_debug(f"Written content to {output_file_path}")
+
+        # Print success message
+        print(f"Courting cinematics regions have been successfully extracted, formatted, and written to individual files")
+
+    except Exception as e:
+        log_debug(f'An error occurred: {str(e)}', 'ERROR')
+        print(f"An error occurred. Check the debug output for details: '{debug_file_path}'")
+
+if __name__ == '__main__':
+    run()
@@ -1,7 +1,5 @@
 import os
-import sys
-import json
-from Utilities import guid_utils
+from Utilities import asset_index, debug_log, run_context
 from Utilities.unity_yaml_loader import preprocess_yaml_content
 
 # Define paths
@@ -10,51 +8,47 @@ output_file = 'Output/decoration_fixtures.txt'
 debug_output_path = '.hidden/debug_output/decoration_fixture_debug.txt'
 guid_lookup_file = 'Output/guid_lookup.json'
 
-# Ensure output directories exist
-os.makedirs(os.path.dirname(output_file), exist_ok=True)
-os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_folder, guid_lookup_file]
+stage_outputs = [output_file, debug_output_path]
 
-def log_debug(message):
-    with open(debug_output_path, 'a') as debug_file:
-        debug_file.write(message + '\n')
+def log_debug(message, level='DEBUG'):
+    debug_log.log(debug_output_path, message, level)
 
-def load_guid_lookup(file_path):
+def load_guid_lookup(file_path, context=None):
     try:
-        guid_lookup = guid_utils.load_guid_lookup(file_path)
+        guid_lookup = run_context.get_guid_lookup(context, file_path)
         filename_to_name = {entry['filename']: entry.get('name', entry['filename']) for entry in guid_lookup}
         return filename_to_name
     except Exception as e:
-        log_debug(f'Error loading guid lookup file: {e}')
+        log_debug(f'Error loading guid lookup file: {e}', 'ERROR')
         return {}
 
 def parse_assets(filename_to_name):
     fixtures = []
-    for root, dirs, files in os.walk(input_folder):
-        for file in files:
-            if file.endswith('.asset'):
-                file_base_name = os.path.splitext(file)[0]  # Strip the .asset extension
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, 'r') as asset_file:
-                        asset_data = preprocess_yaml_content(asset_file.read())
-                        if 'itemType: 6' in asset_data:
-                            can_put_on_tables = 'no'
-                            building_surface = 'unknown'
-                            deco_type = 'unknown'
-                            for line in asset_data.splitlines():
-                                if 'canPutOnTables:' in line:
-                                    value = int(line.split(':')[-1].strip())
-                                    can_put_on_tables = 'yes' if value == 1 else 'no'
-                                elif 'buildingSurface:' in line:
-                                    value = int(line.split(':')[-1].strip())
-                                    building_surface = 'floor' if value == 1 else 'wall' if value == 2 else 'unknown'
-                                elif 'decoType:' in line:
-                                    deco_type = line.split(':')[-1].strip()
-                            fixture_name = filename_to_name.get(file_base_name, file_base_name)
-                            fixtures.append(f'{fixture_name} - canPutOnTables: {can_put_on_tables}, buildingSurface: {building_surface}, decoType: {deco_type}')
-                            log_debug(f'Found itemType 6 in file: {file}')
-                except Exception as e:
-                    log_debug(f'Error opening file {file}: {e}')
+    index = asset_index.load_asset_index(input_folder)
+    for asset in asset_index.get_assets_with_item_type(index, 6):
+        file_base_name = asset['filename']
+        file = f"{file_base_name}.asset"
+        try:
+            asset_data = preprocess_yaml_content(asset_index.read_asset(input_folder, file_base_name))
+            can_put_on_tables = 'no'
+            building_surface = 'unknown'
+            deco_type = 'unknown'
+            for line in asset_data.splitlines():
+                if 'canPutOnTables:' in line:
+                    value = int(line.split(':')[-1].strip())
+                    can_put_on_tables = 'yes' if value == 1 else 'no'
+                elif 'buildingSurface:' in line:
+                    value = int(line.split(':')[-1].strip())
+                    building_surface = 'floor' if value == 1 else 'wall' if value == 2 else 'unknown'
+                elif 'decoType:' in line:
+                    deco_type = line.split(':')[-1].strip()
+            fixture_name = filename_to_name.get(file_base_name, file_base_name)
+            fixtures.append(f'{fixture_name} - canPutOnTables: {can_put_on_tables}, buildingSurface: {building_surface}, decoType: {deco_type}')
+            log_debug(f'Found itemType 6 in file: {file}')
+        except Exception as e:
+            log_debug(f'Error opening file {file}: {e}', 'ERROR')
     
     return fixtures
 
@@ -64,11 +58,15 @@ def save_fixtures(fixtures):
             for fixture in fixtures:
                 out_file.write(f'{fixture}\n')
     except Exception as e:
-        log_debug(f'Error writing to output file: {e}')
+        log_debug(f'Error writing to output file: {e}', 'ERROR')
+
+def run(context=None):
+    # Ensure output directories exist
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
 
-if __name__ == '__main__':
     try:
-        filename_to_name = load_guid_lookup(guid_lookup_file)
+        filename_to_name = load_guid_lookup(guid_lookup_file, context)
         fixtures = parse_assets(filename_to_name)
         save_fixtures(fixtures)
         log_debug(f'Total files with itemType 6: {len(fixtures)}')
@@ -76,5 +74,8 @@ if __name__ == '__main__':
         # Print the required messages to the terminal
         print(f"Decoration fixtures have been successfully written to '{output_file}'")
     except Exception as e:
-        log_debug(f'An error occurred: {str(e)}')
+        log_debug(f'An error occurred: {str(e)}', 'ERROR')
         print(f"An error occurred. Check the debug output for details: '{debug_output_path}'")
+
+if __name__ == '__main__':
+    run()
@@ -1,88 +1,44 @@
+import argparse
 import os
 import re
 import fnmatch
-import sys
-from Utilities import guid_utils
-from Utilities.unity_yaml_loader import preprocess_yaml_content
+from Utilities import asset_cache, debug_log, file_manifest
 
-# Function to parse a single NPC file
-def parse_npc_file(data, debug_file):
-    npc_name = None
+# Function to build the dialogue sections of an NPC file from its parsed regions
+def build_dialogues(model, debug_lines):
     dialogues = []
-    current_dialogue = None
-    in_section = False
-    in_dialogue = False
-    text_set = None
-
-    lines = data.splitlines()
-    last_text_line = None
-
-    for i, line in enumerate(lines):
-        # Extract NPC name
-        if '"name":' in line:
-            npc_name_match = re.search(r'"name":\s*"([^"]+)"', line)
-            if npc_name_match:
-                npc_name = npc_name_match.group(1)
-                debug_file.write(f"NPC Name: {npc_name}\n")
-
-        # Identify and replace the specific initial section with formatted text
-        if '"dialogue": [' in line and i + 1 < len(lines) and '#region RESTING' in lines[i + 1]:
-            current_dialogue = {"section": "===Resting===", "lines": []}
-            dialogues.append(current_dialogue)
-            debug_file.write("Replacing dialogue and region resting with formatted text\n")
-            in_section = True
+    # The debug messages are returned with the result, so parallel workers don't share the debug file
+    log_debug = debug_lines.append if debug_log.is_enabled() else lambda message: None
+
+    log_debug(f"NPC Name: {model['name']}")
+    for region in model['regions']:
+        # Each region becomes a section headed by the first word of its name
+        region_words = region['name'].split()
+        if not region_words:
             continue
-
-        # Check for end of the section
-        if in_section and '//#endregion' in line:
-            in_section = False
-            debug_file.write("Exiting section\n")
-            continue
-
-        # Look for the next region name
-        if not in_section and '#region' in line:
-            region_name_match = re.search(r'#region\s+([^\s]+)', line)
-            if region_name_match:
-                region_name = region_name_match.group(1).strip()
-                formatted_region = f"==={region_name.replace('_', ' ').lower().capitalize()}==="
-                formatted_region = re.sub(r'\s+', ' ', formatted_region)  # Remove extra whitespace
-                current_dialogue = {"section": formatted_region, "lines": []}
-                dialogues.append(current_dialogue)
-                debug_file.write(f"Entering section: {formatted_region}\n")
-                in_section = True
+        region_name = region_words[0]
+        formatted_region = f"==={region_name.replace('_', ' ').lower().capitalize()}==="
+        formatted_region = re.sub(r'\s+', ' ', formatted_region)  # Remove extra whitespace
+        current_dialogue = {"section": formatted_region, "lines": []}
+        dialogues.append(current_dialogue)
+        log_debug(f"Entering section: {formatted_region}")
+
+        for block in region['blocks']:
+            if not block['lines']:
                 continue
-
-        # Extract dialogues within the specified section
-        if in_section and '"textSet":' in line:
-            in_dialogue = True
             text_set = []
-            continue
-
-        if in_dialogue:
-            text_match = re.search(r'"text":\s*"([^"]+)"', line)
-            expression_match = re.search(r'"expression":\s*"([^"]+)"', line)
-
-            if text_match:
-                dialogue_line = {"text": text_match.group(1)}
-                debug_file.write(f"Found text: {dialogue_line['text']}\n")
-                last_text_line = dialogue_line
-                text_set.append(last_text_line)
-
-            if expression_match:
-                if last_text_line is not None:
-                    last_text_line["emote"] = expression_match.group(1)
-                    debug_file.write(f"Found emote: {last_text_line['emote']} for line: {last_text_line['text']}\n")
-
-            # End of textSet
-            if ']' in line:
-                if text_set:
-                    current_dialogue["lines"].append(text_set)
-                    debug_file.write(f"Captured dialogue set\n")
-                text_set = None  # Reset text_set
-                last_text_line = None
-                in_dialogue = False
-
-    return npc_name, dialogues
+            for line in block['lines']:
+                dialogue_line = {"text": line['text']}
+                log_debug(f"Found text: {dialogue_line['text']}")
+                if line['expression'] is not None:
+                    dialogue_line["emote"] = line['expression']
+                    log_debug(f"Found emote: {dialogue_line['emote']} for line: {dialogue_line['text']}")
+                text_set.append(dialogue_line)
+            current_dialogue["lines"].append(text_set)
+            log_debug("Captured dialogue set")
+        log_debug("Exiting section")
+
+    return model['name'], dialogues
 
 # Function to format dialogues
 def format_dialogues(npc_name, dialogues):
@@ -111,9 +67,9 @@ input_folder = "Input/Assets/TextAsset"
 output_folder = "Output/Dialogues"
 debug_output_file = os.path.join('.hidden/debug_output', 'npc_dialogue_debug.txt')
 
-# Ensure output and debug output folders exist
-os.makedirs(output_folder, exist_ok=True)
-os.makedirs(os.path.dirname(debug_output_file), exist_ok=True)
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_folder]
+stage_outputs = [output_folder, debug_output_file]
 
 # List of patterns to ignore
 ignore_patterns = [
@@ -131,39 +87,63 @@ ignore_patterns = [
     "*TBD*"
 ]
 
-def log_debug(message):
-    with open(debug_output_file, 'a', encoding='utf-8') as debug_file:
-        debug_file.write(message + '\n')
+def log_debug(message, level='DEBUG'):
+    debug_log.log(debug_output_file, message, level)
+
+def parse_dialogue_file(input_filepath):
+    """
+    Parses one NPC text file into the formatted dialogue lines of its output file.
+
+    Returns:
+        dict: The output filename, the formatted lines and the debug messages of the file.
+    """
+    # The parsed file is shared with the other stages reading it
+    debug_lines = []
+    npc_name, dialogues = build_dialogues(asset_cache.load_text_asset(input_filepath), debug_lines)
+
+    # Format the dialogues
+    formatted_dialogues = format_dialogues(npc_name, dialogues)
+
+    # The output file is named after the NPC with _Dialogue appended
+    return {'filename': f"{npc_name}_Dialogue.txt", 'lines': formatted_dialogues, 'debug': debug_lines}
+
+def run(context=None, jobs=1):
+    # Ensure output and debug output folders exist
+    os.makedirs(output_folder, exist_ok=True)
+    os.makedirs(os.path.dirname(debug_output_file), exist_ok=True)
 
-if __name__ == '__main__':
     try:
+        input_filepaths = []
         for filename in os.listdir(input_folder):
             if any(fnmatch.fnmatch(filename, pattern) for pattern in ignore_patterns):
                 continue  # Skip processing this file
 
             if filename.endswith(".txt"):
-                input_filepath = os.path.join(input_folder, filename)
-                
-                # Read the file with UTF-8 encoding
-                with open(input_filepath, 'r', encoding='utf-8') as file:
-                    data = file.read()
-
-                # Parse the content and write debug info to a file with UTF-8 encoding
-                with open(debug_output_file, 'a', encoding='utf-8') as debug_file:
-                    npc_name, dialogues = parse_npc_file(data, debug_file)
-
-                # Format the dialogues
-                formatted_dialogues = format_dialogues(npc_name, dialogues)
-
-                # Write the output to a file named after the NPC with _Dialogue appended
-                output_filename = f"{npc_name}_Dialogue.txt"
-                output_filepath = os.path.join(output_folder, output_filename)
-                with open(output_filepath, 'w', encoding='utf-8') as output_file:
-                    for line in formatted_dialogues:
-                        output_file.write(line + '\n')
+                input_filepaths.append(os.path.join(input_folder, filename))
+
+        # In an incremental run, only files that changed since the last run are parsed again.
+        # With more than one job the NPC files are parsed and formatted in a process pool.
+        parsed_files = file_manifest.process_files(context, 'dialogue_parser', input_filepaths, parse_dialogue_file, salt=file_manifest.source_salt(__file__), jobs=jobs)
+
+        for parsed_file in parsed_files:
+            # The debug messages of each file are written in file order, whichever worker parsed it
+            for message in parsed_file['debug']:
+                log_debug(message)
+
+            output_filepath = os.path.join(output_folder, parsed_file['filename'])
+            with open(output_filepath, 'w', encoding='utf-8') as output_file:
+                for line in parsed_file['lines']:
+                    output_file.write(line + '\n')
 
         # Print the required messages to the terminal
         print(f"NPC dialogues have been successfully processed and written to '{output_folder}'")
     except Exception as e:
-        log_debug(f'An error occurred: {str(e)}')
+        log_debug(f'An error occurred: {str(e)}', 'ERROR')
         print(f"An error occurred. Check the debug output for details: '{debug_output_file}'")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Writes the dialogue of every NPC to Output/Dialogues.")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="Number of worker processes parsing the NPC files (default: 1).")
+    args = parser.parse_args()
+    run(jobs=args.jobs)
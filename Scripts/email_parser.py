@@ -1,23 +1,22 @@
 import os
-import re
-import json
-from Utilities import guid_utils
+from Utilities import debug_log, guid_store, item_references, run_context, text_asset_reader
 
-def load_guid_mapping(mapping_file_path):
+def load_guid_mapping(mapping_file_path, context=None):
     """
     Loads the GUID mapping from the specified JSON file.
 
     Args:
         mapping_file_path (str): The path to the GUID mapping file.
+        context (dict): The shared run context, if run from run_parser.py.
 
     Returns:
         dict: A dictionary mapping GUIDs to their corresponding information.
     """
     try:
-        guid_mapping = guid_utils.load_guid_lookup(mapping_file_path)
+        guid_mapping = run_context.get_guid_lookup(context, mapping_file_path)
         return guid_mapping
     except Exception as e:
-        log_debug(f"Error loading GUID mapping: {e}")
+        log_debug(f"Error loading GUID mapping: {e}", 'ERROR')
         return {}
 
 def load_english_emails(file_path):
@@ -31,21 +30,15 @@ def load_english_emails(file_path):
         list: A list of dictionaries containing email information.
     """
     emails = []
-    with open(file_path, 'r') as file:
-        data = file.read()
-        email_sections = data.split('//EMAIL_')[1:]
-        for section in email_sections:
-            trigger_match = re.match(r'(.*?)\s*{', section, re.DOTALL)
-            trigger = trigger_match.group(1).strip() if trigger_match else ""
-            json_part_match = re.search(r'{(.*?)}', section, re.DOTALL)
-            json_part = json_part_match.group(1).strip() if json_part_match else ""
-            json_part = json_part.replace('\n', '').replace('\r', '')
-            try:
-                email_data = json.loads(f"{{{json_part}}}")
-                email_data['trigger'] = trigger
-                emails.append(email_data)
-            except json.JSONDecodeError:
-                continue
+    for entry in text_asset_reader.iter_entries(file_path):
+        # Each //EMAIL_ header is followed by the entry of that email
+        comment = entry['comment']
+        if not comment or not comment.startswith('EMAIL_'):
+            continue
+        email_data = {name: text_asset_reader.decode_string(value) if isinstance(value, str) else value
+                      for name, value in entry['fields'].items()}
+        email_data['trigger'] = comment[len('EMAIL_'):].strip()
+        emails.append(email_data)
     return emails
 
 def sentence_case(s):
@@ -60,29 +53,23 @@ def sentence_case(s):
     """
     return s.capitalize()
 
-def parse_email_assets(input_directory, guid_mapping, debug_file):
+def parse_email_assets(input_directory, store, debug_file):
     email_subjects = {}
     email_bodies = {}
     english_emails_path = os.path.join(input_directory, 'TextAsset', 'English_Emails.txt')
     
     # Load email subjects and bodies from English_Emails.txt
-    with open(english_emails_path, 'r') as file:
-        data = file.read()
-        email_entries = re.findall(r'{.*?}', data, re.DOTALL)
-        for entry in email_entries:
-            save_id_match = re.search(r'"emailKey":\s*"([^"]+)"', entry)
-            subject_match = re.search(r'"emailSubject":\s*"([^"]+)"', entry)
-            body_match = re.search(r'"emailBody":\s*"([^"]+)"', entry)
-            if save_id_match and subject_match and body_match:
-                save_id = save_id_match.group(1)
-                email_subjects[save_id] = subject_match.group(1)
-                email_bodies[save_id] = body_match.group(1)
+    for entry in text_asset_reader.iter_entries(english_emails_path):
+        fields = entry['fields']
+        save_id = fields.get('emailKey')
+        subject = fields.get('emailSubject')
+        body = fields.get('emailBody')
+        if save_id and subject and body:
+            email_subjects[save_id] = subject
+            email_bodies[save_id] = body
     
     emails = []
-    for entry in guid_mapping:
-        if 'save_id' not in entry or not entry['save_id'].startswith("email_"):
-            continue
-
+    for entry in guid_store.get_entries_with_save_id_prefix("email_", store):
         save_id = entry['save_id']
         filename = entry['filename']
         subject = sentence_case(email_subjects.get(save_id, 'unknown'))
@@ -94,22 +81,18 @@ def parse_email_assets(input_directory, guid_mapping, debug_file):
 
         if os.path.exists(asset_path):
             with open(asset_path, 'r') as file:
-                asset_data = file.read()
-                npc_emailer_match = re.search(r'npcEmailer:\s*\{fileID: \d+, guid: ([a-f0-9]{32}), type: \d+\}', asset_data)
-                if npc_emailer_match:
-                    npc_emailer_guid = npc_emailer_match.group(1)
-                
-                items_to_attach_match = re.findall(r'itemData:\s*\{fileID: \d+, guid: ([a-f0-9]{32}), type: \d+\}.*?amountOfItem:\s*(\d+)', asset_data, re.DOTALL)
-                for item_guid, amount in items_to_attach_match:
+                email_asset = item_references.read_email(file.read())
+                npc_emailer_guid = email_asset['npc_emailer']
+                for item_guid, amount in email_asset['attachments']:
                     items_to_attach.append(f"{item_guid}*{amount}")
 
-        npc_name = sentence_case(next((e['name'] for e in guid_mapping if e['guid'] == npc_emailer_guid), 'unknown'))
+        npc_name = sentence_case(guid_store.get_entry_from_guid(npc_emailer_guid, store, {}).get('name', 'unknown'))
 
         item_names = []
         for item in items_to_attach:
             try:
                 item_guid, item_amount = item.split('*')
-                item_name = sentence_case(next((e['name'] for e in guid_mapping if e['guid'] == item_guid), 'unknown_item'))
+                item_name = sentence_case(guid_store.get_entry_from_guid(item_guid, store, {}).get('name', 'unknown_item'))
                 if item_amount == '1':
                     item_names.append(item_name)
                 else:
@@ -126,9 +109,8 @@ def parse_email_assets(input_directory, guid_mapping, debug_file):
 
     return emails
 
-def log_debug(message):
-    with open(debug_output_path, 'a') as debug_file:
-        debug_file.write(message + '\n')
+def log_debug(message, level='DEBUG'):
+    debug_log.log(debug_output_path, message, level)
 
 # Define the input and output file paths
 input_directory = 'Input/Assets'
@@ -136,27 +118,36 @@ mapping_file_path = 'Output/guid_lookup.json'
 output_file_path = 'Output/Emails/all_emails.txt'
 debug_output_path = '.hidden/debug_output/email_debug_output.txt'
 
-# Ensure the output and debug directories exist
-os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_directory, mapping_file_path, guid_store.get_store_path(mapping_file_path)]
+stage_outputs = [output_file_path, debug_output_path]
 
-try:
-    # Load the GUID mapping
-    guid_mapping = load_guid_mapping(mapping_file_path)
+def run(context=None):
+    # Ensure the output and debug directories exist
+    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+    os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
 
-    # Open the debug file for writing
-    with open(debug_output_path, 'w') as debug_file:
-        debug_file.write(f"GUID to Item Mapping: {guid_mapping}\n")
+    try:
+        # Open the GUID lookup store, which is queried without loading the whole lookup
+        store = run_context.get_guid_store(context, mapping_file_path)
+
+        # Open the debug file for writing
+        with debug_log.open_log(debug_output_path) as debug_file:
+            if debug_log.is_enabled('TRACE'):
+                debug_file.write(f"GUID to Item Mapping: {load_guid_mapping(mapping_file_path, context)}\n", 'TRACE')
 
-        # Parse the email assets and get the formatted content
-        parsed_emails = parse_email_assets(input_directory, guid_mapping, debug_file)
+            # Parse the email assets and get the formatted content
+            parsed_emails = parse_email_assets(input_directory, store, debug_file)
 
-        # Write the output to a new file
-        with open(output_file_path, 'w') as output_file:
-            output_file.write('\n\n'.join(parsed_emails))
+            # Write the output to a new file
+            with open(output_file_path, 'w') as output_file:
+                output_file.write('\n\n'.join(parsed_emails))
+
+        # Print the required messages to the terminal
+        print(f"Parsed emails have been written to '{output_file_path}'")
+    except Exception as e:
+        log_debug(f'An error occurred: {str(e)}', 'ERROR')
+        print(f"An error occurred. Check the debug output for details: '{debug_output_path}'")
 
-    # Print the required messages to the terminal
-    print(f"Parsed emails have been written to '{output_file_path}'")
-except Exception as e:
-    log_debug(f'An error occurred: {str(e)}')
-    print(f"An error occurred. Check the debug output for details: '{debug_output_path}'")
+if __name__ == '__main__':
+    run()
@@ -1,6 +1,6 @@
 import os
 import re
-from Utilities import guid_utils
+from Utilities import debug_log, guid_utils, run_context
 
 # Paths
 input_directory = 'Input/Assets/MonoBehaviour/'
@@ -8,12 +8,12 @@ output_file_path = 'Output/friendship_points.txt'
 debug_output_path = '.hidden/debug_output/friendship_points_debug.txt'
 mapping_file_path = 'Output/guid_lookup.json'
 
-# Ensure the debug output directory exists
-os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_directory, mapping_file_path]
+stage_outputs = [output_file_path, debug_output_path]
 
-def log_debug(message):
-    with open(debug_output_path, 'a') as debug_file:
-        debug_file.write(message + '\n')
+def log_debug(message, level='DEBUG'):
+    debug_log.log(debug_output_path, message, level)
 
 def filter_content(content):
     log_debug("Filtering content...")
@@ -21,7 +21,8 @@ def filter_content(content):
     pattern = re.compile(r"^(%YAML 1\.1|%TAG !u! tag:unity3d\.com,2011:|--- !u!114 &11400000|MonoBehaviour:|  m_ObjectHideFlags: 0|  m_CorrespondingSourceObject: {fileID: 0}|  m_PrefabInstance: {fileID: 0}|  m_PrefabAsset: {fileID: 0}|  m_GameObject: {fileID: 0}|  m_Enabled: 1|  m_EditorHideFlags: 0|  m_Script: {fileID: 11500000, guid: 75d018639740c96f72f68400654af916, type: 3}|  m_Name: friendshipPointsTable|  m_EditorClassIdentifier:)")
     filtered_lines = [line for line in content.split('\n') if not pattern.match(line)]
     filtered_content = '\n'.join(filtered_lines)
-    log_debug(f"Filtered content: {filtered_content}")
+    if debug_log.is_enabled('TRACE'):
+        log_debug(f"Filtered content: {filtered_content}", 'TRACE')
     return filtered_content
 
 def replace_guids_with_names(content, mappings):
@@ -38,26 +39,31 @@ def replace_guids_with_names(content, mappings):
 
     content = gifts_pattern.sub(replace_gift_guid, content)
 
-    log_debug(f"Content after replacing GUIDs: {content}")
+    if debug_log.is_enabled('TRACE'):
+        log_debug(f"Content after replacing GUIDs: {content}", 'TRACE')
     return content
 
-def main():
+def run(context=None):
+    # Ensure the debug output directory exists
+    os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+
     try:
         # Clear the debug file at the beginning of each run
-        open(debug_output_path, 'w').close()
+        debug_log.clear_log(debug_output_path)
 
         # Load GUID lookup data
         log_debug("Loading GUID lookup data...")
-        guid_lookup_data = guid_utils.load_guid_lookup(mapping_file_path)
-        mappings = guid_utils.create_mappings(guid_lookup_data)
-        log_debug(f"Loaded mappings: {mappings}")
+        mappings = run_context.get_mappings(context, mapping_file_path)
+        if debug_log.is_enabled('TRACE'):
+            log_debug(f"Loaded mappings: {mappings}", 'TRACE')
 
         # Read the friendshipPointsTable.asset file
         input_file_path = os.path.join(input_directory, 'friendshipPointsTable.asset')
         log_debug(f"Reading file: {input_file_path}")
         with open(input_file_path, 'r') as input_file:
             friendship_data = input_file.read()
-        log_debug(f"Original content: {friendship_data}")
+        if debug_log.is_enabled('TRACE'):
+            log_debug(f"Original content: {friendship_data}", 'TRACE')
 
         # Filter the content
         filtered_content = filter_content(friendship_data)
@@ -77,8 +83,8 @@ def main():
         print(f"Friendship point information has been successfully extracted, formatted, and written to '{output_file_path}'.")
 
     except Exception as e:
-        log_debug(f'An error occurred: {str(e)}')
+        log_debug(f'An error occurred: {str(e)}', 'ERROR')
         print(f"An error occurred. Check the debug output for details: '{debug_output_path}'.")
 
 if __name__ == "__main__":
-    main()
+    run()
@@ -1,6 +1,82 @@
 import os
 import re
 import json
+import textwrap
+from Utilities import asset_index, debug_log, guid_store, run_context, text_asset_reader
+
+def load_name_mappings(english_items_file, english_quests_file):
+    """
+    Loads the itemKey and questKey to display name mappings from the English text assets.
+
+    Args:
+        english_items_file (str): The path to the English_Items.txt file.
+        english_quests_file (str): The path to the English_Quests.txt file.
+
+    Returns:
+        tuple: The itemKey to itemName and questKey to questName dictionaries.
+    """
+    # Load itemKey to itemName mappings from English_Items.txt
+    item_mapping = text_asset_reader.load_entries(english_items_file, 'itemKey', 'itemName')
+
+    # Load questKey to questName mappings from English_Quests.txt
+    quest_mapping = {
+        quest_key: quest_name
+        for quest_key, quest_name in text_asset_reader.load_entries(english_quests_file, 'questKey', 'questName').items()
+        if re.fullmatch(r'quest_\d+', quest_key)
+    }
+
+    return item_mapping, quest_mapping
+
+def iter_guid_to_item_mapping(directory, item_mapping, quest_mapping, debug_file):
+    """
+    Yields one GUID mapping entry per .asset.meta file, joined with its .asset file by base filename.
+
+    The asset index pairs each .asset with its .asset.meta in a single directory walk,
+    so every entry is complete as soon as it is yielded.
+
+    Args:
+        directory (str): The path to the directory containing .meta and .asset files.
+        item_mapping (dict): itemKey to itemName, from English_Items.txt.
+        quest_mapping (dict): questKey to questName, from English_Quests.txt.
+        debug_file (file object): The file object to write debug information to.
+
+    Yields:
+        dict: The GUID mapping entry for one asset.
+    """
+    for asset in asset_index.load_asset_index(directory).values():
+        base_name = asset['filename']
+        filename = f"{base_name}.asset"
+        guid = asset['guid']
+        if guid:
+            debug_file.write(f"Mapped GUID {guid} to file {base_name}\n")
+
+        if not asset['asset_stamp']:
+            if guid:
+                yield {"guid": guid, "filename": base_name}
+            continue
+
+        save_id = asset['save_id']
+        if not save_id:
+            debug_file.write(f"File {filename}: No saveID found.\n")
+            if guid:
+                yield {"guid": guid, "filename": base_name}
+            continue
+
+        if not guid:
+            continue
+
+        if save_id.startswith("item_"):
+            mapped_name = item_mapping.get(save_id, "").strip()
+            if not mapped_name:
+                mapped_name = asset['m_name']
+        elif save_id.startswith("quest_"):
+            mapped_name = quest_mapping.get(save_id, "").strip()
+        else:
+            mapped_name = asset['item_name'] if asset['item_name'] else asset['m_name']
+
+        item_category = asset['item_category'] or 'unknown'
+        debug_file.write(f"File {filename}: saveID={save_id}, name={mapped_name}, category={item_category}\n")
+        yield {"guid": guid, "filename": base_name, "save_id": save_id, "name": mapped_name, "category": item_category}
 
 def load_guid_to_item_mapping(directory, english_items_file, english_quests_file, debug_file):
     """
@@ -16,89 +92,61 @@ def load_guid_to_item_mapping(directory, english_items_file, english_quests_file
     Returns:
         list: A list of dictionaries mapping GUIDs to their corresponding information.
     """
-    guid_mapping = []
+    item_mapping, quest_mapping = load_name_mappings(english_items_file, english_quests_file)
+    return list(iter_guid_to_item_mapping(directory, item_mapping, quest_mapping, debug_file))
 
-    # Load itemKey to itemName mappings from English_Items.txt
-    item_mapping = {}
-    with open(english_items_file, 'r') as file:
-        content = file.read()
-        matches = re.findall(r'"itemKey": "(.*?)",\s*"itemName": "(.*?)"', content)
-        for itemKey, itemName in matches:
-            item_mapping[itemKey] = itemName
+def write_guid_mapping(entries, output_file):
+    """
+    Writes GUID mapping entries to the output file as they are produced, in the same
+    layout as json.dump(entries, output_file, indent=2).
 
-    # Load questKey to questName mappings from English_Quests.txt
-    quest_mapping = {}
-    with open(english_quests_file, 'r') as file:
-        content = file.read()
-        matches = re.findall(r'"questKey": "(quest_\d+)",\s*"questName": "(.*?)"', content)
-        for questKey, questName in matches:
-            quest_mapping[questKey] = questName
-
-    # First, map GUIDs to file names
-    for filename in os.listdir(directory):
-        if filename.endswith(".asset.meta"):
-            base_name = filename.replace('.asset.meta', '')
-            with open(os.path.join(directory, filename), 'r') as file:
-                data = file.read()
-                guid_match = re.search(r'guid: ([a-f0-9]{32})', data)
-                if guid_match:
-                    guid = guid_match.group(1)
-                    guid_mapping.append({"guid": guid, "filename": base_name})
-                    debug_file.write(f"Mapped GUID {guid} to file {base_name}\n")
-
-    # Then, map file names to saveIDs and item names or m_Name
-    for filename in os.listdir(directory):
-        if filename.endswith(".asset"):
-            base_name = filename.replace('.asset', '')
-            with open(os.path.join(directory, filename), 'r') as file:
-                data = file.read()
-                save_id_match = re.search(r'saveID:\s*(\w+)', data)
-                item_name_match = re.search(r'itemName:\s*(.*)', data)
-                name_match = re.search(r'm_Name:\s*(.*)', data)
-                category_match = re.search(r'itemCategory:\s*(.*)', data)
-                
-                save_id = save_id_match.group(1).strip() if save_id_match else None
-                item_name = item_name_match.group(1).strip() if item_name_match else None
-                m_name = name_match.group(1).strip() if name_match else None
-                item_category = category_match.group(1).strip() if category_match else 'unknown'
-
-                if save_id:
-                    if save_id.startswith("item_"):
-                        mapped_name = item_mapping.get(save_id, "").strip()
-                        if not mapped_name:
-                            mapped_name = m_name
-                        else:
-                            mapped_name = mapped_name
-                    elif save_id.startswith("quest_"):
-                        mapped_name = quest_mapping.get(save_id, "").strip()
-                    else:
-                        mapped_name = item_name if item_name else m_name
-
-                    for entry in guid_mapping:
-                        if entry["filename"] == base_name:
-                            entry["save_id"] = save_id
-                            entry["name"] = mapped_name
-                            entry["category"] = item_category
-                            debug_file.write(f"File {filename}: saveID={save_id}, name={mapped_name}, category={item_category}\n")
-                else:
-                    debug_file.write(f"File {filename}: No saveID found.\n")
-    return guid_mapping
+    Args:
+        entries (iterable): The GUID mapping entries.
+        output_file (file object): The file object to write the JSON list to.
+
+    Returns:
+        list: The entries that were written.
+    """
+    written = []
+    output_file.write('[')
+    separator = '\n'
+    for entry in entries:
+        written.append(entry)
+        output_file.write(separator)
+        output_file.write(textwrap.indent(json.dumps(entry, indent=2), '  '))
+        separator = ',\n'
+    output_file.write('\n]' if separator != '\n' else ']')
+    return written
 
 # Define the input and output file paths
 input_directory = 'Input/Assets/MonoBehaviour'
 english_items_file = 'Input/Assets/TextAsset/English_Items.txt'
 english_quests_file = 'Input/Assets/TextAsset/English_Quests.txt'
 output_file_path = 'Output/guid_lookup.json'
+store_file_path = guid_store.get_store_path(output_file_path)
 debug_output_path = '.hidden/debug_output/guid_debug_output.txt'
 
-# Ensure the output and debug directories exist
-os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
-
-# Open the debug file for writing
-with open(debug_output_path, 'w') as debug_file:
-    guid_mapping = load_guid_to_item_mapping(input_directory, english_items_file, english_quests_file, debug_file)
-    with open(output_file_path, 'w') as output_file:
-        json.dump(guid_mapping, output_file, indent=2)
-    print(f"GUID mapping has been written to {output_file_path}")
-    print(f"Debug information has been written to {debug_output_path}")
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_directory, english_items_file, english_quests_file]
+stage_outputs = [output_file_path, store_file_path, debug_output_path]
+
+def run(context=None):
+    # Ensure the output and debug directories exist
+    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+    os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+
+    # Open the debug file for writing
+    with debug_log.open_log(debug_output_path) as debug_file:
+        item_mapping, quest_mapping = load_name_mappings(english_items_file, english_quests_file)
+        with open(output_file_path, 'w') as output_file:
+            entries = iter_guid_to_item_mapping(input_directory, item_mapping, quest_mapping, debug_file)
+            guid_mapping = write_guid_mapping(entries, output_file)
+        # The same entries, indexed for scripts that only look up a few of them
+        guid_store.save_guid_store(guid_mapping, store_file_path)
+        # Later scripts in the same run use this list instead of re-reading guid_lookup.json
+        run_context.set_guid_lookup(context, output_file_path, guid_mapping)
+        print(f"GUID mapping has been written to {output_file_path} and {store_file_path}")
+        print(f"Debug information has been written to {debug_output_path}")
+
+if __name__ == '__main__':
+    run()
@@ -1,7 +1,9 @@
 import os
 import re
-import json
-from Utilities import guid_utils
+from Utilities import asset_index, debug_log, field_extractor, file_manifest, guid_utils, run_context
+
+# The scalar fields read from each item asset
+item_fields = ['itemType', 'decoType', 'buyValue', 'sellValue', 'healthGain', 'energyGain']
 
 def adjust_categories(item_name, item_category, sub_category, item_type):
     clothing_categories = ["Accessory", "Hair", "Hat", "Pants", "Shirt", "Helmet"]
@@ -46,86 +48,93 @@ def get_subcategory_text(deco_type):
     }
     return deco_type_mapping.get(deco_type, '')
 
-def extract_price_and_restoration_info(directory, guid_mapping, sell_output_file_path, no_sell_output_file_path, debug_file_path):
+def read_item_asset(file_path):
+    """
+    Reads the scalar fields of an item asset, as raw text so the result can be cached per file.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return field_extractor.extract_fields(file.read(), item_fields)
+
+def extract_price_and_restoration_info(directory, mappings, sell_output_file_path, no_sell_output_file_path, debug_file_path, context=None):
     extracted_info = {}
 
-    with open(debug_file_path, 'w') as debug_file:
-        for filename in os.listdir(directory):
-            if filename.endswith(".asset"):
-                with open(os.path.join(directory, filename), 'r') as file:
-                    data = file.read()
-
-                    save_id_match = re.search(r'saveID:\s*(\w+)', data)
-                    if save_id_match and "item" in save_id_match.group(1):
-                        save_id = save_id_match.group(1).strip()
-                        item_info = next((entry for entry in guid_mapping if entry.get('save_id') == save_id), {})
-                        item_name = item_info.get('name', 'unknown')
-                        item_category = item_info.get('category', 'unknown')
-                        if item_category in ["Craft", "3D schematics", "Seeds", "Tree Seeds"]:
-                            continue  # Skip items with itemCategory = Craft, 3D schematics, Seeds, or Tree Seeds
-
-                        item_type = int(re.search(r'itemType:\s*(\d+)', data).group(1)) if re.search(r'itemType:\s*(\d+)', data) else 0
-                        
-                        sub_category = ""
-                        deco_type = ""
-                        if item_type == 6:
-                            deco_type_match = re.search(r'decoType:\s*(\d+)', data)
-                            if deco_type_match:
-                                deco_type = deco_type_match.group(1)
-                                sub_category = get_subcategory_text(deco_type)
-                                debug_file.write(f"DecoType found for {item_name} ({filename}): {deco_type} -> {sub_category}\n")
-                            else:
-                                debug_file.write(f"DecoType not found for {item_name} ({filename})\n")
-                        else:
-                            deco_type_match = re.search(r'decoType:\s*(\d+)', data)
-                            if deco_type_match:
-                                deco_type = deco_type_match.group(1)
-
-                        item_category, sub_category = adjust_categories(item_name, item_category, sub_category, item_type)
-
-                        buy_value = int(re.search(r'buyValue:\s*(\d+)', data).group(1)) if re.search(r'buyValue:\s*(\d+)', data) else 0
-                        sell_value = int(re.search(r'sellValue:\s*(-?\d+)', data).group(1)) if re.search(r'sellValue:\s*(-?\d+)', data) else 0
-                        health_gain = int(re.search(r'healthGain:\s*(\d+)', data).group(1)) if re.search(r'healthGain:\s*(\d+)', data) else 0
-                        energy_gain = int(re.search(r'energyGain:\s*(\d+)', data).group(1)) if re.search(r'energyGain:\s*(\d+)', data) else 0
-
-                        base_item_name = re.sub(r'(_super_rad|_super|_rad)$', '', filename.replace('.asset', ''))
-
-                        if base_item_name not in extracted_info:
-                            extracted_info[base_item_name] = {
-                                "normal": {},
-                                "super": {},
-                                "radiated": {},
-                                "super_radiated": {}
-                            }
-
-                        normal_info = {
-                            "item_name": item_name,
-                            "item_category": item_category,
-                            "sub_category": sub_category,
-                            "deco_type": deco_type,
-                            "item_type": item_type,
-                            "buy_value": buy_value,
-                            "sell_value": sell_value,
-                            "health_gain": health_gain,
-                            "energy_gain": energy_gain
-                        }
-
-                        if '_super_rad' in filename:
-                            extracted_info[base_item_name]["super_radiated"] = {
-                                "sell_value": sell_value,
-                                "health_gain": health_gain,
-                                "energy_gain": energy_gain
-                            }
-                        elif '_super' in filename:
-                            extracted_info[base_item_name]["super"] = {
-                                "sell_value": sell_value,
-                                "health_gain": health_gain,
-                                "energy_gain": energy_gain
-                            }
-                        elif '_rad' in filename:
-                            extracted_info[base_item_name]["radiated"] = normal_info
-                        else:
-                            extracted_info[base_item_name]["normal"] = normal_info
+    items = []
+    for asset in asset_index.get_item_assets(asset_index.load_asset_index(directory)):
+        item_info = guid_utils.get_entry_from_save_id(asset['save_id'], mappings, {})
+        if item_info.get('category', 'unknown') in ["Craft", "3D schematics", "Seeds", "Tree Seeds"]:
+            continue  # Skip items with itemCategory = Craft, 3D schematics, Seeds, or Tree Seeds
+        items.append((asset, item_info))
+
+    # In an incremental run, only item assets that changed since the last run are read again
+    file_paths = [os.path.join(directory, f"{asset['filename']}.asset") for asset, item_info in items]
+    item_fields_list = file_manifest.process_files(context, 'infobox_item_parser', file_paths, read_item_asset, salt=file_manifest.source_salt(__file__))
+
+    with debug_log.open_log(debug_file_path) as debug_file:
+        for (asset, item_info), fields in zip(items, item_fields_list):
+            filename = f"{asset['filename']}.asset"
+            item_name = item_info.get('name', 'unknown')
+            item_category = item_info.get('category', 'unknown')
+
+            item_type = field_extractor.get_int(fields, 'itemType')
+
+            sub_category = ""
+            deco_type = ""
+            deco_type_match = field_extractor.get_match(fields, 'decoType')
+            if item_type == 6:
+                if deco_type_match:
+                    deco_type = deco_type_match
+                    sub_category = get_subcategory_text(deco_type)
+                    debug_file.write(f"DecoType found for {item_name} ({filename}): {deco_type} -> {sub_category}\n")
+                else:
+                    debug_file.write(f"DecoType not found for {item_name} ({filename})\n")
+            elif deco_type_match:
+                deco_type = deco_type_match
+
+            item_category, sub_category = adjust_categories(item_name, item_category, sub_category, item_type)
+
+            buy_value = field_extractor.get_int(fields, 'buyValue')
+            sell_value = field_extractor.get_int(fields, 'sellValue', signed=True)
+            health_gain = field_extractor.get_int(fields, 'healthGain')
+            energy_gain = field_extractor.get_int(fields, 'energyGain')
+
+            base_item_name = re.sub(r'(_super_rad|_super|_rad)$', '', filename.replace('.asset', ''))
+
+            if base_item_name not in extracted_info:
+                extracted_info[base_item_name] = {
+                    "normal": {},
+                    "super": {},
+                    "radiated": {},
+                    "super_radiated": {}
+                }
+
+            normal_info = {
+                "item_name": item_name,
+                "item_category": item_category,
+                "sub_category": sub_category,
+                "deco_type": deco_type,
+                "item_type": item_type,
+                "buy_value": buy_value,
+                "sell_value": sell_value,
+                "health_gain": health_gain,
+                "energy_gain": energy_gain
+            }
+
+            if '_super_rad' in filename:
+                extracted_info[base_item_name]["super_radiated"] = {
+                    "sell_value": sell_value,
+                    "health_gain": health_gain,
+                    "energy_gain": energy_gain
+                }
+            elif '_super' in filename:
+                extracted_info[base_item_name]["super"] = {
+                    "sell_value": sell_value,
+                    "health_gain": health_gain,
+                    "energy_gain": energy_gain
+                }
+            elif '_rad' in filename:
+                extracted_info[base_item_name]["radiated"] = normal_info
+            else:
+                extracted_info[base_item_name]["normal"] = normal_info
 
         for item, info in sorted(extracted_info.items(), key=lambda x: x[1]["normal"].get("item_name", "unknown_item")):
             debug_file.write(f"Extracted for {item}: {info}\n")
@@ -234,9 +243,8 @@ def extract_price_and_restoration_info(directory, guid_mapping, sell_output_file
 
                 output_file.write("}}\n\n")
 
-def log_debug(message):
-    with open(debug_file_path, 'a') as debug_file:
-        debug_file.write(message + '\n')
+def log_debug(message, level='DEBUG'):
+    debug_log.log(debug_file_path, message, level)
 
 # Define the input and output file paths
 input_directory = 'Input/Assets/MonoBehaviour'
@@ -245,20 +253,28 @@ sell_output_file_path = 'Output/Infobox/infobox.txt'
 no_sell_output_file_path = 'Output/Infobox/infobox_no_sell.txt'
 debug_file_path = '.hidden/debug_output/price_restoration_debug_output.txt'
 
-# Ensure the output and debug directories exist
-os.makedirs(os.path.dirname(sell_output_file_path), exist_ok=True)
-os.makedirs(os.path.dirname(no_sell_output_file_path), exist_ok=True)
-os.makedirs(os.path.dirname(debug_file_path), exist_ok=True)
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_directory, mapping_file_path]
+stage_outputs = [sell_output_file_path, no_sell_output_file_path, debug_file_path]
+
+def run(context=None):
+    # Ensure the output and debug directories exist
+    os.makedirs(os.path.dirname(sell_output_file_path), exist_ok=True)
+    os.makedirs(os.path.dirname(no_sell_output_file_path), exist_ok=True)
+    os.makedirs(os.path.dirname(debug_file_path), exist_ok=True)
+
+    try:
+        # Load the GUID mapping indexes
+        mappings = run_context.get_mappings(context, mapping_file_path)
 
-try:
-    # Load the GUID mapping
-    guid_mapping = guid_utils.load_guid_lookup(mapping_file_path)
+        # Extract the price and restoration information
+        extract_price_and_restoration_info(input_directory, mappings, sell_output_file_path, no_sell_output_file_path, debug_file_path, context)
 
-    # Extract the price and restoration information
-    extract_price_and_restoration_info(input_directory, guid_mapping, sell_output_file_path, no_sell_output_file_path, debug_file_path)
+        # Print the required messages to the terminal
+        print(f"Price and restoration information has been written to '{sell_output_file_path}' and '{no_sell_output_file_path}'")
+    except Exception as e:
+        log_debug(f'An error occurred: {str(e)}', 'ERROR')
+        print(f"An error occurred. Check the debug output for details: '{debug_file_path}'")
 
-    # Print the required messages to the terminal
-    print(f"Price and restoration information has been written to '{sell_output_file_path}' and '{no_sell_output_file_path}'")
-except Exception as e:
-    log_debug(f'An error occurred: {str(e)}')
-    print(f"An error occurred. Check the debug output for details: '{debug_file_path}'")
+if __name__ == '__main__':
+    run()
@@ -1,66 +1,81 @@
 import os
 import re
-import json
-from Utilities import guid_utils
+from Utilities import asset_index, debug_log, field_extractor, file_manifest, guid_utils, run_context
 
-def convert_guid_to_name(guid, guid_mapping):
-    for entry in guid_mapping:
-        if entry.get('guid') == guid:
-            return entry.get('name', 'unknown').capitalize()  # Convert to sentence case
+# The scalar fields read from each seed asset
+seed_fields = ['itemType', 'planet', 'produceDuration', 'maxProductionCycles', 'pickAmount', 'extraPickPercent', 'produceDurationAfterMature', 'sellValue']
+
+def convert_guid_to_name(guid, mappings):
+    entry = guid_utils.get_entry_from_guid(guid, mappings)
+    if entry is not None:
+        return entry.get('name', 'unknown').capitalize()  # Convert to sentence case
     return 'Unknown'
 
-def extract_seed_data(data, guid_mapping):
+def read_seed_asset(file_path):
+    """
+    Reads the scalar fields of a seed asset and the GUIDs of what it produces, so the result can be cached per file.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        data = file.read()
+    # Read every field in one pass over the asset
+    return {
+        'fields': field_extractor.extract_fields(data, seed_fields),
+        'produces': re.findall(r'itemToDrop:\s*\{[^}]*guid:\s*([\w\d]+)', data),
+    }
+
+def extract_seed_data(seed_asset, mappings):
+    fields = seed_asset['fields']
+
     seed_info = {}
-    seed_info["planet"] = re.search(r'planet:\s*(\w+)', data).group(1).capitalize() if re.search(r'planet:\s*(\w+)', data) else ''
+    planet = field_extractor.get_match(fields, 'planet', r'\w+')
+    seed_info["planet"] = planet.capitalize() if planet else ''
     
-    produces_items = re.findall(r'itemToDrop:\s*\{[^}]*guid:\s*([\w\d]+)', data)
-    produces_names = [convert_guid_to_name(guid, guid_mapping) for guid in produces_items]
+    produces_names = [convert_guid_to_name(guid, mappings) for guid in seed_asset['produces']]
     
     # Filter out "super" versions
     filtered_produces = [name for name in produces_names if "Super " not in name]
 
     seed_info["produces"] = filtered_produces
-    seed_info["produceDuration"] = re.search(r'produceDuration:\s*(\d+)', data).group(1) if re.search(r'produceDuration:\s*(\d+)', data) else ''
-    seed_info["maxProductionCycles"] = re.search(r'maxProductionCycles:\s*(\d+)', data).group(1) if re.search(r'maxProductionCycles:\s*(\d+)', data) else ''
-    pick_amount = int(re.search(r'pickAmount:\s*(\d+)', data).group(1)) if re.search(r'pickAmount:\s*(\d+)', data) else 0
-    extra_pick_percent = float(re.search(r'extraPickPercent:\s*([\d.]+)', data).group(1)) if re.search(r'extraPickPercent:\s*([\d.]+)', data) else 0
-    seed_info["cropYield"] = pick_amount + extra_pick_percent
-    seed_info["produceDurationAfterMature"] = re.search(r'produceDurationAfterMature:\s*(\d+)', data).group(1) if re.search(r'produceDurationAfterMature:\s*(\d+)', data) else ''
+    seed_info["produceDuration"] = field_extractor.get_match(fields, 'produceDuration') or ''
+    seed_info["maxProductionCycles"] = field_extractor.get_match(fields, 'maxProductionCycles') or ''
+    pick_amount = field_extractor.get_int(fields, 'pickAmount')
+    extra_pick_percent = field_extractor.get_match(fields, 'extraPickPercent', r'[\d.]+')
+    seed_info["cropYield"] = pick_amount + (float(extra_pick_percent) if extra_pick_percent else 0)
+    seed_info["produceDurationAfterMature"] = field_extractor.get_match(fields, 'produceDurationAfterMature') or ''
     
-    sell_value_match = re.search(r'sellValue:\s*(-?\d+)', data)
-    seed_info["sellValue"] = sell_value_match.group(1) if sell_value_match else ''
+    seed_info["sellValue"] = field_extractor.get_match(fields, 'sellValue', r'-?\d+') or ''
     
     return seed_info
 
-def extract_seed_info(directory, guid_mapping, seed_output_file_path, debug_file_path):
+def extract_seed_info(directory, mappings, seed_output_file_path, debug_file_path, context=None):
     extracted_info = {}
 
-    for filename in os.listdir(directory):
-        if filename.endswith(".asset"):
-            with open(os.path.join(directory, filename), 'r') as file:
-                data = file.read()
-
-                save_id_match = re.search(r'saveID:\s*(\w+)', data)
-                if save_id_match and "item" in save_id_match.group(1):
-                    save_id = save_id_match.group(1).strip()
-                    item_info = next((entry for entry in guid_mapping if entry.get('save_id') == save_id), {})
-                    item_name = item_info.get('name', 'unknown').capitalize()
-                    item_category = item_info.get('category', 'unknown').capitalize()
-                    if item_category not in ["Seeds", "Tree seeds"]:
-                        continue  # Skip non-seed items
-
-                    item_type = int(re.search(r'itemType:\s*(\d+)', data).group(1)) if re.search(r'itemType:\s*(\d+)', data) else 0
-                    seed_info = extract_seed_data(data, guid_mapping)
-
-                    base_item_name = filename.replace('.asset', '')
-                    extracted_info[base_item_name] = {
-                        "item_name": item_name,
-                        "item_category": "Tree seed" if item_category == "Tree seeds" else "Seed",
-                        "item_type": item_type,
-                        "seed_info": seed_info
-                    }
-
-    with open(debug_file_path, 'w') as debug_file:
+    seeds = []
+    for asset in asset_index.get_item_assets(asset_index.load_asset_index(directory)):
+        item_info = guid_utils.get_entry_from_save_id(asset['save_id'], mappings, {})
+        if item_info.get('category', 'unknown').capitalize() not in ["Seeds", "Tree seeds"]:
+            continue  # Skip non-seed items
+        seeds.append((asset, item_info))
+
+    # In an incremental run, only seed assets that changed since the last run are read again
+    file_paths = [os.path.join(directory, f"{asset['filename']}.asset") for asset, item_info in seeds]
+    seed_assets = file_manifest.process_files(context, 'infobox_seed_parser', file_paths, read_seed_asset, salt=file_manifest.source_salt(__file__))
+
+    for (asset, item_info), seed_asset in zip(seeds, seed_assets):
+        item_name = item_info.get('name', 'unknown').capitalize()
+        item_category = item_info.get('category', 'unknown').capitalize()
+        item_type = field_extractor.get_int(seed_asset['fields'], 'itemType')
+        seed_info = extract_seed_data(seed_asset, mappings)
+
+        base_item_name = asset['filename']
+        extracted_info[base_item_name] = {
+            "item_name": item_name,
+            "item_category": "Tree seed" if item_category == "Tree seeds" else "Seed",
+            "item_type": item_type,
+            "seed_info": seed_info
+        }
+
+    with debug_log.open_log(debug_file_path) as debug_file:
         for item, info in sorted(extracted_info.items(), key=lambda x: x[1].get("item_name", "Unknown item")):
             debug_file.write(f"Extracted for {item}: {info}\n")
 
@@ -91,9 +106,8 @@ def extract_seed_info(directory, guid_mapping, seed_output_file_path, debug_file
             seed_output_file.write(f"|regrowth    = {seed_info.get('produceDurationAfterMature', '')}\n")
             seed_output_file.write("}}\n\n")
 
-def log_debug(message):
-    with open(debug_file_path, 'a') as debug_file:
-        debug_file.write(message + '\n')
+def log_debug(message, level='DEBUG'):
+    debug_log.log(debug_file_path, message, level)
 
 # Define the input and output file paths
 input_directory = 'Input/Assets/MonoBehaviour'
@@ -101,19 +115,27 @@ mapping_file_path = 'Output/guid_lookup.json'
 seed_output_file_path = 'Output/Infobox/seed_infobox.txt'
 debug_file_path = '.hidden/debug_output/seed_debug_output.txt'
 
-# Ensure the output and debug directories exist
-os.makedirs(os.path.dirname(seed_output_file_path), exist_ok=True)
-os.makedirs(os.path.dirname(debug_file_path), exist_ok=True)
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_directory, mapping_file_path]
+stage_outputs = [seed_output_file_path, debug_file_path]
+
+def run(context=None):
+    # Ensure the output and debug directories exist
+    os.makedirs(os.path.dirname(seed_output_file_path), exist_ok=True)
+    os.makedirs(os.path.dirname(debug_file_path), exist_ok=True)
+
+    try:
+        # Load the GUID mapping indexes
+        mappings = run_context.get_mappings(context, mapping_file_path)
 
-try:
-    # Load the GUID mapping
-    guid_mapping = guid_utils.load_guid_lookup(mapping_file_path)
+        # Extract the seed information
+        extract_seed_info(input_directory, mappings, seed_output_file_path, debug_file_path, context)
 
-    # Extract the seed information
-    extract_seed_info(input_directory, guid_mapping, seed_output_file_path, debug_file_path)
+        # Print the required messages to the terminal
+        print(f"Seed information has been written to '{seed_output_file_path}'")
+    except Exception as e:
+        log_debug(f'An error occurred: {str(e)}', 'ERROR')
+        print(f"An error occurred. Check the debug output for details: '{debug_file_path}'")
 
-    # Print the required messages to the terminal
-    print(f"Seed information has been written to '{seed_output_file_path}'")
-except Exception as e:
-    log_debug(f'An error occurred: {str(e)}')
-    print(f"An error occurred. Check the debug output for details: '{debug_file_path}'")
+if __name__ == '__main__':
+    run()
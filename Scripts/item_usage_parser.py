@@ -0,0 +1,89 @@
+import os
+import argparse
+from Utilities import debug_log, run_context, usage_index
+
+# Define paths
+input_directory = 'Input/Assets/MonoBehaviour'
+guid_lookup_path = 'Output/guid_lookup.json'
+output_file_path = 'Output/item_usage.sqlite'
+debug_output_path = '.hidden/debug_output/item_usage_debug.txt'
+
+# The outputs of the parsers whose recipes, drops, listings, gifts, requests and emails the index
+# collects, so it is rebuilt after them and from the same assets
+parser_outputs = [
+    'Output/Recipes/crafting_recipes.txt',
+    'Output/Recipes/machine_recipes.txt',
+    'Output/Drops/loot_list.txt',
+    'Output/Drops/expected_drops.txt',
+    'Output/Shops',
+    'Output/Gifts/npc_gift_overrides.txt',
+    'Output/Missions/mission_bb_request_*.txt',
+    'Output/Emails/all_emails.txt',
+]
+
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_directory, guid_lookup_path, *parser_outputs]
+stage_outputs = [output_file_path, debug_output_path]
+
+def log_debug(message, level='DEBUG'):
+    debug_log.log(debug_output_path, message, level)
+
+def query(items):
+    """
+    Prints where each item is used, from the saved usage index.
+
+    Args:
+        items (list): Item names or GUIDs.
+    """
+    connection = usage_index.open_usage_index(output_file_path)
+    try:
+        for text in items:
+            matches = usage_index.find_items(connection, text)
+            if not matches:
+                print(f"# {text}\n  not used anywhere\n")
+                continue
+            for guid, name in matches:
+                print(f"# {(name or 'unknown_item').capitalize()} [{guid}]")
+                for kind, source, detail in usage_index.get_uses(connection, guid):
+                    print(f"  {kind:<8} {source}: {detail}")
+                print()
+    finally:
+        connection.close()
+
+def run(context=None):
+    # Ensure output directories exist
+    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+    os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+    # Clear the debug file at the start, since it is only appended to below
+    debug_log.clear_log(debug_output_path)
+
+    try:
+        mappings = run_context.get_mappings(context, guid_lookup_path)
+    except Exception as e:
+        log_debug(f"Failed to load GUID lookup: {e}", 'ERROR')
+        print("An error occurred. Check the debug output for details.")
+        return
+
+    # Every use of every item, collected once for the whole run
+    usage = usage_index.build_usage_index(input_directory, mappings, context)
+    usage_index.save_usage_index(usage, mappings, output_file_path)
+
+    uses = sum(len(item_uses) for item_uses in usage.values())
+    log_debug(f"Indexed {uses} uses of {len(usage)} items")
+    for kind in usage_index.kinds:
+        log_debug(f"{kind}: {sum(1 for item_uses in usage.values() for use in item_uses if use[0] == kind)} uses")
+
+    print(f"Item usage index has been written to {output_file_path}")
+    print(f"Debug information has been written to {debug_output_path}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Builds the index of where every item is used, or looks items up in it.")
+    parser.add_argument('items', nargs='*',
+                        help="Item names or GUIDs to look up. Without any, the index is rebuilt.")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Rebuild the index before looking the items up.")
+    args = parser.parse_args()
+    if not args.items or args.rebuild or not os.path.exists(output_file_path):
+        run()
+    if args.items:
+        query(args.items)
@@ -1,5 +1,6 @@
 import re
 import os
+from Utilities import debug_log
 
 # Function to convert a string to Title Case and remove underscores
 def to_title_case(s):
@@ -37,7 +38,7 @@ def get_data_title(library_subtopic):
 
 def process_library_file(input_file, output_file, debug_file):
     try:
-        with open(input_file, 'r', encoding='utf-8') as infile, open(output_file, 'w', encoding='utf-8') as outfile, open(debug_file, 'w', encoding='utf-8') as debugfile:
+        with open(input_file, 'r', encoding='utf-8') as infile, open(output_file, 'w', encoding='utf-8') as outfile, debug_log.open_log(debug_file) as debugfile:
             # Log initial info to the debug file
             debugfile.write("Starting file processing...\n")
             
@@ -105,17 +106,25 @@ def process_library_file(input_file, output_file, debug_file):
         print(f"Processing complete. Formatted output saved to {output_file}.")
     except Exception as e:
         print(f"An error occurred: {e}")
-        with open(debug_file, 'a', encoding='utf-8') as debugfile:
-            debugfile.write(f"Error: {e}\n")
+        with debug_log.open_log(debug_file, append=True) as debugfile:
+            debugfile.write(f"Error: {e}\n", 'ERROR')
 
 # Paths
 input_directory = 'Input/Assets/TextAsset/English_Library.txt'
 output_file_path = 'Output/LIBRARY_sim.txt'  # Output to a .txt file
 debug_output_path = '.hidden/debug_output/lib_sim_debug.txt'
 
-# Ensure output directories exist
-os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_directory]
+stage_outputs = [output_file_path, debug_output_path]
 
-# Run the processing function
-process_library_file(input_directory, output_file_path, debug_output_path)
+def run(context=None):
+    # Ensure output directories exist
+    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+    os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+
+    # Run the processing function
+    process_library_file(input_directory, output_file_path, debug_output_path)
+
+if __name__ == '__main__':
+    run()
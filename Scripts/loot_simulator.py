@@ -0,0 +1,121 @@
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from Utilities import debug_log, guid_utils, loot_graph, loot_simulation, run_context
+
+def log_debug(message, level='DEBUG'):
+    debug_log.log(debug_output_path, message, level)
+
+def to_sentence_case(text):
+    """
+    Convert a string to sentence case.
+    """
+    return text.capitalize()
+
+# The loot tables of a worker process, read once per worker
+_worker_loot_tables = None
+
+def _init_worker(loot_tables, debug_level):
+    global _worker_loot_tables
+    _worker_loot_tables = loot_tables
+    debug_log.log_level = debug_level
+
+def simulate_loot_table(task):
+    """
+    Simulate one loot table and summarize its drops.
+
+    Args:
+        task (tuple): (position of the table in the list, filename, rolls, samples, seed, independent).
+
+    Returns:
+        tuple: (filename, its summary from loot_simulation.summarize, or None when the table doesn't exist)
+    """
+    position, filename, rolls, samples, seed, independent = task
+    if loot_graph.get_table(_worker_loot_tables, filename) is None:
+        return filename, None
+    # Each table gets its own stream from the seed and its position, so results don't depend on the number of jobs
+    totals = loot_simulation.simulate_table(_worker_loot_tables, filename, rolls, samples, [seed, position], independent)
+    return filename, loot_simulation.summarize(totals, rolls)
+
+def simulate_loot_tables(loot_tables, loot_table_files, rolls, samples, seed, independent, jobs):
+    """
+    Simulate every loot table, in a process pool when more than one job is asked for.
+    """
+    tasks = [(position, filename, rolls, samples, seed, independent) for position, filename in enumerate(loot_table_files)]
+    if jobs <= 1 or len(tasks) <= 1:
+        _init_worker(loot_tables, debug_log.log_level)
+        return [simulate_loot_table(task) for task in tasks]
+    jobs = min(jobs, len(tasks))
+    # Workers get the loot tables without the tables read so far, and read the ones they simulate
+    empty_loot_tables = loot_graph.load_loot_tables(loot_tables['directory'], loot_tables['mappings'])
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(empty_loot_tables, debug_log.log_level)) as executor:
+        return list(executor.map(simulate_loot_table, tasks))
+
+def write_simulated_drops(loot_tables, results, mappings, rolls, samples, output_file_path):
+    """
+    Write the simulated amounts of each item per run of rolls of each loot table.
+    """
+    with open(output_file_path, 'w') as output_file:
+        for filename, summary in results:
+            if summary is None:
+                log_debug(f"Loot table not found: {filename}", 'ERROR')
+                continue
+            loot_table_name = loot_graph.get_table(loot_tables, filename)['name']
+            output_file.write(f"<!-- \n#{loot_table_name} ({samples} runs of {rolls} rolls) -->\n")
+            for item in summary:
+                item_info = guid_utils.get_entry_from_guid(item['item_guid'], mappings, {})
+                item_name = to_sentence_case(item_info.get('name', 'unknown_item'))
+                percentile_values = '|'.join(f"p{percentile}={value:g}" for percentile, value in zip(loot_simulation.percentiles, item['percentiles']))
+                output_file.write(f"{{{{Simulated drop|{item_name}|mean={item['mean']:.4f}|{percentile_values}|any={item['any']:.4f}|{loot_table_name}}}}}\n")
+            log_debug(f"Simulated loot table: {loot_table_name} in file: {filename}")
+
+# Define paths
+input_directory = 'Input/Assets/MonoBehaviour'
+guid_mapping_path = 'Output/guid_lookup.json'
+output_file_path = 'Output/Drops/simulated_drops.txt'
+debug_output_path = '.hidden/debug_output/loot_simulator_debug_output.txt'
+
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_directory, guid_mapping_path]
+stage_outputs = [output_file_path, debug_output_path]
+
+def run(context=None, rolls=100, samples=10000, seed=0, independent=False, jobs=1):
+    # Ensure the output and debug directories exist
+    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+    os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+    debug_log.clear_log(debug_output_path)
+
+    if loot_simulation.np is None:
+        log_debug('NumPy is needed to simulate loot tables, install it with: pip install numpy', 'ERROR')
+        print(f"An error occurred. Check the debug output for details: '{debug_output_path}'")
+        return
+
+    try:
+        # Load GUID mapping indexes
+        mappings = run_context.get_mappings(context, guid_mapping_path)
+
+        loot_table_files = loot_graph.find_loot_table_files(input_directory)
+        loot_tables = loot_graph.load_loot_tables(input_directory, mappings)
+        results = simulate_loot_tables(loot_tables, loot_table_files, rolls, samples, seed, independent, jobs)
+        write_simulated_drops(loot_tables, results, mappings, rolls, samples, output_file_path)
+
+        # Print the required messages to the terminal
+        print(f"Simulated drops have been written to '{output_file_path}'")
+    except Exception as e:
+        log_debug(f'An error occurred: {str(e)}', 'ERROR')
+        print(f"An error occurred. Check the debug output for details: '{debug_output_path}'")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulates rolls of every loot table and writes the spread of the drops to Output/Drops/simulated_drops.txt.")
+    parser.add_argument('--rolls', type=int, default=100,
+                        help="Rolls of the table in each run, e.g. kills of an enemy (default: 100).")
+    parser.add_argument('--samples', type=int, default=10000,
+                        help="Runs of rolls to simulate per table (default: 10000).")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Seed of the random numbers; the same seed gives the same results (default: 0).")
+    parser.add_argument('--independent', action='store_true',
+                        help="Roll every entry on its own, instead of picking one entry per roll.")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="Number of worker processes simulating the tables (default: 1).")
+    args = parser.parse_args()
+    run(rolls=args.rolls, samples=args.samples, seed=args.seed, independent=args.independent, jobs=args.jobs)
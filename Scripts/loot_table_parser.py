@@ -1,13 +1,8 @@
 import os
-import re
-import yaml
-import json
-from Utilities import guid_utils
-from Utilities.unity_yaml_loader import preprocess_yaml_content
+from Utilities import debug_log, guid_utils, loot_graph, loot_yield, run_context
 
-def log_debug(message):
-    with open(debug_output_path, 'a', encoding='utf-8') as debug_file:
-        debug_file.write(message + '\n')
+def log_debug(message, level='DEBUG'):
+    debug_log.log(debug_output_path, message, level)
 
 def to_sentence_case(text):
     """
@@ -15,36 +10,32 @@ def to_sentence_case(text):
     """
     return text.capitalize()
 
-def extract_loot_table_info(data, loot_table_name, guid_mapping):
+def extract_loot_table_info(table, mappings):
     """
-    Extract loot table information from the YAML data.
+    Extract loot table information from a table of the loot_graph module.
     """
     loot_table_info = []
     contains_loot_list = False
-    loot_table_entries = data.get('MonoBehaviour', {}).get('lootTable', [])
     
-    for entry in loot_table_entries:
-        loot = entry.get('loot', 0)
-        item_guid = entry.get('itemToDrop', {}).get('guid', '0')
-        percent_chance = entry.get('percentChance', 0) / 100.0
-        min_num = entry.get('amtToGive', {}).get('minimumNum', 0)
-        max_num = entry.get('amtToGive', {}).get('maxiumNum', 0)
+    for entry in table['entries']:
+        item_guid = entry['item_guid']
+        percent_chance = entry['percentChance'] / 100.0
         
-        if loot == 0 and item_guid == '0':
+        if not entry['is_loot_table'] and item_guid == '0':
             item_name = "Nothing"
-        elif loot == 1:
+        elif entry['is_loot_table']:
             item_name = "loot_table"
             contains_loot_list = True
         else:
-            item_info = next((item for item in guid_mapping if item['guid'] == item_guid), {})
+            item_info = guid_utils.get_entry_from_guid(item_guid, mappings, {})
             item_name = to_sentence_case(item_info.get('name', 'unknown_item'))
         
         loot_table_info.append({
             'name': item_name,
             'percentChance': percent_chance,
-            'min': min_num,
-            'max': max_num,
-            'is_loot_table': loot == 1
+            'min': entry['min'],
+            'max': entry['max'],
+            'is_loot_table': entry['is_loot_table']
         })
     
     return loot_table_info, contains_loot_list
@@ -70,24 +61,24 @@ def select_output_file(loot_table_name, output_files):
     else:
         return output_files['other']
 
-def parse_loot_tables(input_directory, guid_mapping, loot_table_list_path, output_files, debug_output_path):
+def parse_loot_tables(input_directory, mappings, output_files, debug_output_path):
     """
     Parse loot tables from asset files and write the formatted loot tables to various output files.
     """
-    with open(loot_table_list_path, 'r') as file:
-        loot_table_files = file.read().splitlines()
+    # The loot tables are found from the asset index, the same list loot_table_generator writes
+    loot_table_files = loot_graph.find_loot_table_files(input_directory)
 
-    with open(debug_output_path, 'w') as debug_log:
+    loot_tables = loot_graph.load_loot_tables(input_directory, mappings)
+
+    with debug_log.open_log(debug_output_path) as debug_file:
         for filename in loot_table_files:
             try:
-                filepath = os.path.join(input_directory, filename)
-                with open(filepath, 'r') as file:
-                    raw_content = file.read()
-                    clean_content = preprocess_yaml_content(raw_content)
-                    data = yaml.safe_load(clean_content)
-                
-                loot_table_name = data.get('MonoBehaviour', {}).get('m_Name', 'unknown_loot_table')
-                loot_table_info, contains_loot_list = extract_loot_table_info(data, loot_table_name, guid_mapping)
+                table = loot_graph.get_table(loot_tables, filename)
+                if table is None:
+                    raise ValueError(f"No list of loot entries in {os.path.join(input_directory, filename)}")
+
+                loot_table_name = table['name']
+                loot_table_info, contains_loot_list = extract_loot_table_info(table, mappings)
                 
                 output_file = select_output_file(loot_table_name, output_files)
                 header = f"<!-- \n#{loot_table_name} -->\n"
@@ -98,43 +89,75 @@ def parse_loot_tables(input_directory, guid_mapping, loot_table_list_path, outpu
                     else:
                         output_file.write(f"{{{{Loot table|{item['name']}|{item['percentChance']:.2f}|{item['min']}|{item['max']}|{loot_table_name}}}}}\n")
                 
-                debug_log.write(f"Processed loot table: {loot_table_name} in file: {filename}\n")
+                debug_file.write(f"Processed loot table: {loot_table_name} in file: {filename}\n")
             except Exception as e:
-                log_debug(f"Error processing file {filename}: {str(e)}")
+                log_debug(f"Error processing file {filename}: {str(e)}", 'ERROR')
+
+    return loot_tables, loot_table_files
+
+def write_expected_drops(loot_tables, loot_table_files, mappings, expected_output_file_path):
+    """
+    Write the average amount of each item one roll of each loot table gives, nested tables included.
+    """
+    # Every table is worked out in one batch
+    expected = loot_yield.expected_drops(loot_tables, loot_table_files)
+
+    with open(expected_output_file_path, 'w') as output_file:
+        for filename, amounts in expected.items():
+            loot_table_name = loot_graph.get_table(loot_tables, filename)['name']
+            output_file.write(f"<!-- \n#{loot_table_name} -->\n")
+            # Most common drops first
+            for item_guid, amount in sorted(amounts.items(), key=lambda item: -item[1]):
+                item_info = guid_utils.get_entry_from_guid(item_guid, mappings, {})
+                item_name = to_sentence_case(item_info.get('name', 'unknown_item'))
+                output_file.write(f"{{{{Expected drop|{item_name}|{amount:.4f}|{loot_table_name}}}}}\n")
 
 # Define paths
 input_directory = 'Input/Assets/MonoBehaviour'
 guid_mapping_path = 'Output/guid_lookup.json'
-loot_table_list_path = 'Output/Drops/loot_table_list.txt'
-output_files = {
-    'enemy': open('Output/Drops/enemy_loot_table.txt', 'w'),
-    'stone': open('Output/Drops/stone_loot_table.txt', 'w'),
-    'microbe': open('Output/Drops/microbe_loot_table.txt', 'w'),
-    'grass': open('Output/Drops/grass_loot_table.txt', 'w'),
-    'ship': open('Output/Drops/ship_loot_table.txt', 'w'),
-    'discovery': open('Output/Drops/discovery_loot_table.txt', 'w'),
-    'friend_card': open('Output/Drops/friend_card_loot_table.txt', 'w'),
-    'other': open('Output/Drops/other_loot_table.txt', 'w')
+output_file_paths = {
+    'enemy': 'Output/Drops/enemy_loot_table.txt',
+    'stone': 'Output/Drops/stone_loot_table.txt',
+    'microbe': 'Output/Drops/microbe_loot_table.txt',
+    'grass': 'Output/Drops/grass_loot_table.txt',
+    'ship': 'Output/Drops/ship_loot_table.txt',
+    'discovery': 'Output/Drops/discovery_loot_table.txt',
+    'friend_card': 'Output/Drops/friend_card_loot_table.txt',
+    'other': 'Output/Drops/other_loot_table.txt'
 }
+expected_output_file_path = 'Output/Drops/expected_drops.txt'
 debug_output_path = '.hidden/debug_output/loot_table_debug_output.txt'
 
-# Ensure the output and debug directories exist
-os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_directory, guid_mapping_path]
+stage_outputs = [*output_file_paths.values(), expected_output_file_path, debug_output_path]
+
+def run(context=None):
+    # Ensure the output and debug directories exist
+    os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+
+    output_files = {key: open(path, 'w') for key, path in output_file_paths.items()}
+
+    try:
+        # Load GUID mapping indexes
+        mappings = run_context.get_mappings(context, guid_mapping_path)
 
-try:
-    # Load GUID mapping
-    guid_mapping = guid_utils.load_guid_lookup(guid_mapping_path)
+        # Parse loot tables
+        loot_tables, loot_table_files = parse_loot_tables(input_directory, mappings, output_files, debug_output_path)
 
-    # Parse loot tables
-    parse_loot_tables(input_directory, guid_mapping, loot_table_list_path, output_files, debug_output_path)
+        # Average drops per roll of every loot table
+        write_expected_drops(loot_tables, loot_table_files, mappings, expected_output_file_path)
 
-    # Close all output files
-    for file in output_files.values():
-        file.close()
+        # Print the required messages to the terminal
+        print("Parsing completed successfully.")
+        print(f"Debug information has been written to '{debug_output_path}'")
+    except Exception as e:
+        log_debug(f'An error occurred: {str(e)}', 'ERROR')
+        print(f"An error occurred. Check the debug output for details: '{debug_output_path}'")
+    finally:
+        # Close all output files
+        for file in output_files.values():
+            file.close()
 
-    # Print the required messages to the terminal
-    print("Parsing completed successfully.")
-    print(f"Debug information has been written to '{debug_output_path}'")
-except Exception as e:
-    log_debug(f'An error occurred: {str(e)}')
-    print(f"An error occurred. Check the debug output for details: '{debug_output_path}'")
+if __name__ == '__main__':
+    run()
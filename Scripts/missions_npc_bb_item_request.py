@@ -1,7 +1,6 @@
 import os
 import re
-import json
-from Utilities import guid_utils
+from Utilities import asset_index, debug_log, file_manifest, guid_store, item_references, run_context
 
 # Define paths
 input_folder = 'Input/Assets/MonoBehaviour/'
@@ -10,22 +9,17 @@ debug_output_path = '.hidden/debug_output/missions_npc_bb_request_debug.txt'
 guid_lookup_path = 'Output/guid_lookup.json'
 npc_text_asset_folder = 'Input/Assets/TextAsset/'
 
-# Ensure output directories exist
-os.makedirs(output_folder, exist_ok=True)
-os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_folder, guid_lookup_path, guid_store.get_store_path(guid_lookup_path), npc_text_asset_folder]
+stage_outputs = [os.path.join(output_folder, 'mission_bb_request_*.txt'), debug_output_path]
 
-def log_debug(message):
-    with open(debug_output_path, 'a', encoding='utf-8') as debug_file:
-        debug_file.write(message + '\n')
+def log_debug(message, level='DEBUG'):
+    debug_log.log(debug_output_path, message, level)
 
-# Load GUID lookup
-with open(guid_lookup_path, 'r', encoding='utf-8') as f:
-    guid_lookup = json.load(f)
-
-def get_item_name_by_guid(guid, guid_lookup):
-    for item in guid_lookup:
-        if item.get('guid') == guid:
-            return item.get('name', 'Unknown'), item.get('filename', 'Unknown')
+def get_item_name_by_guid(guid, store):
+    item = guid_store.get_entry_from_guid(guid, store)
+    if item is not None:
+        return item.get('name', 'Unknown'), item.get('filename', 'Unknown')
     return 'Unknown', 'Unknown'
 
 def find_buy_value(filename):
@@ -39,47 +33,48 @@ def find_buy_value(filename):
             if match:
                 return match.group(1)
     except Exception as e:
-        log_debug(f"Error finding buy value in file {file_path}: {e}")
+        log_debug(f"Error finding buy value in file {file_path}: {e}", 'ERROR')
     return 'None'
 
-def extract_items_can_request_info(file_path, guid_lookup):
-    items_info = []
+def read_item_requests(file_path):
+    """
+    Reads each itemData and its amtRangeOfItem from an asset, so the result can be cached per file.
+    """
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+            return item_references.read_item_requests(f.read())
+    except Exception as e:
+        log_debug(f"Error processing file {file_path}: {e}", 'ERROR')
+        return []
 
-            # Find itemData and amtRangeOfItem using regex
-            pattern = re.compile(
-                r'itemData: \{fileID: \d+, guid: ([a-f0-9]+), type: \d+\}\s+amtRangeOfItem:\s+minimumNum: (\d+)\s+maxiumNum: (\d+)',
-                re.MULTILINE
-            )
-            matches = pattern.findall(content)
-            
-            if matches:
-                log_debug(f"Processing file: {file_path}")  # Log only if matches are found
-            
-            for match in matches:
-                guid, min_num, max_num = match
-
-                # Get item name and filename using the GUID
-                item_name, filename = get_item_name_by_guid(guid, guid_lookup)
-
-                if not filename or filename == "Unknown":
-                    log_debug(f"Could not find filename for GUID {guid} (Item: {item_name})")
-                    continue
-
-                # Find the buy value
-                buy_value = find_buy_value(filename)
-                items_info.append({
-                    'name': item_name,
-                    'min': min_num,
-                    'max': max_num,
-                    'buy_value': buy_value
-                })
-                log_debug(f"Item Name: {item_name}, Min: {min_num}, Max: {max_num}, Buy Value: {buy_value}")
+def extract_items_can_request_info(file_path, matches, store):
+    items_info = []
+    try:
+        if matches:
+            log_debug(f"Processing file: {file_path}")  # Log only if matches are found
+        
+        for match in matches:
+            guid, min_num, max_num = match
+
+            # Get item name and filename using the GUID
+            item_name, filename = get_item_name_by_guid(guid, store)
+
+            if not filename or filename == "Unknown":
+                log_debug(f"Could not find filename for GUID {guid} (Item: {item_name})")
+                continue
+
+            # Find the buy value
+            buy_value = find_buy_value(filename)
+            items_info.append({
+                'name': item_name,
+                'min': min_num,
+                'max': max_num,
+                'buy_value': buy_value
+            })
+            log_debug(f"Item Name: {item_name}, Min: {min_num}, Max: {max_num}, Buy Value: {buy_value}")
 
     except Exception as e:
-        log_debug(f"Error processing file {file_path}: {e}")
+        log_debug(f"Error processing file {file_path}: {e}", 'ERROR')
     return items_info
 
 def extract_quest_text(npc_name):
@@ -111,47 +106,60 @@ def extract_quest_text(npc_name):
             return quest_name, quest_text
 
     except Exception as e:
-        log_debug(f"Error extracting quest text for {npc_name}: {e}")
+        log_debug(f"Error extracting quest text for {npc_name}: {e}", 'ERROR')
         return "", ""
 
-def process_assets(input_folder, guid_lookup):
-    for root, _, files in os.walk(input_folder):
-        for file in files:
-            if file.endswith('.asset'):
-                file_path = os.path.join(root, file)
-                items_info = extract_items_can_request_info(file_path, guid_lookup)
-                npc_name = file.split('.')[0]
-                if items_info:
-                    quest_name, quest_text = extract_quest_text(npc_name)
-                    
-                    if quest_name == "Unknown_Quest":
-                        log_debug(f"Skipping NPC {npc_name} due to unknown quest name.")
-                        continue
-                    
-                    output_lines = []
-                    output_lines.append(f"## {npc_name}")
-                    output_lines.append('{{bulletin mission table')
-                    for idx, item in enumerate(items_info, start=1):
-                        output_lines.append(f"|item{idx} = {item['name']}")
-                        output_lines.append(f"   |buyValue{idx} = {item['buy_value']}")
-                        output_lines.append(f"   |min{idx} = {item['min']}")
-                        output_lines.append(f"   |max{idx} = {item['max']}")
-                    output_lines.append("}}")
-                    if quest_text:
-                        output_lines.append(f"\n{quest_text}\n")
-                    
-                    # Write to a file named after the quest
-                    quest_file_name = f"mission_bb_request_{quest_name.replace(' ', '_')}.txt"
-                    quest_file_path = os.path.join(output_folder, quest_file_name)
-                    try:
-                        with open(quest_file_path, 'w', encoding='utf-8') as output_file:
-                            output_file.write("\n".join(output_lines))
-                        log_debug(f"Successfully wrote output to {quest_file_path}")
-                    except Exception as e:
-                        log_debug(f"Failed to write output to {quest_file_path}: {e}")
-
-# Clear the debug file at the start of each run
-open(debug_output_path, 'w').close()
-
-# Run the processing function
-process_assets(input_folder, guid_lookup)
+def process_assets(input_folder, store, context=None):
+    # Only assets with an itemsCanRequest list are read, in an incremental run only those that changed
+    assets = asset_index.get_assets_with_section(asset_index.load_asset_index(input_folder), 'itemsCanRequest')
+    file_paths = [os.path.join(input_folder, f"{asset['filename']}.asset") for asset in assets]
+    requests = file_manifest.process_files(context, 'missions_npc_bb_item_request', file_paths, read_item_requests, salt=file_manifest.source_salt(__file__))
+
+    for asset, file_path, matches in zip(assets, file_paths, requests):
+        items_info = extract_items_can_request_info(file_path, matches, store)
+        npc_name = asset['filename'].split('.')[0]
+        if items_info:
+            quest_name, quest_text = extract_quest_text(npc_name)
+            
+            if quest_name == "Unknown_Quest":
+                log_debug(f"Skipping NPC {npc_name} due to unknown quest name.")
+                continue
+            
+            output_lines = []
+            output_lines.append(f"## {npc_name}")
+            output_lines.append('{{bulletin mission table')
+            for idx, item in enumerate(items_info, start=1):
+                output_lines.append(f"|item{idx} = {item['name']}")
+                output_lines.append(f"   |buyValue{idx} = {item['buy_value']}")
+                output_lines.append(f"   |min{idx} = {item['min']}")
+                output_lines.append(f"   |max{idx} = {item['max']}")
+            output_lines.append("}}")
+            if quest_text:
+                output_lines.append(f"\n{quest_text}\n")
+            
+            # Write to a file named after the quest
+            quest_file_name = f"mission_bb_request_{quest_name.replace(' ', '_')}.txt"
+            quest_file_path = os.path.join(output_folder, quest_file_name)
+            try:
+                with open(quest_file_path, 'w', encoding='utf-8') as output_file:
+                    output_file.write("\n".join(output_lines))
+                log_debug(f"Successfully wrote output to {quest_file_path}")
+            except Exception as e:
+                log_debug(f"Failed to write output to {quest_file_path}: {e}", 'ERROR')
+
+def run(context=None):
+    # Ensure output directories exist
+    os.makedirs(output_folder, exist_ok=True)
+    os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+
+    # Open the GUID lookup store, which is queried without loading the whole lookup
+    store = run_context.get_guid_store(context, guid_lookup_path)
+
+    # Clear the debug file at the start of each run
+    debug_log.clear_log(debug_output_path)
+
+    # Run the processing function
+    process_assets(input_folder, store, context)
+
+if __name__ == '__main__':
+    run()
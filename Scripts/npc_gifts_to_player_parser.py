@@ -1,8 +1,7 @@
 import os
 import re
-import json
 from collections import defaultdict
-from Utilities import guid_utils
+from Utilities import asset_cache, debug_log, guid_utils, run_context, text_asset_reader
 
 # Define paths
 input_folder = 'Input/Assets/TextAsset'
@@ -12,65 +11,80 @@ guid_lookup_path = 'Output/guid_lookup.json'
 output_file = os.path.join(output_folder, 'npc_gifts_to_player.txt')
 debug_file = os.path.join(debug_folder, 'npc_gifts_to_player_debug.txt')
 
-# Ensure output directories exist
-os.makedirs(output_folder, exist_ok=True)
-os.makedirs(debug_folder, exist_ok=True)
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_folder, 'Input/Assets/MonoBehaviour', guid_lookup_path]
+stage_outputs = [output_file, debug_file]
 
 # Function to log debug information
-def log_debug(message):
-    with open(debug_file, 'a', encoding='utf-8') as file_handle:
-        file_handle.write(message + '\n')
-
-# Load the guid lookup data
-try:
-    guid_mapping = guid_utils.load_guid_lookup(guid_lookup_path)
-    log_debug(f"Loaded GUID lookup from: {guid_lookup_path}")
-except Exception as e:
-    log_debug(f"Failed to load GUID lookup: {e}")
-    print("An error occurred. Check the debug output for details.")
-    exit()
-
-# Create dictionaries to map save_id and item_id to names
-save_id_to_name = {entry['save_id']: entry['name'] for entry in guid_mapping if 'save_id' in entry and 'name' in entry}
-item_id_to_name = {entry['save_id']: entry['name'] for entry in guid_mapping if 'save_id' in entry and 'name' in entry}
-
-# Regular expressions to find the quest key, itemID, and NPC name in the specified pattern
-npc_name_pattern = re.compile(r'"name":\s*"(.*?)"')
-quest_pattern = re.compile(r'"key":\s*"(quest_\d+)"')
-reward_pattern = re.compile(r'"boxType": "Reward".*?"itemID": "(item_\d+)",\s*"amount": (\d+)', re.DOTALL)
-
-# Lists to store results and debug information
-results = []
-npc_gifts_combined = defaultdict(list)
-
-# Function to find NPC name in the file content
-def find_npc_name(content):
-    npc_name_match = npc_name_pattern.search(content)
-    return npc_name_match.group(1) if npc_name_match else "Unknown NPC"
+def log_debug(message, level='DEBUG'):
+    debug_log.log(debug_file, message, level)
+
+# Patterns of the quest keys and reward items in the NPC text files
+quest_key_pattern = re.compile(r'quest_\d+')
+item_id_pattern = re.compile(r'item_\d+')
 
 # Function to convert item names to sentence case
 def to_sentence_case(text):
     return text.capitalize()
 
+def index_text_sets(file_path):
+    """
+    Indexes the textSet of every quest key in a text file, from its shared parse.
+
+    Args:
+        file_path (str): The path to a TextAsset .txt file.
+
+    Returns:
+        tuple: (the first "name" in the file or "Unknown NPC",
+                every quest key in file order, repeats included,
+                the textSet list of each quest key's first entry, or None when it has none)
+    """
+    model = asset_cache.load_text_asset(file_path)
+    quest_keys = []
+    text_sets = {}
+
+    for block in model['blocks']:
+        quest = block['key']
+        if quest is None or not quest_key_pattern.fullmatch(quest):
+            continue
+        quest_keys.append(quest)
+        if quest not in text_sets:
+            text_sets[quest] = block['text_set']
+    return model['name'] or "Unknown NPC", quest_keys, text_sets
+
+def find_reward(text_set):
+    """
+    Returns the (itemID, amount) given by a textSet, from its first Reward box onwards, or None.
+    """
+    reward_started = False
+    for box in text_set:
+        if not isinstance(box, dict):
+            continue
+        reward_started = reward_started or box.get('boxType') == 'Reward'
+        if not reward_started:
+            continue
+        item_id = box.get('itemID')
+        amount = box.get('amount')
+        if isinstance(item_id, str) and item_id_pattern.fullmatch(item_id) and isinstance(amount, str) and amount.isdigit():
+            return item_id, int(amount)
+    return None
+
 # Parse quest rewards
-for root, dirs, files in os.walk(input_folder):
-    for file in files:
-        if file.endswith('.txt'):
-            file_path = os.path.join(root, file)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    npc_name = find_npc_name(content)
-                    quest_keys = quest_pattern.findall(content)
-                    
+def parse_quest_rewards(input_folder, save_id_to_name, item_id_to_name, npc_gifts_combined):
+    for root, dirs, files in os.walk(input_folder):
+        for file in files:
+            if file.endswith('.txt'):
+                file_path = os.path.join(root, file)
+                try:
+                    # One pass over the file indexes every quest's textSet
+                    npc_name, quest_keys, text_sets = index_text_sets(file_path)
+
                     for quest in quest_keys:
-                        text_set_match = re.search(rf'"key":\s*"{quest}".*?"textSet":\s*\[(.*?)\]', content, re.DOTALL)
-                        if text_set_match:
-                            text_set_content = text_set_match.group(1)
-                            reward_match = reward_pattern.search(text_set_content)
-                            if reward_match:
-                                item_id = reward_match.group(1)
-                                amount = int(reward_match.group(2))
+                        text_set = text_sets[quest]
+                        if text_set is not None:
+                            reward = find_reward(text_set)
+                            if reward:
+                                item_id, amount = reward
                                 quest_name = save_id_to_name.get(quest, f"Unknown ({quest})")
                                 item_name = to_sentence_case(item_id_to_name.get(item_id, f"Unknown ({item_id})"))
                                 amount_str = f"*{amount}" if amount > 1 else ""
@@ -80,26 +94,28 @@ for root, dirs, files in os.walk(input_folder):
                                 log_debug(f"No reward found for {quest} in {file}")
                         else:
                             log_debug(f"No textSet found for {quest} in {file}")
-                    
-            except Exception as e:
-                log_debug(f"Error processing file {file}: {e}")
+
+                except Exception as e:
+                    log_debug(f"Error processing file {file}: {e}", 'ERROR')
 
 # Parse email gifts
-def parse_email_assets(input_directory, guid_mapping):
+def parse_email_assets(input_directory, guid_mapping, mappings, npc_gifts_combined):
     email_gifts = {}
     english_emails_path = os.path.join(input_directory, 'TextAsset', 'English_Emails.txt')
     
     # Load email names from English_Emails.txt
-    with open(english_emails_path, 'r', encoding='utf-8') as file:
-        data = file.read()
-        email_sections = re.split(r'//EMAIL_', data)[1:]
-        for section in email_sections:
-            email_name_match = re.match(r'([\w\s]+)\s*\.+', section)
-            email_name = email_name_match.group(1).strip() if email_name_match else "unknown_email"
-            email_key_match = re.search(r'"emailKey":\s*"([^"]+)"', section)
-            if email_key_match:
-                email_key = email_key_match.group(1)
-                email_gifts[email_key] = {'email_name': email_name, 'gifts': [], 'npc_name': 'Unknown NPC'}
+    section = None
+    for entry in text_asset_reader.iter_entries(english_emails_path):
+        # Each //EMAIL_ header names the first email that follows it
+        if entry['comment'] and entry['comment'].startswith('EMAIL_'):
+            section = entry['comment']
+        email_key = entry['fields'].get('emailKey')
+        if not section or not email_key:
+            continue
+        email_name_match = re.match(r'([\w\s]+)\s*\.+', section[len('EMAIL_'):])
+        email_name = email_name_match.group(1).strip() if email_name_match else "unknown_email"
+        email_gifts[email_key] = {'email_name': email_name, 'gifts': [], 'npc_name': 'Unknown NPC'}
+        section = None
 
     for entry in guid_mapping:
         if 'save_id' not in entry or not entry['save_id'].startswith("email_"):
@@ -115,13 +131,13 @@ def parse_email_assets(input_directory, guid_mapping):
                 npc_emailer_match = re.search(r'npcEmailer:\s*\{fileID: \d+, guid: ([a-f0-9]{32}), type: \d+\}', asset_data)
                 if npc_emailer_match:
                     npc_emailer_guid = npc_emailer_match.group(1)
-                    npc_name = next((e['name'] for e in guid_mapping if e['guid'] == npc_emailer_guid), 'Unknown NPC')
+                    npc_name = guid_utils.get_entry_from_guid(npc_emailer_guid, mappings, {}).get('name', 'Unknown NPC')
                     if save_id in email_gifts:
                         email_gifts[save_id]['npc_name'] = npc_name
                 
                 items_to_attach = re.findall(r'itemData:\s*\{fileID: \d+, guid: ([a-f0-9]{32}), type: \d+\}.*?amountOfItem:\s*(\d+)', asset_data, re.DOTALL)
                 for item_guid, amount in items_to_attach:
-                    item_name = to_sentence_case(next((e['name'] for e in guid_mapping if e['guid'] == item_guid), 'unknown_item'))
+                    item_name = to_sentence_case(guid_utils.get_entry_from_guid(item_guid, mappings, {}).get('name', 'unknown_item'))
                     if amount == '1':
                         email_gifts[save_id]['gifts'].append(item_name)
                     else:
@@ -140,15 +156,43 @@ def parse_email_assets(input_directory, guid_mapping):
                 formatted_email_name = email_name
             npc_gifts_combined[npc_name].append(f"{gift_str}:{formatted_email_name}")
 
-# Parse the email assets
-parse_email_assets('Input/Assets', guid_mapping)
-
-# Write results to the output file, excluding entries with 'false'
-with open(output_file, 'w', encoding='utf-8') as f:
-    for npc_name, gifts in npc_gifts_combined.items():
-        combined_gifts = ', '.join(gifts)
-        f.write(f"## {npc_name}\n{combined_gifts}\n\n")  # Add a blank line between NPC entries
-
-# Print messages to the terminal
-print(f"Gifts for the player written to {output_file}")
-print(f"Debug information has been written to {debug_file}")
+def run(context=None):
+    # Ensure output directories exist
+    os.makedirs(output_folder, exist_ok=True)
+    os.makedirs(debug_folder, exist_ok=True)
+
+    # Load the guid lookup data
+    try:
+        guid_mapping = run_context.get_guid_lookup(context, guid_lookup_path)
+        mappings = run_context.get_mappings(context, guid_lookup_path)
+        log_debug(f"Loaded GUID lookup from: {guid_lookup_path}")
+    except Exception as e:
+        log_debug(f"Failed to load GUID lookup: {e}", 'ERROR')
+        print("An error occurred. Check the debug output for details.")
+        return
+
+    # Create dictionaries to map save_id and item_id to names
+    save_id_to_name = {entry['save_id']: entry['name'] for entry in guid_mapping if 'save_id' in entry and 'name' in entry}
+    item_id_to_name = {entry['save_id']: entry['name'] for entry in guid_mapping if 'save_id' in entry and 'name' in entry}
+
+    # Combined gift list per NPC
+    npc_gifts_combined = defaultdict(list)
+
+    # Parse quest rewards
+    parse_quest_rewards(input_folder, save_id_to_name, item_id_to_name, npc_gifts_combined)
+
+    # Parse the email assets
+    parse_email_assets('Input/Assets', guid_mapping, mappings, npc_gifts_combined)
+
+    # Write results to the output file, excluding entries with 'false'
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for npc_name, gifts in npc_gifts_combined.items():
+            combined_gifts = ', '.join(gifts)
+            f.write(f"## {npc_name}\n{combined_gifts}\n\n")  # Add a blank line between NPC entries
+
+    # Print messages to the terminal
+    print(f"Gifts for the player written to {output_file}")
+    print(f"Debug information has been written to {debug_file}")
+
+if __name__ == '__main__':
+    run()
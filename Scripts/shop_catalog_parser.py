@@ -1,8 +1,8 @@
 import os
-import re
 import yaml
 import math
-import json
+import argparse
+from Utilities import debug_log, run_context, store_graph
 
 # Define paths
 input_folder = 'Input/Assets/MonoBehaviour'
@@ -10,167 +10,149 @@ output_folder = 'Output/Shops'
 guid_lookup_file = 'Output/guid_lookup.json'
 debug_output_file = '.hidden/debug_output/shop_debug_output.txt'
 
-# Ensure output directories exist
-os.makedirs(output_folder, exist_ok=True)
-os.makedirs(os.path.dirname(debug_output_file), exist_ok=True)
-
-# Initialize debug log
-with open(debug_output_file, 'w') as debug_log:
-    debug_log.write("Debugging Information:\n")
-
-# Function to remove custom Unity tags from YAML content
-def preprocess_yaml_content(content):
-    return re.sub(r'!u![\d]+ &[\d]+', '', content)
-
-# Function to load GUID to filename and item name mappings
-def load_guid_lookup(guid_lookup_file):
-    with open(guid_lookup_file, 'r') as file:
-        guid_mapping = json.load(file)
-    return guid_mapping
-
-# Load the GUID mappings
-guid_mapping = load_guid_lookup(guid_lookup_file)
-
-# Function to find item details based on GUID
-def find_item_details(guid, guid_mapping):
-    return next((entry for entry in guid_mapping if entry['guid'] == guid), None)
-
-# Process each file in the input folder
-for filename in os.listdir(input_folder):
-    if filename.startswith('_StoreCatalog') and not filename.endswith('.meta'):
-        file_path = os.path.join(input_folder, filename)
-        try:
-            with open(file_path, 'r') as file:
-                raw_content = file.read()
-                clean_content = preprocess_yaml_content(raw_content)
-                data = yaml.safe_load(clean_content)
-            
-            # Extract the store name, removing the '_StoreCatalog' part
-            store_name = data.get('MonoBehaviour', {}).get('m_Name', '').replace('_StoreCatalog', '')
-            if not store_name:
-                raise ValueError("Store name not found in the file.")
-                
-            markup_percent = float(data.get('MonoBehaviour', {}).get('markupPercent', 1))
-            store_sets = data.get('MonoBehaviour', {}).get('storeSets', [])
-            
-            # Process each store set
-            store_sets_details = []
-            for store_set in store_sets:
-                guid = store_set.get('guid')
-                if guid:
-                    store_set_detail = find_item_details(guid, guid_mapping)
-                    if store_set_detail:
-                        store_set_filename = store_set_detail['filename']
-                        store_set_path = os.path.join(input_folder, store_set_filename + '.asset')
-                        if not os.path.exists(store_set_path):
-                            with open(debug_output_file, 'a') as debug_log:
-                                debug_log.write(f"Store set file not found: {store_set_path}\n")
-                            continue
-                        with open(store_set_path, 'r') as store_set_file:
-                            store_set_content = store_set_file.read()
-                            store_set_data = yaml.safe_load(preprocess_yaml_content(store_set_content))
-                            store_set_detail.update({
-                                'rndRollActive': store_set_data.get('MonoBehaviour', {}).get('rndRollActive', False),
-                                'rndRollAmount': store_set_data.get('MonoBehaviour', {}).get('rndRollAmount', 'N/A'),
-                                'storeItemsInSet': store_set_data.get('MonoBehaviour', {}).get('storeItemsInSet', [])
-                            })
-                            store_sets_details.append(store_set_detail)
-            
-            # Prepare the output
-            output_file_path = os.path.join(output_folder, f'{store_name}.txt')
-            with open(output_file_path, 'w') as output_file:
-                output_file.write(f"Store Name: {store_name}\n")
-                output_file.write(f"Markup Percent: {markup_percent}\n")
-                for store_set_detail in store_sets_details:
-                    if store_set_detail['rndRollActive']:
-                        output_file.write(f"\nStore Set: {store_set_detail['filename']} - Roll Amount: {store_set_detail['rndRollAmount']}\n")
-                    else:
-                        output_file.write(f"\nStore Set: {store_set_detail['filename']}\n")
-                    for item in store_set_detail['storeItemsInSet']:
-                        item_guid = item.get('guid', 'unknown')
-                        item_detail = find_item_details(item_guid, guid_mapping)
-                        if item_detail:
-                            item_filename = item_detail['filename']
-                            item_path = os.path.join(input_folder, item_filename + '.asset')
-                            if not os.path.exists(item_path):
-                                with open(debug_output_file, 'a') as debug_log:
-                                    debug_log.write(f"Item file not found: {item_path}\n")
-                                continue
-                            with open(item_path, 'r') as item_file:
-                                item_content = item_file.read()
-                                item_data = yaml.safe_load(preprocess_yaml_content(item_content))
-                                item_for_sale_guid = item_data.get('MonoBehaviour', {}).get('itemForSale', {}).get('guid', 'unknown')
-                                limited_purchase = item_data.get('MonoBehaviour', {}).get('limitedPurchase', 0)
-                                item_for_sale_detail = find_item_details(item_for_sale_guid, guid_mapping)
-                                if item_for_sale_detail:
-                                    item_for_sale_filename = item_for_sale_detail['filename']
-                                    item_for_sale_path = os.path.join(input_folder, item_for_sale_filename + '.asset')
-                                    if not os.path.exists(item_for_sale_path):
-                                        with open(debug_output_file, 'a') as debug_log:
-                                            debug_log.write(f"Item for sale file not found: {item_for_sale_path}\n")
-                                        continue
-                                    with open(item_for_sale_path, 'r') as item_for_sale_file:
-                                        item_for_sale_content = item_for_sale_file.read()
-                                        item_for_sale_data = yaml.safe_load(preprocess_yaml_content(item_for_sale_content))
-                                        buy_value = float(item_for_sale_data.get('MonoBehaviour', {}).get('buyValue', 0))
-                                        item_name = item_for_sale_detail['name'].capitalize()
-                                        sell_price = math.ceil(buy_value * markup_percent)
-                                        output_line = f"{{{{shop|{item_name}|{sell_price}"
-                                        if limited_purchase == 1:
-                                            output_line += "|note = limited quantity item. The player can only purchase one."
-                                        output_line += "}}\n"
-                                        output_file.write(output_line)
-            
-            # Log debugging information
-            with open(debug_output_file, 'a') as debug_log:
-                debug_log.write(f"Processed file: {filename}\n")
-                debug_log.write(f"Store Name: {store_name}\n")
-                debug_log.write(f"Markup Percent: {markup_percent}\n")
-                for store_set_detail in store_sets_details:
-                    if store_set_detail['rndRollActive']:
-                        debug_log.write(f"\nStore Set: [{store_set_detail['guid']}] - {store_set_detail['filename']} - Roll Amount: {store_set_detail['rndRollAmount']}\n")
-                    else:
-                        debug_log.write(f"\nStore Set: [{store_set_detail['guid']}] - {store_set_detail['filename']}\n")
-                    for item in store_set_detail['storeItemsInSet']:
-                        item_guid = item.get('guid', 'unknown')
-                        item_detail = find_item_details(item_guid, guid_mapping)
-                        if item_detail:
-                            item_filename = item_detail['filename']
-                            item_path = os.path.join(input_folder, item_filename + '.asset')
-                            if not os.path.exists(item_path):
-                                debug_log.write(f"Item file not found: {item_path}\n")
-                                continue
-                            with open(item_path, 'r') as item_file:
-                                item_content = item_file.read()
-                                item_data = yaml.safe_load(preprocess_yaml_content(item_content))
-                                item_for_sale_guid = item_data.get('MonoBehaviour', {}).get('itemForSale', {}).get('guid', 'unknown')
-                                limited_purchase = item_data.get('MonoBehaviour', {}).get('limitedPurchase', 0)
-                                item_for_sale_detail = find_item_details(item_for_sale_guid, guid_mapping)
-                                if item_for_sale_detail:
-                                    item_for_sale_filename = item_for_sale_detail['filename']
-                                    item_for_sale_path = os.path.join(input_folder, item_for_sale_filename + '.asset')
-                                    if not os.path.exists(item_for_sale_path):
-                                        debug_log.write(f"Item for sale file not found: {item_for_sale_path}\n")
-                                        continue
-                                    with open(item_for_sale_path, 'r') as item_for_sale_file:
-                                        item_for_sale_content = item_for_sale_file.read()
-                                        item_for_sale_data = yaml.safe_load(preprocess_yaml_content(item_for_sale_content))
-                                        buy_value = float(item_for_sale_data.get('MonoBehaviour', {}).get('buyValue', 0))
-                                        item_name = item_for_sale_detail['name'].capitalize()
-                                        sell_price = math.ceil(buy_value * markup_percent)
-                                        output_line = f"{{{{shop|{item_name}|{sell_price}"
-                                        if limited_purchase == 1:
-                                            output_line += "|note = limited quantity item. The player can only purchase one."
-                                        output_line += "}}\n"
-                                        debug_log.write(output_line)
-                debug_log.write("\n")
-        
-        except yaml.YAMLError as e:
-            with open(debug_output_file, 'a') as debug_log:
-                debug_log.write(f"Error decoding YAML from file: {filename} - {e}\n")
-        except Exception as e:
-            with open(debug_output_file, 'a') as debug_log:
-                debug_log.write(f"Error processing file {filename}: {e}\n")
-
-print(f"Debug information has been written to {debug_output_file}")
-print(f"Parsed shop catalogs have been written to {output_folder}")
+# Files this stage reads and writes, so run_parser.py can schedule it
+stage_inputs = [input_folder, guid_lookup_file]
+stage_outputs = [output_folder, debug_output_file]
+
+def describe_store(catalog, graph):
+    """
+    Work out the name, markup and shop lines of one store from the store graph.
+
+    Args:
+        catalog (dict): One of graph['catalogs'].
+        graph (dict): The result of store_graph.build_store_graph.
+
+    Returns:
+        dict: {'name', 'markup_percent', 'store_sets': [{'guid', 'filename', 'rndRollActive', 'rndRollAmount', 'lines'}],
+               'messages': the referenced files that were missing or couldn't be read}
+    """
+    if catalog['error'] is not None:
+        raise catalog['error']
+    mono_behaviour = catalog['data'].get('MonoBehaviour', {})
+
+    # Extract the store name, removing the '_StoreCatalog' part
+    store_name = mono_behaviour.get('m_Name', '').replace('_StoreCatalog', '')
+    if not store_name:
+        raise ValueError("Store name not found in the file.")
+    markup_percent = float(mono_behaviour.get('markupPercent', 1))
+
+    messages = []
+
+    def node_data(node, label):
+        # The parsed asset of a referenced node, or None after noting why it is missing
+        if not node['exists']:
+            messages.append(f"{label} file not found: {node['path']}")
+        elif node['error'] is not None:
+            messages.append(f"Error reading {label.lower()} file {node['path']}: {node['error']}")
+        return node['data']
+
+    store_sets = []
+    for store_set in mono_behaviour.get('storeSets', []):
+        set_node = graph['sets'].get(store_set.get('guid'))
+        if set_node is None:
+            continue
+        set_data = node_data(set_node, 'Store set')
+        if set_data is None:
+            continue
+        set_behaviour = set_data.get('MonoBehaviour', {})
+
+        lines = []
+        for item in set_behaviour.get('storeItemsInSet', []):
+            item_node = graph['store_items'].get(item.get('guid', 'unknown'))
+            if item_node is None:
+                continue
+            item_data = node_data(item_node, 'Item')
+            if item_data is None:
+                continue
+            item_behaviour = item_data.get('MonoBehaviour', {})
+            limited_purchase = item_behaviour.get('limitedPurchase', 0)
+            product_node = graph['products'].get(item_behaviour.get('itemForSale', {}).get('guid', 'unknown'))
+            if product_node is None:
+                continue
+            product_data = node_data(product_node, 'Item for sale')
+            if product_data is None:
+                continue
+
+            buy_value = float(product_data.get('MonoBehaviour', {}).get('buyValue', 0))
+            item_name = product_node['detail']['name'].capitalize()
+            sell_price = math.ceil(buy_value * markup_percent)
+            output_line = f"{{{{shop|{item_name}|{sell_price}"
+            if limited_purchase == 1:
+                output_line += "|note = limited quantity item. The player can only purchase one."
+            output_line += "}}"
+            lines.append(output_line)
+
+        store_sets.append({
+            'guid': set_node['detail']['guid'],
+            'filename': set_node['detail']['filename'],
+            'rndRollActive': set_behaviour.get('rndRollActive', False),
+            'rndRollAmount': set_behaviour.get('rndRollAmount', 'N/A'),
+            'lines': lines,
+        })
+
+    return {'name': store_name, 'markup_percent': markup_percent, 'store_sets': store_sets, 'messages': messages}
+
+def write_store(file, store, with_guids=False):
+    """
+    Write a store's sets and shop lines, with the store sets' GUIDs for the debug output.
+    """
+    for store_set in store['store_sets']:
+        label = f"[{store_set['guid']}] - {store_set['filename']}" if with_guids else store_set['filename']
+        if store_set['rndRollActive']:
+            file.write(f"\nStore Set: {label} - Roll Amount: {store_set['rndRollAmount']}\n")
+        else:
+            file.write(f"\nStore Set: {label}\n")
+        for line in store_set['lines']:
+            file.write(line + '\n')
+
+def run(context=None, threads=1):
+    # Ensure output directories exist
+    os.makedirs(output_folder, exist_ok=True)
+    os.makedirs(os.path.dirname(debug_output_file), exist_ok=True)
+
+    # Load the GUID mapping indexes
+    mappings = run_context.get_mappings(context, guid_lookup_file)
+
+    catalog_filenames = [filename for filename in os.listdir(input_folder)
+                         if filename.startswith('_StoreCatalog') and not filename.endswith('.meta')]
+
+    # Every catalog, store set, store item and item for sale is loaded once, a level at a time
+    graph = store_graph.build_store_graph(input_folder, catalog_filenames, mappings, threads, context)
+
+    with debug_log.open_log(debug_output_file) as debug_file:
+        debug_file.write("Debugging Information:\n")
+
+        # Every Output/Shops file and its debug section are written from the graph
+        for catalog in graph['catalogs']:
+            filename = catalog['filename']
+            try:
+                store = describe_store(catalog, graph)
+                for message in store['messages']:
+                    debug_file.write(message + '\n')
+
+                output_file_path = os.path.join(output_folder, f"{store['name']}.txt")
+                with open(output_file_path, 'w') as output_file:
+                    output_file.write(f"Store Name: {store['name']}\n")
+                    output_file.write(f"Markup Percent: {store['markup_percent']}\n")
+                    write_store(output_file, store)
+
+                # Log debugging information
+                debug_file.write(f"Processed file: {filename}\n")
+                debug_file.write(f"Store Name: {store['name']}\n")
+                debug_file.write(f"Markup Percent: {store['markup_percent']}\n")
+                write_store(debug_file, store, with_guids=True)
+                debug_file.write("\n")
+            except yaml.YAMLError as e:
+                debug_file.write(f"Error decoding YAML from file: {filename} - {e}\n", 'ERROR')
+            except Exception as e:
+                debug_file.write(f"Error processing file {filename}: {e}\n", 'ERROR')
+
+    print(f"Debug information has been written to {debug_output_file}")
+    print(f"Parsed shop catalogs have been written to {output_folder}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Writes the items and prices of every store to Output/Shops.")
+    parser.add_argument('--threads', type=int, default=1,
+                        help="Number of threads loading the store assets (default: 1).")
+    args = parser.parse_args()
+    run(threads=args.threads)
@@ -0,0 +1,113 @@
+import argparse
+import io
+import random
+import bench_utils
+import cutscenes_build_tree
+from Utilities import cine_graph
+
+class LineLimitReached(Exception):
+    pass
+
+class LimitedOutput(io.StringIO):
+    """
+    An output file that gives up after a number of lines, since the old tree printing repeats shared subtrees.
+    """
+
+    def __init__(self, max_lines):
+        super().__init__()
+        self.lines = 0
+        self.max_lines = max_lines
+
+    def write(self, text):
+        self.lines += 1
+        if self.lines > self.max_lines:
+            raise LineLimitReached()
+        return super().write(text)
+
+def make_cines(cines, shape, seed=16):
+    """
+    Builds synthetic cine data as extract_cine_data returns it, in shuffled order like os.listdir.
+
+    A 'chain' is one long line of follow-up scenes, a 'dag' gives each cine one to three follow-ups
+    among the next ten, so most scenes are added by several others.
+    """
+    rng = random.Random(seed)
+    cine_data_list = []
+    for index in range(cines):
+        if shape == 'chain':
+            children = [index + 1] if index + 1 < cines else []
+        else:
+            children = sorted({rng.randint(index + 1, min(cines - 1, index + 10)) for _ in range(rng.randint(1, 3))}) if index + 1 < cines else []
+        cine_data_list.append({"name": f"Cine{index}", "save_id": f"cine_{index}", "activateAfterDays": index % 3,
+                               "dayOfWeekRequired": -1, "cineScenesToAdd": [f"Cine{child}" for child in children]})
+    rng.shuffle(cine_data_list)
+    return cine_data_list
+
+def recursive_tree(cine_data_list, output_file):
+    # cutscenes_build_tree.py before the cine graph: roots depended on file order, and every root
+    # printed its whole subtree recursively, shared scenes once per path to them
+    tree = {}
+    cines_without_predecessors = set()
+    cine_map = {cine["name"]: cine for cine in cine_data_list}
+    for cine in cine_data_list:
+        if cine["name"] not in tree:
+            tree[cine["name"]] = {"data": cine, "children": []}
+        for child_cine in cine["cineScenesToAdd"]:
+            if child_cine not in tree:
+                tree[child_cine] = {"data": cine_map.get(child_cine, {}), "children": []}
+            tree[cine["name"]]["children"].append(child_cine)
+            cines_without_predecessors.discard(child_cine)
+        cines_without_predecessors.add(cine["name"])
+
+    def print_tree(cine_name, depth=0):
+        cine_data = tree[cine_name]["data"]
+        activation_str = f" --- activateAfterDays: {cine_data['activateAfterDays']}" if cine_data["activateAfterDays"] else ""
+        output_file.write(f"{'    ' * depth}|-- {cine_name}{activation_str}\n")
+        for child in tree[cine_name]["children"]:
+            print_tree(child, depth + 1)
+
+    for root_cine in cines_without_predecessors:
+        print_tree(root_cine)
+
+def graph_tree(cine_data_list, output_file):
+    tree, graph = cutscenes_build_tree.build_tree(cine_data_list)
+    cutscenes_build_tree.print_tree(tree, graph, output_file)
+    return graph
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the cine tree of cutscenes_build_tree.py on a large synthetic cine graph, against the old recursive printing.")
+    parser.add_argument('--cines', type=int, default=10000, help="Cines in the synthetic graph (default: 10000).")
+    parser.add_argument('--max-lines', type=int, default=1000000,
+                        help="Lines the old recursive printing may write before it is stopped (default: 1000000).")
+    parser.add_argument('--queries', type=int, default=1000, help="descendants() queries timed on the graph (default: 1000).")
+    args = parser.parse_args()
+
+    for shape in ['chain', 'dag']:
+        cine_data_list = make_cines(args.cines, shape)
+        print(f"{args.cines} cines, {shape}")
+
+        def recursive():
+            output = LimitedOutput(args.max_lines)
+            try:
+                recursive_tree(cine_data_list, output)
+                return None
+            except RecursionError:
+                return f"RecursionError after {output.lines} lines"
+            except LineLimitReached:
+                return f"stopped after {args.max_lines} lines"
+
+        recursive_seconds, recursive_failure = bench_utils.best_time(recursive, 1)
+        output = io.StringIO()
+        graph_seconds, graph = bench_utils.best_time(lambda: graph_tree(cine_data_list, output), 1)
+        names = [cine["name"] for cine in cine_data_list[:args.queries]]
+        query_seconds, _ = bench_utils.best_time(lambda: [cine_graph.descendants(graph, name) for name in names], 1)
+
+        # A speedup only means something when the old printing got through the whole graph
+        bench_utils.report("recursive print", recursive_seconds)
+        bench_utils.report("cine graph walk", graph_seconds, None if recursive_failure else recursive_seconds)
+        bench_utils.report(f"{len(names)} descendants() queries", query_seconds)
+        print(f"  Recursive print: {recursive_failure}" if recursive_failure else "  Recursive print finished")
+        print(f"  Cine graph walk: {output.getvalue().count(chr(10))} lines, {len(graph['cycles'])} cycles")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import os
+import sys
+import tempfile
+import bench_utils
+from Utilities import debug_log
+
+# open() calls are counted with an audit hook, write syscalls from /proc/self/io where Linux has it
+_counting = {'opens': 0}
+
+def _audit_hook(event, args):
+    if event == 'open':
+        _counting['opens'] += 1
+
+def _write_syscalls():
+    try:
+        with open('/proc/self/io', 'r') as file:
+            return int(dict(line.split(': ') for line in file.read().splitlines())['syscw'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+def count_calls(function):
+    """
+    Runs a function and returns its open() calls and write syscalls (None when they can't be read).
+    """
+    opens_before = _counting['opens']
+    writes_before = _write_syscalls()
+    function()
+    opens = _counting['opens'] - opens_before
+    writes_after = _write_syscalls()
+    # Reading /proc/self/io opens it once itself
+    return opens - 1, None if writes_before is None else writes_after - writes_before
+
+def open_per_message(file_paths, messages):
+    # debug output before debug_log: every message opened the file, appended one line and closed it
+    for index in range(messages):
+        with open(file_paths[index % len(file_paths)], 'a', encoding='utf-8') as file:
+            file.write(f"Processing asset_{index}.asset: found item_{index}\n")
+
+def buffered_log(file_paths, messages):
+    for index in range(messages):
+        debug_log.log(file_paths[index % len(file_paths)], f"Processing asset_{index}.asset: found item_{index}")
+    debug_log.close_all()
+
+def main():
+    parser = argparse.ArgumentParser(description="Counts the syscalls and times the debug output of debug_log against an open and close per message.")
+    parser.add_argument('--messages', type=int, default=100000, help="Debug messages to write (default: 100000).")
+    parser.add_argument('--files', type=int, default=4, help="Debug files the messages are spread over (default: 4).")
+    args = parser.parse_args()
+
+    sys.addaudithook(_audit_hook)
+    with tempfile.TemporaryDirectory() as root:
+        def file_paths(name):
+            return [os.path.join(root, name, f"debug_{index}.txt") for index in range(args.files)]
+        os.makedirs(os.path.join(root, 'per_message'))
+
+        versions = [
+            ("open + append + close per message", file_paths('per_message'), lambda paths: open_per_message(paths, args.messages)),
+            ("debug_log, buffered handle", file_paths('buffered'), lambda paths: buffered_log(paths, args.messages)),
+        ]
+        print(f"{args.messages} messages over {args.files} debug files")
+        print(f"  {'':<40} {'opens':>8} {'write syscalls':>15}")
+        timings = []
+        for label, paths, write in versions:
+            opens, writes = count_calls(lambda: write(paths))
+            for path in paths:
+                os.remove(path)
+            seconds, _ = bench_utils.best_time(lambda: write(paths), 1)
+            timings.append((label, seconds))
+            print(f"  {label:<40} {opens:>8} {'n/a' if writes is None else writes:>15}")
+
+        debug_log.set_level('OFF')
+        off_seconds, _ = bench_utils.best_time(lambda: buffered_log(file_paths('off'), args.messages), 1)
+        debug_log.set_level('DEBUG')
+
+        per_message_seconds = timings[0][1]
+        bench_utils.report(timings[0][0], per_message_seconds)
+        bench_utils.report(timings[1][0], timings[1][1], per_message_seconds)
+        bench_utils.report("debug_log, level OFF", off_seconds, per_message_seconds)
+
+        def contents(name):
+            result = []
+            for path in file_paths(name):
+                with open(path, 'r', encoding='utf-8') as file:
+                    result.append(file.read())
+            return result
+        # The files written while counting were removed, so each holds the timed run's messages once
+        print("Results identical" if contents('per_message') == contents('buffered') else "RESULTS DIFFER")
+
+if __name__ == '__main__':
+    main()
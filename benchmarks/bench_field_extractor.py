@@ -0,0 +1,53 @@
+import argparse
+import re
+import bench_utils
+from Utilities import field_extractor
+
+field_names = ['itemType', 'decoType', 'buyValue', 'sellValue', 'healthGain', 'energyGain']
+
+def make_item_asset(index, nested_fields):
+    """
+    Writes a synthetic item asset: the fields the infobox reads between plenty of others, then nested lists.
+    """
+    lines = ["%YAML 1.1", "%TAG !u! tag:unity3d.com,2011:", "--- !u!114 &11400000", "MonoBehaviour:"]
+    lines += [f"  m_Field{field}: {field}" for field in range(40)]
+    lines += [f"  itemType: {index % 9}", f"  buyValue: {index}", f"  sellValue: {-1 if index % 5 == 0 else index // 2}",
+              f"  healthGain: {index % 7}", f"  energyGain: {index % 11}"]
+    if index % 3:
+        lines.append(f"  decoType: {index % 4}")
+    lines += [f"  otherField{field}:\n  - entry: {{fileID: 0}}\n    amount: {field}" for field in range(nested_fields)]
+    return "\n".join(lines) + "\n"
+
+def repeated_search(data):
+    # infobox_item_parser.py before the field extractor: each field searched for, often twice, with an uncompiled pattern
+    item_type = int(re.search(r'itemType:\s*(\d+)', data).group(1)) if re.search(r'itemType:\s*(\d+)', data) else 0
+    deco_type_match = re.search(r'decoType:\s*(\d+)', data)
+    buy_value = int(re.search(r'buyValue:\s*(\d+)', data).group(1)) if re.search(r'buyValue:\s*(\d+)', data) else 0
+    sell_value = int(re.search(r'sellValue:\s*(-?\d+)', data).group(1)) if re.search(r'sellValue:\s*(-?\d+)', data) else 0
+    health_gain = int(re.search(r'healthGain:\s*(\d+)', data).group(1)) if re.search(r'healthGain:\s*(\d+)', data) else 0
+    energy_gain = int(re.search(r'energyGain:\s*(\d+)', data).group(1)) if re.search(r'energyGain:\s*(\d+)', data) else 0
+    return item_type, deco_type_match.group(1) if deco_type_match else None, buy_value, sell_value, health_gain, energy_gain
+
+def extracted(data):
+    fields = field_extractor.extract_fields(data, field_names)
+    return (field_extractor.get_int(fields, 'itemType'), field_extractor.get_match(fields, 'decoType'),
+            field_extractor.get_int(fields, 'buyValue'), field_extractor.get_int(fields, 'sellValue', signed=True),
+            field_extractor.get_int(fields, 'healthGain'), field_extractor.get_int(fields, 'energyGain'))
+
+def main():
+    parser = argparse.ArgumentParser(description="Times field_extractor.extract_fields against one re.search per field on synthetic item assets.")
+    parser.add_argument('--assets', type=int, default=5000, help="Item assets to read (default: 5000).")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs of each version, the fastest is reported (default: 3).")
+    args = parser.parse_args()
+
+    for label, nested_fields in [("small items (~50 lines)", 0), ("large items (~500 lines)", 150)]:
+        assets = [make_item_asset(index, nested_fields) for index in range(args.assets)]
+        print(f"{args.assets} {label}")
+        search_seconds, search_values = bench_utils.best_time(lambda: [repeated_search(data) for data in assets], args.repeat)
+        extract_seconds, extract_values = bench_utils.best_time(lambda: [extracted(data) for data in assets], args.repeat)
+        bench_utils.report("re.search per field", search_seconds)
+        bench_utils.report("extract_fields", extract_seconds, search_seconds)
+        print("  Results identical" if search_values == extract_values else "  RESULTS DIFFER")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import random
+import bench_utils
+from Utilities import guid_utils
+
+def make_lookup(entries, seed=1):
+    """
+    Builds a synthetic GUID lookup shaped like guid_mapper.py's output.
+    """
+    rng = random.Random(seed)
+    lookup = []
+    for index in range(entries):
+        entry = {'guid': f"{rng.getrandbits(128):032x}", 'filename': f"asset_{index}", 'save_id': f"item_{index}"}
+        if index % 3:
+            entry['name'] = f"item {index}"
+        lookup.append(entry)
+    return lookup
+
+def linear_lookups(lookup, guids, save_ids):
+    # The scripts before the indexed mappings: one scan over the whole lookup per query
+    found = []
+    for guid in guids:
+        found.append(next((entry for entry in lookup if entry.get('guid') == guid), None))
+    for save_id in save_ids:
+        found.append(next((entry for entry in lookup if entry.get('save_id') == save_id), None))
+    return found
+
+def mapped_lookups(lookup, guids, save_ids):
+    mappings = guid_utils.create_mappings(lookup)
+    found = [guid_utils.get_entry_from_guid(guid, mappings) for guid in guids]
+    found += [guid_utils.get_entry_from_save_id(save_id, mappings) for save_id in save_ids]
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description="Times GUID lookups by linear scan against the indexed mappings of guid_utils.")
+    parser.add_argument('--entries', type=int, default=50000, help="Entries in the synthetic lookup (default: 50000).")
+    parser.add_argument('--queries', type=int, default=2000, help="Lookups of each kind, by GUID and by save_id (default: 2000).")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs of each version, the fastest is reported (default: 3).")
+    args = parser.parse_args()
+
+    lookup = make_lookup(args.entries)
+    rng = random.Random(2)
+    # A few queries miss, like references to assets that weren't exported
+    guids = [rng.choice(lookup)['guid'] for _ in range(args.queries)] + ['f' * 32]
+    save_ids = [rng.choice(lookup)['save_id'] for _ in range(args.queries)] + ['item_missing']
+    print(f"{args.entries} lookup entries, {len(guids) + len(save_ids)} queries")
+
+    linear_seconds, linear_found = bench_utils.best_time(lambda: linear_lookups(lookup, guids, save_ids), args.repeat)
+    build_seconds, mappings = bench_utils.best_time(lambda: guid_utils.create_mappings(lookup), args.repeat)
+    mapped_seconds, mapped_found = bench_utils.best_time(lambda: mapped_lookups(lookup, guids, save_ids), args.repeat)
+    bench_utils.report("linear scan per query", linear_seconds)
+    bench_utils.report("create_mappings alone", build_seconds)
+    bench_utils.report("create_mappings + dict lookups", mapped_seconds, linear_seconds)
+    print("Results identical" if linear_found == mapped_found else "RESULTS DIFFER")
+
+if __name__ == '__main__':
+    main()
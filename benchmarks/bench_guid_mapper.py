@@ -0,0 +1,118 @@
+import argparse
+import os
+import re
+import tempfile
+import bench_utils
+import guid_mapper
+from Utilities import asset_index
+
+class NullLog:
+    """
+    Stands in for the debug file, so only the mapping is timed.
+    """
+
+    def write(self, message, level='DEBUG'):
+        pass
+
+def write_assets(directory, assets):
+    """
+    Writes a synthetic MonoBehaviour folder: every asset with its .meta file, most of them items.
+    """
+    os.makedirs(directory)
+    for index in range(assets):
+        base_name = f"asset_{index}"
+        with open(os.path.join(directory, f"{base_name}.asset.meta"), 'w') as file:
+            file.write(f"fileFormatVersion: 2\nguid: {index:032x}\nNativeFormatImporter:\n")
+        save_id = f"item_{index}" if index % 4 else f"npc_{index}"
+        with open(os.path.join(directory, f"{base_name}.asset"), 'w') as file:
+            file.write("%YAML 1.1\n%TAG !u! tag:unity3d.com,2011:\n--- !u!114 &11400000\nMonoBehaviour:\n"
+                       f"  m_Name: {base_name}\n  saveID: {save_id}\n  itemName: thing {index}\n  itemCategory: Food\n  buyValue: {index}\n")
+
+def write_text_assets(directory, assets):
+    items_file = os.path.join(directory, 'English_Items.txt')
+    quests_file = os.path.join(directory, 'English_Quests.txt')
+    with open(items_file, 'w') as file:
+        file.write('\n'.join(f'{{"itemKey": "item_{index}", "itemName": "Thing {index}"}}' for index in range(1, assets, 2)) + '\n')
+    with open(quests_file, 'w') as file:
+        file.write('{"questKey": "quest_1", "questName": "The Hunt"}\n')
+    return items_file, quests_file
+
+def nested_loop_mapping(directory, english_items_file, english_quests_file):
+    # guid_mapper.py before the single pass: the .asset files were joined to the .meta entries by
+    # scanning the whole list of entries for each asset
+    item_mapping = {}
+    with open(english_items_file, 'r') as file:
+        for item_key, item_name in re.findall(r'"itemKey": "(.*?)",\s*"itemName": "(.*?)"', file.read()):
+            item_mapping[item_key] = item_name
+    quest_mapping = {}
+    with open(english_quests_file, 'r') as file:
+        for quest_key, quest_name in re.findall(r'"questKey": "(quest_\d+)",\s*"questName": "(.*?)"', file.read()):
+            quest_mapping[quest_key] = quest_name
+
+    guid_mapping = []
+    for filename in os.listdir(directory):
+        if filename.endswith(".asset.meta"):
+            with open(os.path.join(directory, filename), 'r') as file:
+                guid_match = re.search(r'guid: ([a-f0-9]{32})', file.read())
+                if guid_match:
+                    guid_mapping.append({"guid": guid_match.group(1), "filename": filename.replace('.asset.meta', '')})
+
+    for filename in os.listdir(directory):
+        if filename.endswith(".asset"):
+            base_name = filename.replace('.asset', '')
+            with open(os.path.join(directory, filename), 'r') as file:
+                data = file.read()
+            save_id_match = re.search(r'saveID:\s*(\w+)', data)
+            item_name_match = re.search(r'itemName:\s*(.*)', data)
+            name_match = re.search(r'm_Name:\s*(.*)', data)
+            category_match = re.search(r'itemCategory:\s*(.*)', data)
+            if not save_id_match:
+                continue
+            save_id = save_id_match.group(1).strip()
+            m_name = name_match.group(1).strip() if name_match else None
+            if save_id.startswith("item_"):
+                mapped_name = item_mapping.get(save_id, "").strip() or m_name
+            elif save_id.startswith("quest_"):
+                mapped_name = quest_mapping.get(save_id, "").strip()
+            else:
+                mapped_name = item_name_match.group(1).strip() if item_name_match else m_name
+            for entry in guid_mapping:
+                if entry["filename"] == base_name:
+                    entry["save_id"] = save_id
+                    entry["name"] = mapped_name
+                    entry["category"] = category_match.group(1).strip() if category_match else 'unknown'
+    return guid_mapping
+
+def main():
+    parser = argparse.ArgumentParser(description="Times guid_mapper.py on synthetic asset folders of growing size, to show it scales linearly.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 3000, 10000, 30000, 100000],
+                        help="Numbers of assets to map (default: 1000 3000 10000 30000 100000).")
+    parser.add_argument('--nested-max', type=int, default=10000,
+                        help="Largest size the old nested-loop join is timed at, since it grows quadratically (default: 10000).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        # The asset index is cached under .hidden in the working directory
+        os.chdir(root)
+        print(f"{'assets':>8} {'single pass':>12} {'per asset':>10} {'cached index':>13} {'nested loop':>12}")
+        for assets in args.sizes:
+            directory = os.path.join(root, f"assets_{assets}")
+            write_assets(directory, assets)
+            items_file, quests_file = write_text_assets(directory, assets)
+
+            # The first run scans every file; the second reuses the asset index, like later stages of a run
+            cold_seconds, mapping = bench_utils.best_time(
+                lambda: guid_mapper.load_guid_to_item_mapping(directory, items_file, quests_file, NullLog()), 1)
+            asset_index._loaded_indexes.clear()
+            warm_seconds, _ = bench_utils.best_time(
+                lambda: guid_mapper.load_guid_to_item_mapping(directory, items_file, quests_file, NullLog()), 1)
+
+            nested = '-'
+            if assets <= args.nested_max:
+                nested_seconds, nested_mapping = bench_utils.best_time(lambda: nested_loop_mapping(directory, items_file, quests_file), 1)
+                same = sorted(nested_mapping, key=lambda entry: entry['guid']) == sorted(mapping, key=lambda entry: entry['guid'])
+                nested = f"{nested_seconds:.2f}s" + ('' if same else ' DIFFERS')
+            print(f"{assets:>8} {cold_seconds:>11.2f}s {cold_seconds / assets * 1e6:>8.1f}us {warm_seconds:>12.2f}s {nested:>12}")
+
+if __name__ == '__main__':
+    main()
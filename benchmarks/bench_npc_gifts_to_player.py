@@ -0,0 +1,100 @@
+import argparse
+import os
+import random
+import re
+import tempfile
+from collections import defaultdict
+import bench_utils
+import npc_gifts_to_player_parser
+from Utilities import asset_cache, debug_log
+
+def write_npc_file(file_path, quests, seed=1):
+    """
+    Writes a synthetic NPC text file: quests with and without rewards, talk lines and repeated quest keys.
+    """
+    rng = random.Random(seed)
+
+    def box(index, reward=None):
+        lines = ['                {', f'                    "text": "Line {index} with some dialogue text, and a bit more.\\nAnother line.",',
+                 '                    "expression": "Happy",']
+        if reward:
+            lines += ['                    "boxType": "Reward",', f'                    "itemID": "item_{reward[0]}",', f'                    "amount": {reward[1]}']
+        else:
+            lines.append('                    "boxType": "Normal"')
+        lines.append('                }')
+        return '\n'.join(lines)
+
+    def dialogue(key, boxes):
+        return '\n'.join(['        {', f'            "key": "{key}",', '            "textSet": [', ',\n'.join(boxes), '            ]', '        }'])
+
+    entries = []
+    for quest in range(quests):
+        boxes = [box(line) for line in range(3)]
+        if rng.random() < 0.6:
+            boxes.insert(rng.randint(0, 3), box(99, (rng.randint(0, 30), rng.choice([1, 1, 2, 5]))))
+        entries.append(dialogue(f"quest_{quest}", boxes))
+        if rng.random() < 0.05:
+            entries.append(dialogue("talk_1", [box(5)]))
+            entries.append(dialogue(f"quest_{quest}", [box(6)]))
+
+    with open(file_path, 'w', encoding='utf-8') as file:
+        file.write('{\n    "name": "Npc",\n    "dialogue": [\n' + ',\n'.join(entries) + '\n    ]\n}\n')
+
+def regex_quest_rewards(input_folder, save_id_to_name, item_id_to_name, npc_gifts_combined):
+    # The parser before the single-pass rewrite: one DOTALL search over the whole file per quest key
+    reward_pattern = re.compile(r'"boxType": "Reward".*?"itemID": "(item_\d+)",\s*"amount": (\d+)', re.DOTALL)
+    for root, dirs, files in os.walk(input_folder):
+        for file in files:
+            if not file.endswith('.txt'):
+                continue
+            with open(os.path.join(root, file), 'r', encoding='utf-8') as f:
+                content = f.read()
+            npc_name_match = re.search(r'"name":\s*"(.*?)"', content)
+            npc_name = npc_name_match.group(1) if npc_name_match else "Unknown NPC"
+            for quest in re.findall(r'"key":\s*"(quest_\d+)"', content):
+                text_set_match = re.search(rf'"key":\s*"{quest}".*?"textSet":\s*\[(.*?)\]', content, re.DOTALL)
+                if not text_set_match:
+                    continue
+                reward_match = reward_pattern.search(text_set_match.group(1))
+                if reward_match:
+                    amount = int(reward_match.group(2))
+                    quest_name = save_id_to_name.get(quest, f"Unknown ({quest})")
+                    item_name = item_id_to_name.get(reward_match.group(1), f"Unknown ({reward_match.group(1)})").capitalize()
+                    amount_str = f"*{amount}" if amount > 1 else ""
+                    npc_gifts_combined[npc_name].append(f"{item_name}{amount_str}:Dialogue after starting [[{quest_name}]]")
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the quest reward extraction of npc_gifts_to_player_parser on a large synthetic NPC file.")
+    parser.add_argument('--quests', type=int, default=3000, help="Quest dialogues in the NPC file (default: 3000).")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs of each version, the fastest is reported (default: 3).")
+    args = parser.parse_args()
+
+    debug_log.set_level('OFF')
+    save_id_to_name = {f"quest_{quest}": f"Quest {quest}" for quest in range(0, args.quests, 2)}
+    item_id_to_name = {f"item_{item}": f"thing {item}" for item in range(30)}
+
+    with tempfile.TemporaryDirectory() as input_folder:
+        file_path = os.path.join(input_folder, 'English_Npc.txt')
+        write_npc_file(file_path, args.quests)
+        print(f"NPC file with {args.quests} quests, {os.path.getsize(file_path) / 1e6:.1f} MB")
+
+        def single_pass():
+            # The text file parse is cached per process, so each run starts from the file again
+            asset_cache._cache.clear()
+            gifts = defaultdict(list)
+            npc_gifts_to_player_parser.parse_quest_rewards(input_folder, save_id_to_name, item_id_to_name, gifts)
+            return gifts
+
+        def per_key_regex():
+            gifts = defaultdict(list)
+            regex_quest_rewards(input_folder, save_id_to_name, item_id_to_name, gifts)
+            return gifts
+
+        regex_seconds, regex_gifts = bench_utils.best_time(per_key_regex, args.repeat)
+        single_seconds, single_gifts = bench_utils.best_time(single_pass, args.repeat)
+        bench_utils.report("regex search per quest key", regex_seconds)
+        bench_utils.report("single pass (parse_quest_rewards)", single_seconds, regex_seconds)
+        print("Results identical" if regex_gifts == single_gifts else "RESULTS DIFFER")
+
+if __name__ == '__main__':
+    main()
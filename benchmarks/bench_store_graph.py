@@ -0,0 +1,102 @@
+import argparse
+import os
+import random
+import tempfile
+import bench_utils
+from Utilities import asset_cache, guid_utils, store_graph, unity_yaml_loader
+
+asset_header = "%YAML 1.1\n%TAG !u! tag:unity3d.com,2011:\n--- !u!114 &11400000\nMonoBehaviour:\n"
+
+def reference(guid):
+    return f"{{fileID: 11400000, guid: {guid}, type: 2}}"
+
+def write_stores(input_folder, stores, sets_per_store, seed=21):
+    """
+    Writes synthetic store catalogs, each listing store sets drawn from a shared pool, down to the
+    store items and the items they sell. Returns the GUID lookup of every asset but the catalogs.
+    """
+    rng = random.Random(seed)
+    lookup = []
+
+    def write_asset(kind, index, body):
+        # A GUID of only digits would be read back from the YAML as a number
+        guid = f"a{len(lookup) + 1:031x}"
+        filename = f"{kind}_{index}"
+        lookup.append({'guid': guid, 'filename': filename, 'name': f"{kind} {index}"})
+        with open(os.path.join(input_folder, filename + '.asset'), 'w') as file:
+            file.write(asset_header + f"  m_Name: {filename}\n" + body)
+        return guid
+
+    products = [write_asset('Item', index, f"  buyValue: {rng.randint(1, 500)}\n") for index in range(stores * 5)]
+    store_items = [write_asset('StoreItem', index, f"  itemForSale: {reference(rng.choice(products))}\n  limitedPurchase: {index % 2}\n")
+                   for index in range(stores * 10)]
+    store_sets = [write_asset('StoreSet', index, f"  rndRollActive: {index % 2}\n  rndRollAmount: 3\n  storeItemsInSet:\n"
+                              + "".join(f"  - {reference(guid)}\n" for guid in rng.sample(store_items, 10)))
+                  for index in range(stores * 2)]
+    for index in range(stores):
+        with open(os.path.join(input_folder, f"_StoreCatalog_{index}.asset"), 'w') as file:
+            file.write(asset_header + f"  m_Name: Store{index}_StoreCatalog\n  markupPercent: 1.5\n  storeSets:\n"
+                       + "".join(f"  - {reference(guid)}\n" for guid in rng.sample(store_sets, sets_per_store)))
+    return lookup
+
+def _parse(file_path):
+    with open(file_path, 'r') as file:
+        return unity_yaml_loader.load_unity_yaml(file.read())
+
+def per_catalog_prices(input_folder, catalog_filenames, mappings):
+    # shop_catalog_parser.py before the store graph: every catalog loaded its own sets, store items
+    # and items for sale, so assets shared between stores were parsed once per store
+    prices = {}
+    for filename in catalog_filenames:
+        catalog = _parse(os.path.join(input_folder, filename))['MonoBehaviour']
+        lines = []
+        for store_set in catalog['storeSets']:
+            set_detail = guid_utils.get_entry_from_guid(store_set['guid'], mappings)
+            set_data = _parse(os.path.join(input_folder, set_detail['filename'] + '.asset'))['MonoBehaviour']
+            for item in set_data['storeItemsInSet']:
+                item_detail = guid_utils.get_entry_from_guid(item['guid'], mappings)
+                item_data = _parse(os.path.join(input_folder, item_detail['filename'] + '.asset'))['MonoBehaviour']
+                product_detail = guid_utils.get_entry_from_guid(item_data['itemForSale']['guid'], mappings)
+                product_data = _parse(os.path.join(input_folder, product_detail['filename'] + '.asset'))['MonoBehaviour']
+                lines.append((set_detail['filename'], product_detail['name'], product_data['buyValue']))
+        prices[filename] = lines
+    return prices
+
+def graph_prices(input_folder, catalog_filenames, mappings, threads):
+    # Parsed assets are kept per process, so each run starts from the files again
+    asset_cache._cache.clear()
+    graph = store_graph.build_store_graph(input_folder, catalog_filenames, mappings, threads)
+    prices = {}
+    for catalog in graph['catalogs']:
+        lines = []
+        for store_set in catalog['data']['MonoBehaviour']['storeSets']:
+            set_node = graph['sets'][store_set['guid']]
+            for item in set_node['data']['MonoBehaviour']['storeItemsInSet']:
+                product_node = graph['products'][graph['store_items'][item['guid']]['data']['MonoBehaviour']['itemForSale']['guid']]
+                lines.append((set_node['detail']['filename'], product_node['detail']['name'], product_node['data']['MonoBehaviour']['buyValue']))
+        prices[catalog['filename']] = lines
+    return prices
+
+def main():
+    parser = argparse.ArgumentParser(description="Times store_graph.build_store_graph against loading every catalog's assets on its own.")
+    parser.add_argument('--stores', type=int, default=100, help="Store catalogs (default: 100).")
+    parser.add_argument('--sets', type=int, default=50, help="Store sets in each catalog, out of a pool of two per store (default: 50).")
+    parser.add_argument('--threads', type=int, default=4, help="Threads of the threaded store graph run (default: 4).")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs of each version, the fastest is reported (default: 3).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as input_folder:
+        mappings = guid_utils.create_mappings(write_stores(input_folder, args.stores, args.sets))
+        catalog_filenames = sorted(filename for filename in os.listdir(input_folder) if filename.startswith('_StoreCatalog'))
+        print(f"{args.stores} stores x {args.sets} sets, {len(os.listdir(input_folder))} assets")
+
+        per_catalog_seconds, per_catalog = bench_utils.best_time(lambda: per_catalog_prices(input_folder, catalog_filenames, mappings), args.repeat)
+        graph_seconds, graph = bench_utils.best_time(lambda: graph_prices(input_folder, catalog_filenames, mappings, 1), args.repeat)
+        threaded_seconds, threaded = bench_utils.best_time(lambda: graph_prices(input_folder, catalog_filenames, mappings, args.threads), args.repeat)
+        bench_utils.report("per-catalog loading", per_catalog_seconds)
+        bench_utils.report("store graph", graph_seconds, per_catalog_seconds)
+        bench_utils.report(f"store graph, {args.threads} threads", threaded_seconds, per_catalog_seconds)
+        print("Results identical" if per_catalog == graph == threaded else "RESULTS DIFFER")
+
+if __name__ == '__main__':
+    main()
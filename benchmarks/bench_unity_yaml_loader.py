@@ -0,0 +1,56 @@
+import argparse
+import yaml
+import bench_utils
+from Utilities import unity_yaml_loader
+
+asset_header = ("%YAML 1.1\n%TAG !u! tag:unity3d.com,2011:\n--- !u!114 &11400000\nMonoBehaviour:\n  m_ObjectHideFlags: 0\n"
+                "  m_CorrespondingSourceObject: {fileID: 0}\n"
+                "  m_Script: {fileID: 11500000, guid: 75d018639740c96f72f68400654af916, type: 3}\n")
+
+def make_loot_table(index, entries):
+    """
+    Writes a synthetic loot table asset, every entry dropping an item with a chance and an amount range.
+    """
+    rows = "".join(f"  - loot: 0\n    itemToDrop: {{fileID: 11400000, guid: {index * 1000 + entry:032x}, type: 2}}\n"
+                   f"    lootTable: {{fileID: 0}}\n    percentChance: {entry % 100}\n"
+                   f"    amtToGive:\n      minimumNum: 1\n      maxiumNum: {entry % 4 + 1}\n" for entry in range(entries))
+    return asset_header + f"  m_Name: LootTable_{index}\n  saveID: loot_{index}\n  lootTable:\n" + rows
+
+def make_cutscene(index):
+    """
+    Writes a synthetic cine asset with its conditions, rewards and follow-up scenes.
+    """
+    return asset_header + (f"  m_Name: Cine_{index}\n  saveID: cine_{index}\n  activateAfterDays: {index % 7}\n  dayOfWeekRequired: -1\n"
+                           f"  previousCineRequired: {{fileID: 11400000, guid: {index:032x}, type: 2}}\n  friendConditions:\n"
+                           f"  - npcToCheck: {{fileID: 11400000, guid: {index + 1:032x}, type: 2}}\n    friendshipLevelCondition: 3\n"
+                           f"  addEmails: []\n  itemsToReward:\n  - itemData: {{fileID: 11400000, guid: {index + 2:032x}, type: 2}}\n"
+                           f"    amountOfItem: 1\n  cineScenesToAdd:\n  - {{fileID: 11400000, guid: {index + 3:032x}, type: 2}}\n"
+                           f"  endDayCine: 0\n  beginDayCine: 1\n")
+
+def regex_safe_load(contents):
+    # The parsers before the shared loader: strip the Unity tags with a regex, then the pure-Python safe_load
+    return [yaml.safe_load(unity_yaml_loader.preprocess_yaml_content(content)) for content in contents]
+
+def unity_loader(contents):
+    return [unity_yaml_loader.load_unity_yaml(content) for content in contents]
+
+def main():
+    parser = argparse.ArgumentParser(description="Times load_unity_yaml against the regex preprocess and yaml.safe_load on synthetic loot tables and cutscenes.")
+    parser.add_argument('--loot-tables', type=int, default=100, help="Loot table assets to load (default: 100).")
+    parser.add_argument('--entries', type=int, default=40, help="Entries in each loot table (default: 40).")
+    parser.add_argument('--cutscenes', type=int, default=1000, help="Cine assets to load (default: 1000).")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs of each version, the fastest is reported (default: 3).")
+    args = parser.parse_args()
+
+    print(f"LibYAML loader: {unity_yaml_loader.UnityLoader.__mro__[1].__name__}")
+    for label, contents in [(f"{args.loot_tables} loot tables of {args.entries} entries", [make_loot_table(index, args.entries) for index in range(args.loot_tables)]),
+                            (f"{args.cutscenes} cutscenes", [make_cutscene(index) for index in range(args.cutscenes)])]:
+        print(label)
+        regex_seconds, regex_documents = bench_utils.best_time(lambda: regex_safe_load(contents), args.repeat)
+        loader_seconds, loader_documents = bench_utils.best_time(lambda: unity_loader(contents), args.repeat)
+        bench_utils.report("regex preprocess + yaml.safe_load", regex_seconds)
+        bench_utils.report("load_unity_yaml", loader_seconds, regex_seconds)
+        print("  Results identical" if regex_documents == loader_documents else "  RESULTS DIFFER")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+# bench_utils.py
+
+import os
+import sys
+import time
+
+# The benchmarks import the parsers and their helpers the way the parsers do, from the Scripts folder
+scripts_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Scripts')
+if scripts_directory not in sys.path:
+    sys.path.insert(0, scripts_directory)
+
+def best_time(function, repeat=3):
+    """
+    Runs a function several times and returns its fastest wall time and its last result.
+
+    Args:
+        function (function): Takes no arguments.
+        repeat (int): How many times to run it.
+
+    Returns:
+        tuple: (seconds, result)
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def report(label, seconds, baseline_seconds=None):
+    """
+    Prints one timing line, with the speedup over a baseline timing when there is one.
+    """
+    line = f"  {label:<40} {seconds * 1000:10.1f} ms"
+    if baseline_seconds is not None and seconds > 0:
+        line += f"  ({baseline_seconds / seconds:.1f}x)"
+    print(line)
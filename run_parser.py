@@ -1,65 +1,334 @@
-import subprocess
+import argparse
+import contextlib
+import fnmatch
+import importlib
+import io
 import os
 import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
-# List of scripts to execute (relative paths using raw strings or forward slashes)
+# List of scripts to execute, as module names inside the Scripts folder
 scripts = [
-    r"Scripts\item_description_parser.py",
-    r"Scripts\guid_mapper.py",
-    r"Scripts\dialogue_parser.py",
-    r"Scripts\email_parser.py",
-    r"Scripts\infobox_item_parser.py",
-    r"Scripts\infobox_seed_parser.py",
-    r"Scripts\loot_table_generator.py",
-    r"Scripts\loot_list_parser.py",
-    r"Scripts\loot_table_parser.py",
-    r"Scripts\loot_table_recipes.py",
-    r"Scripts\mission_infobox.py",
-    r"Scripts\missions_npc_bb_item_request.py",
-    r"Scripts\npc_gift_overrides_parser.py",
-    r"Scripts\npc_gifts_to_player_parser.py",
-    r"Scripts\recipe_crafting_parser.py",
-    r"Scripts\recipe_machine_production_parser.py",
-    r"Scripts\shop_catalog_parser.py",
-    r"Scripts\decoration_fixture_parser.py",
-    r"Scripts\captain_rank_numbers.py",
-    r"Scripts\friendship_points.py",
-    r"Scripts\cutscenes_build_tree.py",
-    r"Scripts\cutscenes_overview.py",
-    r"Scripts\cutscenes_courting.py",
-    r"Scripts\cutscenes_noncourting.py",
-    r"Scripts\library_sim.py"
+    "item_description_parser",
+    "guid_mapper",
+    "dialogue_parser",
+    "email_parser",
+    "infobox_item_parser",
+    "infobox_seed_parser",
+    "loot_table_generator",
+    "loot_list_parser",
+    "loot_table_parser",
+    "loot_table_recipes",
+    "mission_infobox",
+    "missions_npc_bb_item_request",
+    "npc_gift_overrides_parser",
+    "npc_gifts_to_player_parser",
+    "recipe_crafting_parser",
+    "recipe_machine_production_parser",
+    "shop_catalog_parser",
+    "item_usage_parser",
+    "decoration_fixture_parser",
+    "captain_rank_numbers",
+    "friendship_points",
+    "cutscenes_build_tree",
+    "cutscenes_overview",
+    "cutscenes_courting",
+    "cutscenes_noncourting",
+    "library_sim"
 ]
 
 # Path to the debug output file
 debug_output_path = os.path.join('.hidden', 'debug_output', 'run_parser_debug.txt')
 
-# Ensure the debug output directory exists
-os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+# Run context of a pool worker, shared by every stage that worker executes
+_worker_context = None
 
-def execute_script(script_path):
+def _normalize(path):
+    return os.path.normpath(path)
+
+def _paths_overlap(first, second):
+    """
+    Checks whether two declared paths can refer to the same file.
+
+    A path overlaps another when they are equal, when one is a folder containing the other,
+    or when one is a wildcard pattern matching the other.
+    """
+    first, second = _normalize(first), _normalize(second)
+    if first == second:
+        return True
+    if first.startswith(second + os.sep) or second.startswith(first + os.sep):
+        return True
+    return fnmatch.fnmatch(first, second) or fnmatch.fnmatch(second, first)
+
+def _any_overlap(first_paths, second_paths):
+    return any(_paths_overlap(first, second) for first in first_paths for second in second_paths)
+
+def build_stage_graph(script_names):
+    """
+    Builds the dependency graph of the parser stages from their stage_inputs/stage_outputs.
+
+    A stage depends on every earlier stage in the list that writes a file it reads, writes a file
+    it also writes, or reads a file it writes, so conflicting stages keep their listed order.
+
+    Args:
+        script_names (list): The module names of the parsers, in their sequential order.
+
+    Returns:
+        dict: The set of stage names each stage waits for, keyed by stage name.
+    """
+    declarations = {}
+    for script_name in script_names:
+        module = importlib.import_module(script_name)
+        declarations[script_name] = (module.stage_inputs, module.stage_outputs)
+
+    dependencies = {}
+    for position, script_name in enumerate(script_names):
+        inputs, outputs = declarations[script_name]
+        dependencies[script_name] = set()
+        for earlier_name in script_names[:position]:
+            earlier_inputs, earlier_outputs = declarations[earlier_name]
+            if (_any_overlap(earlier_outputs, inputs)
+                    or _any_overlap(earlier_outputs, outputs)
+                    or _any_overlap(earlier_inputs, outputs)):
+                dependencies[script_name].add(earlier_name)
+    return dependencies
+
+def run_stage(script_name, context):
+    """
+    Imports a parser from the Scripts folder and calls its run(context) entry point in this process.
+
+    Args:
+        script_name (str): The module name of the parser.
+        context (dict): The run context from run_context.create_context.
+
+    Returns:
+        tuple: (script name, succeeded, wall time in seconds, captured output, traceback or None)
+    """
+    from Utilities import debug_log
+
+    output = io.StringIO()
+    start = time.perf_counter()
     try:
-        result = subprocess.run([sys.executable, script_path], check=True, capture_output=True, text=True)
-        with open(debug_output_path, 'a') as debug_file:
-            debug_file.write(f"Executed {script_path} successfully.\n")
-            debug_file.write(f"Output:\n{result.stdout}\n")
-    except subprocess.CalledProcessError as e:
-        error_message = f"Error executing {script_path}:\nExit Code: {e.returncode}\nOutput:\n{e.output}\nErrors:\n{e.stderr}\n"
-        with open(debug_output_path, 'a') as debug_file:
-            debug_file.write(error_message)
-        print(error_message)  # Print error to terminal as well
+        with contextlib.redirect_stdout(output):
+            module = importlib.import_module(script_name)
+            module.run(context)
+    except (Exception, SystemExit):
+        return script_name, False, time.perf_counter() - start, output.getvalue(), traceback.format_exc()
+    finally:
+        # Flush the stage's debug files, so they are complete before later stages or the user read them
+        debug_log.close_all()
+    return script_name, True, time.perf_counter() - start, output.getvalue(), None
+
+def _init_worker(root_directory, incremental, debug_level):
+    global _worker_context
+    os.chdir(root_directory)
+    sys.path.insert(0, os.path.join(root_directory, 'Scripts'))
+    from Utilities import asset_cache, debug_log, run_context
+    debug_log.set_level(debug_level)
+    _worker_context = run_context.create_context(incremental)
+    if incremental:
+        asset_cache.enable_disk_cache()
+
+def _run_stage_in_worker(script_name):
+    return run_stage(script_name, _worker_context)
+
+def stage_fingerprint(script_name, manifest):
+    """
+    Returns the digest of everything a stage's output depends on: its declared inputs, its own
+    source and the shared Utilities code.
+    """
+    from Utilities import file_manifest
+
+    module = importlib.import_module(script_name)
+    return file_manifest.fingerprint(manifest, module.stage_inputs + file_manifest.get_source_paths(module.__file__))
+
+def is_up_to_date(script_name, manifest, fingerprint):
+    """
+    Checks whether a stage's inputs are unchanged since its last successful run and its outputs still exist.
+    """
+    if manifest['stages'].get(script_name) != fingerprint:
         return False
-    return True
+    module = importlib.import_module(script_name)
+    # Outputs that were deleted are rebuilt even when the inputs are unchanged
+    return all(os.path.exists(path) for path in module.stage_outputs if '*' not in path and not path.startswith('.hidden'))
+
+def record_stage(manifest, script_name, fingerprint, succeeded):
+    if succeeded:
+        manifest['stages'][script_name] = fingerprint
+    else:
+        manifest['stages'].pop(script_name, None)
+
+def report_skipped(script_name):
+    from Utilities import debug_log
+
+    debug_log.log(debug_output_path, f"Skipped {script_name}, its inputs are unchanged since the last run.")
+    print(f"Skipped {script_name}, its inputs are unchanged since the last run.")
+    return None
+
+def report_stage(result):
+    """
+    Writes the result of a stage to the debug file and the terminal.
+
+    Args:
+        result (tuple): The tuple returned by run_stage.
 
-# Change the working directory to the script's directory
-os.chdir(os.path.dirname(__file__))
+    Returns:
+        float: The wall time of the stage in seconds.
+    """
+    from Utilities import debug_log
 
-# Execute each script in order
-for script in scripts:
-    if execute_script(script):
-        print(f"Executed {script} successfully.")
+    script_name, succeeded, elapsed, output, error = result
+    if succeeded:
+        debug_log.log(debug_output_path, f"Executed {script_name} successfully in {elapsed:.2f}s.")
+        debug_log.log(debug_output_path, f"Output:\n{output}")
     else:
-        print(f"FAILED to execute {script} !  Check {debug_output_path} for details.")
+        error_message = f"Error executing {script_name}:\nOutput:\n{output}\nErrors:\n{error}\n"
+        debug_log.log(debug_output_path, error_message, 'ERROR')
+        print(error_message)  # Print error to terminal as well
+    if succeeded:
+        print(f"Executed {script_name} successfully in {elapsed:.2f}s.")
+    else:
+        print(f"FAILED to execute {script_name} !  Check {debug_output_path} for details.")
+    return elapsed
+
+def run_sequential(script_names, manifest=None):
+    """
+    Runs every stage in list order in this process, sharing one run context.
+
+    Args:
+        script_names (list): The module names of the parsers, in their sequential order.
+        manifest (dict): The file manifest in an incremental run, None otherwise.
+
+    Returns:
+        dict: The wall time of each stage keyed by stage name, None for skipped stages.
+    """
+    from Utilities import asset_cache, run_context
+
+    context = run_context.create_context(incremental=manifest is not None)
+    if manifest is not None:
+        asset_cache.enable_disk_cache()
+    timings = {}
+    for script_name in script_names:
+        if manifest is None:
+            timings[script_name] = report_stage(run_stage(script_name, context))
+            continue
+        fingerprint = stage_fingerprint(script_name, manifest)
+        if is_up_to_date(script_name, manifest, fingerprint):
+            timings[script_name] = report_skipped(script_name)
+            continue
+        result = run_stage(script_name, context)
+        record_stage(manifest, script_name, fingerprint, result[1])
+        timings[script_name] = report_stage(result)
+    return timings
+
+def run_parallel(script_names, jobs, manifest=None, debug_level='DEBUG'):
+    """
+    Runs the stages in a process pool, starting each one as soon as the stages it depends on finish.
+
+    A failed stage does not stop the stages that depend on it, matching the sequential run.
+
+    Args:
+        script_names (list): The module names of the parsers, in their sequential order.
+        jobs (int): The number of worker processes.
+        manifest (dict): The file manifest in an incremental run, None otherwise.
+        debug_level (str): The debug_log level of the workers.
+
+    Returns:
+        dict: The wall time of each stage keyed by stage name, None for skipped stages.
+    """
+    dependencies = build_stage_graph(script_names)
+    pending = list(script_names)
+    finished = set()
+    running = {}
+    fingerprints = {}
+    timings = {}
+
+    initargs = (os.getcwd(), manifest is not None, debug_level)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs) as executor:
+        while pending or running:
+            # Submit every stage whose dependencies have all finished
+            for script_name in [name for name in pending if dependencies[name] <= finished]:
+                pending.remove(script_name)
+                if manifest is not None:
+                    # Fingerprinted only now, after the stages producing its inputs have run
+                    fingerprints[script_name] = stage_fingerprint(script_name, manifest)
+                    if is_up_to_date(script_name, manifest, fingerprints[script_name]):
+                        timings[script_name] = report_skipped(script_name)
+                        finished.add(script_name)
+                        continue
+                running[executor.submit(_run_stage_in_worker, script_name)] = script_name
+
+            if not running:
+                # Skipped stages may have made more stages ready
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                script_name = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception:
+                    # The worker itself died, e.g. it ran out of memory
+                    result = (script_name, False, 0.0, '', traceback.format_exc())
+                if manifest is not None:
+                    record_stage(manifest, script_name, fingerprints[script_name], result[1])
+                timings[script_name] = report_stage(result)
+                finished.add(script_name)
+    return timings
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Runs every parser stage, in parallel where their inputs allow.")
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: all cores). 1 runs every stage in order in this process.")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Skip stages whose inputs are unchanged since the last run, and reuse cached per-file results and parsed assets.")
+    parser.add_argument('--debug-level', choices=['trace', 'debug', 'error', 'off'], default='debug',
+                        help="Detail of the files in .hidden/debug_output: trace adds full dumps of files and mappings, off writes none.")
+    args = parser.parse_args()
+
+    # Change the working directory to the script's directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    # Ensure the debug output directory exists
+    os.makedirs(os.path.dirname(debug_output_path), exist_ok=True)
+
+    # Make the parsers and their Utilities package importable
+    sys.path.insert(0, os.path.abspath('Scripts'))
+    from Utilities import debug_log
+    debug_log.set_level(args.debug_level)
+
+    start = time.perf_counter()
+    manifest = None
+    if args.incremental:
+        from Utilities import file_manifest
+
+        # Hash the input files up front, so every stage compares against the same snapshot
+        manifest = file_manifest.load_manifest()
+        changed_files = file_manifest.update_file_hashes(manifest)
+        file_manifest.save_manifest(manifest)
+        print(f"Incremental run: {len(changed_files)} input files changed since the last run.")
+
+    if args.jobs > 1:
+        timings = run_parallel(scripts, args.jobs, manifest, args.debug_level)
+    else:
+        timings = run_sequential(scripts, manifest)
+    wall_time = time.perf_counter() - start
+
+    if manifest is not None:
+        file_manifest.save_manifest(manifest)
+
+    # Per-stage wall time summary, in list order
+    print("\nStage timings:")
+    for script in scripts:
+        if timings[script] is None:
+            print(f"  {script:<36} {'skipped':>9}")
+        else:
+            print(f"  {script:<36} {timings[script]:8.2f}s")
+    print(f"  {'sum of stages':<36} {sum(elapsed for elapsed in timings.values() if elapsed is not None):8.2f}s")
+    print(f"  {'wall time':<36} {wall_time:8.2f}s ({args.jobs} job{'s' if args.jobs > 1 else ''})")
 
-# Provide a link to the debug file at the end
-print(f"Debug information has been written to {debug_output_path}")
\ No newline at end of file
+    # Provide a link to the debug file at the end
+    if args.debug_level != 'off':
+        print(f"Debug information has been written to {debug_output_path}")
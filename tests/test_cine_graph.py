@@ -0,0 +1,41 @@
+import os
+import random
+import sys
+
+# The parsers import their helpers as `from Utilities import ...`, relative to the Scripts folder
+scripts_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Scripts')
+if scripts_directory not in sys.path:
+    sys.path.insert(0, scripts_directory)
+
+from Utilities import cine_graph
+
+def search(graph, name, links):
+    # What a cine reaches, found by a plain search from it
+    found = set()
+    pending = [name]
+    while pending:
+        for linked in graph[links][pending.pop()]:
+            if linked != name and linked not in found:
+                found.add(linked)
+                pending.append(linked)
+    return found
+
+def test_reachability_matches_a_search_from_each_cine():
+    rng = random.Random(16)
+    for _ in range(200):
+        cines = rng.randint(1, 25)
+        # Links to any cine, so some graphs have cycles and cines after them
+        graph = cine_graph.build_graph({f"Cine{index}": [f"Cine{rng.randrange(cines)}" for _ in range(rng.randint(0, 3))]
+                                        for index in range(cines)})
+        for name in graph['children']:
+            found = cine_graph.descendants(graph, name)
+            assert len(found) == len(set(found))
+            assert set(found) == search(graph, name, 'children')
+            assert set(cine_graph.ancestors(graph, name)) == search(graph, name, 'parents')
+
+def test_long_chain():
+    cines = 5000
+    graph = cine_graph.build_graph({f"Cine{index}": [f"Cine{index + 1}"] if index + 1 < cines else [] for index in range(cines)})
+    assert cine_graph.descendants(graph, 'Cine0') == [f"Cine{index}" for index in range(1, cines)]
+    assert cine_graph.ancestors(graph, f"Cine{cines - 1}") == [f"Cine{index}" for index in range(cines - 1)]
+    assert cine_graph.descendants(graph, f"Cine{cines - 1}") == []
@@ -0,0 +1,31 @@
+import os
+import shutil
+import sys
+
+# The parsers import their helpers as `from Utilities import ...`, relative to the Scripts folder
+scripts_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Scripts')
+if scripts_directory not in sys.path:
+    sys.path.insert(0, scripts_directory)
+
+import item_usage_parser
+from Utilities import debug_log
+
+fixture_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'npc_gifts')
+
+def test_debug_file_does_not_grow_between_runs(tmp_path, monkeypatch):
+    shutil.copytree(os.path.join(fixture_directory, 'Input'), tmp_path / 'Input')
+    shutil.copytree(os.path.join(fixture_directory, 'Output'), tmp_path / 'Output')
+    monkeypatch.chdir(tmp_path)
+
+    debug_contents = []
+    for _ in range(2):
+        try:
+            item_usage_parser.run()
+        finally:
+            # The debug file handles are relative to the working directory
+            debug_log.close_all()
+        with open(item_usage_parser.debug_output_path, encoding='utf-8') as file:
+            debug_contents.append(file.read())
+
+    assert debug_contents[0]
+    assert debug_contents[1] == debug_contents[0]
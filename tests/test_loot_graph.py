@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+
+# The parsers import their helpers as `from Utilities import ...`, relative to the Scripts folder
+scripts_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Scripts')
+if scripts_directory not in sys.path:
+    sys.path.insert(0, scripts_directory)
+
+import loot_table_parser
+from Utilities import debug_log, guid_utils, loot_graph
+
+asset_header = "%YAML 1.1\n%TAG !u! tag:unity3d.com,2011:\n--- !u!114 &11400000\nMonoBehaviour:\n"
+
+assets = {
+    'LootTable_Ore': ('a0000000000000000000000000000001', "  lootTable:\n  - loot: 0\n    itemToDrop: {fileID: 11400000, guid: a0000000000000000000000000000004, type: 2}\n"
+                                                          "    lootTable: {fileID: 0}\n    percentChance: 100\n    amtToGive:\n      minimumNum: 1\n      maxiumNum: 2\n"),
+    'LootTable_Empty': ('a0000000000000000000000000000002', "  lootTable: []\n"),
+    # Not a table itself, but it has a lootTable key, which is what the loot table list has always gone by
+    'Enemy_Bat': ('a0000000000000000000000000000003', "  lootTable: {fileID: 11400000, guid: a0000000000000000000000000000001, type: 2}\n"),
+    'ore': ('a0000000000000000000000000000004', "  saveID: item_1\n  itemName: ore\n"),
+}
+
+def write_assets(root):
+    input_directory = os.path.join(root, 'Input', 'Assets', 'MonoBehaviour')
+    os.makedirs(input_directory)
+    for name, (guid, body) in assets.items():
+        with open(os.path.join(input_directory, f"{name}.asset"), 'w') as file:
+            file.write(asset_header + f"  m_Name: {name}\n" + body)
+        with open(os.path.join(input_directory, f"{name}.asset.meta"), 'w') as file:
+            file.write(f"fileFormatVersion: 2\nguid: {guid}\n")
+    os.makedirs(os.path.join(root, 'Output', 'Drops'))
+    lookup = [{'guid': guid, 'filename': name, 'name': name} for name, (guid, body) in assets.items()]
+    with open(os.path.join(root, 'Output', 'guid_lookup.json'), 'w') as file:
+        json.dump(lookup, file)
+    return input_directory, lookup
+
+def test_empty_and_flow_style_loot_tables_are_listed(tmp_path, monkeypatch):
+    # The asset index is cached relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    input_directory, lookup = write_assets(str(tmp_path))
+
+    loot_table_files = loot_graph.find_loot_table_files(input_directory)
+    assert sorted(loot_table_files) == ['Enemy_Bat.asset', 'LootTable_Empty.asset', 'LootTable_Ore.asset']
+
+    loot_tables = loot_graph.load_loot_tables(input_directory, guid_utils.create_mappings(lookup))
+    assert loot_graph.get_table(loot_tables, 'LootTable_Empty') == {'name': 'LootTable_Empty', 'entries': []}
+    assert loot_graph.get_table(loot_tables, 'Enemy_Bat') is None
+
+def test_empty_loot_table_is_written(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_assets(str(tmp_path))
+
+    try:
+        loot_table_parser.run()
+    finally:
+        # The debug file handles are relative to the working directory
+        debug_log.close_all()
+
+    with open(os.path.join('Output', 'Drops', 'other_loot_table.txt'), encoding='utf-8') as file:
+        output = file.read()
+    assert "#LootTable_Empty -->" in output
+    assert "{{Loot table|Ore|1.00|1|2|LootTable_Ore}}" in output
+    assert "Enemy_Bat" not in output
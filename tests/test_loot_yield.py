@@ -0,0 +1,61 @@
+import os
+import sys
+import pytest
+
+# The parsers import their helpers as `from Utilities import ...`, relative to the Scripts folder
+scripts_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Scripts')
+if scripts_directory not in sys.path:
+    sys.path.insert(0, scripts_directory)
+
+from Utilities import guid_utils, loot_graph, loot_yield
+
+asset_header = "%YAML 1.1\n%TAG !u! tag:unity3d.com,2011:\n--- !u!114 &11400000\nMonoBehaviour:\n"
+
+def write_loot_table(directory, name, entries):
+    # entries: (loot, item or table GUID, percentChance, minimumNum, maxiumNum)
+    rows = ""
+    for loot, guid, chance, minimum, maximum in entries:
+        item = f"{{fileID: 11400000, guid: {guid}, type: 2}}" if not loot else "{fileID: 0}"
+        table = f"{{fileID: 11400000, guid: {guid}, type: 2}}" if loot else "{fileID: 0}"
+        rows += (f"  - loot: {loot}\n    itemToDrop: {item}\n    lootTable: {table}\n    percentChance: {chance}\n"
+                 f"    amtToGive:\n      minimumNum: {minimum}\n      maxiumNum: {maximum}\n")
+    with open(os.path.join(directory, f"{name}.asset"), 'w') as file:
+        file.write(asset_header + f"  m_Name: {name}\n  lootTable:\n" + rows)
+
+@pytest.fixture
+def loot_tables(tmp_path):
+    # Both tables are over-full, their percentChance values add up to more than 100
+    write_loot_table(tmp_path, 'LootTable_Inner', [
+        (0, 'a0000000000000000000000000000001', 80, 1, 2),
+        (0, 'a0000000000000000000000000000002', 40, 2, 5),
+    ])
+    write_loot_table(tmp_path, 'LootTable_Outer', [
+        (0, 'a0000000000000000000000000000001', 60, 1, 1),
+        (0, 'a0000000000000000000000000000003', 70, 3, 1),
+        (1, 'b0000000000000000000000000000001', 50, 1, 3),
+    ])
+    mappings = guid_utils.create_mappings([{'guid': 'b0000000000000000000000000000001', 'filename': 'LootTable_Inner'}])
+    return loot_graph.load_loot_tables(str(tmp_path), mappings)
+
+def test_over_full_table_chances_add_up_to_one(loot_tables):
+    drops = loot_graph.expand(loot_tables, 'LootTable_Inner')
+    assert [drop['chance'] for drop in drops] == pytest.approx([80 / 120, 40 / 120])
+
+def test_expand_agrees_with_expected_drops(loot_tables):
+    expected = loot_yield.expected_drops(loot_tables, ['LootTable_Outer', 'LootTable_Inner'])
+    for filename in ['LootTable_Outer', 'LootTable_Inner']:
+        from_expand = {}
+        for drop in loot_graph.expand(loot_tables, filename):
+            from_expand[drop['item_guid']] = from_expand.get(drop['item_guid'], 0.0) + drop['chance'] * drop['mean']
+        assert from_expand.keys() == expected[filename].keys()
+        for item_guid, amount in expected[filename].items():
+            assert from_expand[item_guid] == pytest.approx(amount)
+
+def test_nested_amounts_compose(loot_tables):
+    nested = [drop for drop in loot_graph.expand(loot_tables, 'LootTable_Outer') if len(drop['tables']) == 2]
+    # The inner table is rolled 1 to 3 times, each roll giving 1 to 2 or 2 to 5 of its items
+    assert [(drop['min'], drop['max'], drop['mean']) for drop in nested] == [(1, 6, 2 * 1.5), (2, 15, 2 * 3.5)]
+    assert [drop['chance'] for drop in nested] == pytest.approx([50 / 180 * 80 / 120, 50 / 180 * 40 / 120])
+    # A maximum below the minimum always gives the minimum
+    direct = [drop for drop in loot_graph.expand(loot_tables, 'LootTable_Outer') if drop['item_guid'] == 'a0000000000000000000000000000003']
+    assert direct[0]['mean'] == 3
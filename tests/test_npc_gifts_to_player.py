@@ -0,0 +1,33 @@
+import os
+import shutil
+import sys
+
+# The parsers import their helpers as `from Utilities import ...`, relative to the Scripts folder
+scripts_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Scripts')
+if scripts_directory not in sys.path:
+    sys.path.insert(0, scripts_directory)
+
+import npc_gifts_to_player_parser
+from Utilities import debug_log
+
+fixture_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'npc_gifts')
+
+def test_output_matches_regex_parser(tmp_path, monkeypatch):
+    # The expected file was written by the parser as it was before the single-pass rewrite, when
+    # every quest key ran its own regex over the whole file. The fixture has a repeated quest key,
+    # a quest without a reward, unknown items and quests, and friendship and other emails.
+    shutil.copytree(os.path.join(fixture_directory, 'Input'), tmp_path / 'Input')
+    shutil.copytree(os.path.join(fixture_directory, 'Output'), tmp_path / 'Output')
+    monkeypatch.chdir(tmp_path)
+
+    try:
+        npc_gifts_to_player_parser.run()
+    finally:
+        # The debug file handles are relative to the working directory
+        debug_log.close_all()
+
+    with open(os.path.join('Output', 'Gifts', 'npc_gifts_to_player.txt'), encoding='utf-8') as file:
+        output = file.read()
+    with open(os.path.join(fixture_directory, 'expected', 'npc_gifts_to_player.txt'), encoding='utf-8') as file:
+        expected = file.read()
+    assert output == expected
@@ -0,0 +1,44 @@
+import os
+import sys
+
+# The parsers import their helpers as `from Utilities import ...`, relative to the Scripts folder
+scripts_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Scripts')
+if scripts_directory not in sys.path:
+    sys.path.insert(0, scripts_directory)
+
+from Utilities import asset_cache, file_manifest, guid_utils, run_context, store_graph
+
+asset_header = "%YAML 1.1\n%TAG !u! tag:unity3d.com,2011:\n--- !u!114 &11400000\nMonoBehaviour:\n"
+
+assets = {
+    '_StoreCatalog_Inn': "  m_Name: Inn_StoreCatalog\n  markupPercent: 1.5\n  storeSets:\n"
+                         "  - {fileID: 11400000, guid: a0000000000000000000000000000001, type: 2}\n",
+    'StoreSet_Food': "  rndRollActive: 1\n  rndRollAmount: 2\n  storeItemsInSet:\n"
+                     "  - {fileID: 11400000, guid: a0000000000000000000000000000002, type: 2}\n",
+    'StoreItem_Bread': "  itemForSale: {fileID: 11400000, guid: a0000000000000000000000000000003, type: 2}\n  limitedPurchase: 1\n",
+    'Bread': "  buyValue: 12\n  description: Freshly baked\n  itemIcon: {fileID: 21300000, guid: a0000000000000000000000000000009, type: 3}\n",
+}
+lookup = [{'guid': f"a000000000000000000000000000000{index}", 'filename': filename, 'name': filename}
+          for index, filename in enumerate(['StoreSet_Food', 'StoreItem_Bread', 'Bread'], 1)]
+
+def build(context):
+    # Parsed assets are kept per process, so each build starts from the files again
+    asset_cache._cache.clear()
+    graph = store_graph.build_store_graph('MonoBehaviour', ['_StoreCatalog_Inn.asset'], guid_utils.create_mappings(lookup), context=context)
+    return [graph['catalogs'][0]['data']] + [node['data'] for level in ['sets', 'store_items', 'products'] for node in graph[level].values()]
+
+def test_incremental_runs_cache_only_the_store_fields(tmp_path, monkeypatch):
+    # The incremental results are cached relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('MonoBehaviour')
+    for filename, body in assets.items():
+        with open(os.path.join('MonoBehaviour', f"{filename}.asset"), 'w') as file:
+            file.write(asset_header + body)
+
+    expected = build(None)
+    assert expected[-1] == {'MonoBehaviour': {'buyValue': 12}}
+
+    for _ in range(2):
+        assert build(run_context.create_context(incremental=True)) == expected
+    with open(os.path.join(file_manifest.results_directory, 'store_graph_products.json'), encoding='utf-8') as file:
+        assert 'Freshly baked' not in file.read()
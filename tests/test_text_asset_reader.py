@@ -0,0 +1,43 @@
+import os
+import sys
+import pytest
+
+# The parsers import their helpers as `from Utilities import ...`, relative to the Scripts folder
+scripts_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Scripts')
+if scripts_directory not in sys.path:
+    sys.path.insert(0, scripts_directory)
+
+from Utilities import text_asset_reader
+
+def write_text(tmp_path, text):
+    file_path = os.path.join(str(tmp_path), 'English_Test.txt')
+    with open(file_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    return file_path
+
+def test_comment_only_belongs_to_the_next_entry(tmp_path):
+    file_path = write_text(tmp_path, '[\n//EMAIL_Welcome...\n{"emailKey": "email_1"},\n{"emailKey": "email_2"},\n'
+                                     '//Other\n{"emailKey": "email_3"}\n]\n')
+    entries = list(text_asset_reader.iter_entries(file_path))
+    assert [(entry['key'], entry['comment']) for entry in entries] == [
+        ('email_1', 'EMAIL_Welcome...'), ('email_2', None), ('email_3', 'Other')]
+
+def test_multi_line_strings(tmp_path, monkeypatch):
+    text = '[\n{"key": "a", "text": "one\ntwo \\"quoted\\"\n\nthree"},\n{"key": "b", "text": "ends in \\\\"}\n]\n'
+    file_path = write_text(tmp_path, text)
+    expected = [('a', 'one\ntwo "quoted"\n\nthree'), ('b', 'ends in \\')]
+    entries = list(text_asset_reader.iter_entries(file_path))
+    assert [(entry['key'], text_asset_reader.decode_string(entry['fields']['text'])) for entry in entries] == expected
+
+    # Small chunks, so the strings are split between them
+    monkeypatch.setattr(text_asset_reader, 'chunk_size', 1)
+    entries = list(text_asset_reader.iter_entries(file_path))
+    assert [(entry['key'], text_asset_reader.decode_string(entry['fields']['text'])) for entry in entries] == expected
+
+def test_unterminated_string(tmp_path, monkeypatch):
+    file_path = write_text(tmp_path, '[\n{"key": "a", "text": "never closed}\n]\n')
+    with pytest.raises(ValueError, match="Unterminated string"):
+        list(text_asset_reader.iter_entries(file_path))
+    monkeypatch.setattr(text_asset_reader, 'chunk_size', 1)
+    with pytest.raises(ValueError, match="Unterminated string"):
+        list(text_asset_reader.iter_entries(file_path))